@@ -1,42 +1,242 @@
-from flask import Flask, request, jsonify, render_template, redirect, url_for, flash
+from flask import Flask, Blueprint, current_app, request, jsonify, render_template, redirect, url_for, flash, Response, stream_with_context, g, abort, has_request_context, template_rendered, before_render_template
 from flask_sqlalchemy import SQLAlchemy
-from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
-from whoosh.index import create_in, open_dir
-from whoosh.fields import Schema, TEXT
-from whoosh.qparser import QueryParser
+from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user, login_url
+from werkzeug.local import LocalProxy
+from whoosh.index import create_in, open_dir, exists_in, LockError
+from whoosh.fields import Schema, TEXT, ID, NUMERIC
+from whoosh.analysis import RegexTokenizer, LowercaseFilter, StopFilter, StemFilter, CharsetFilter
+from whoosh.support.charset import accent_map
+from whoosh.sorting import FieldFacet
+from whoosh.qparser import MultifieldParser
+from whoosh.query import Term, Prefix, Or
+from whoosh.reading import SegmentReader
+from whoosh.writing import CLEAR
+from whoosh.filedb.filestore import FileStorage
+from sqlalchemy import func, update, insert, select, tuple_, event, inspect, bindparam
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.dialects.sqlite import insert as insert_sqlite
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import joinedload, Session
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+try:
+    import brotli
+except ImportError:
+    # Opcional: sin él las respuestas de la API sólo se comprimen con gzip
+    brotli = None
+from collections import namedtuple, defaultdict, OrderedDict, deque, Counter
+from contextlib import contextmanager
+from datetime import date, datetime
+from texto import normalizar_texto
+import array
+import atexit
+import base64
+import bisect
+import click
+import csv
+import functools
+import hashlib
+import heapq
+import hmac
+import io
+import itertools
+import json
+import math
+import multiprocessing
 import os
+import queue
 import random
-
-app = Flask(__name__)
-app.secret_key = 'your_secret_key'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///aeneta.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-db = SQLAlchemy(app)
+import shutil
+import sys
+import threading
+import time
+import unicodedata
+import uuid
+import weakref
+import zlib
+
+# Configuración por omisión de cada aplicación; create_app() la copia y le
+# aplica AENETA_SETTINGS y el argumento config
+class Configuracion:
+    SECRET_KEY = 'your_secret_key'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('AENETA_DATABASE_URI', 'sqlite:///aeneta.db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Directorio del índice de Whoosh
+    INDEX_DIR = os.environ.get('AENETA_INDEX_DIR', 'indexdir')
+    # PRAGMAs que se aplican a cada conexión nueva de SQLite
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'busy_timeout': 5000,
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'foreign_keys': 'ON',
+    }
+    # Escritura del índice en segundo plano: tamaño máximo del lote y espera máxima (segundos)
+    INDEX_BATCH_SIZE = 200
+    INDEX_BATCH_WAIT = 1.0
+    INDEX_LOCK_RETRIES = 8
+    # Lotes fallidos que un documento que sólo vive en la cola (formas de
+    # titulación, pasajes) espera de nuevo antes de descartarse
+    INDEX_REQUEUE_LIMIT = 10
+    # Caché de usuarios de la sesión: número de entradas y vigencia (segundos)
+    USER_CACHE_SIZE = 10000
+    USER_CACHE_TTL = 60
+    # Caché de resultados de búsqueda: número de entradas y vigencia (segundos)
+    SEARCH_CACHE_SIZE = 1024
+    SEARCH_CACHE_TTL = 300
+    # Caché de páginas renderizadas: número de entradas y vigencia (segundos)
+    PAGE_CACHE_SIZE = 512
+    PAGE_CACHE_TTL = 600
+    # Inscripciones con commit agrupado: tamaño máximo del grupo, ventana para
+    # juntar peticiones concurrentes y espera máxima de cada petición (segundos)
+    ENROLLMENT_BATCH_SIZE = 200
+    ENROLLMENT_BATCH_WAIT = 0.005
+    ENROLLMENT_TIMEOUT = 10
+    ENROLLMENT_LOCK_RETRIES = 8
+    # Asignación automática: máximo de tesis activas por sinodal
+    SINODAL_MAX_LOAD = 12
+    # Sugerencias de búsqueda: cada cuántos segundos se reconstruyen desde la base
+    # (para ver lo que registran otros procesos) y máximo de resultados por consulta
+    SUGGEST_REFRESH = 300
+    SUGGEST_MAX_RESULTS = 50
+    # Entradas nuevas que se guardan aparte antes de fundirlas con el arreglo principal
+    SUGGEST_BUFFER_SIZE = 1024
+    # Detección de tesis casi duplicadas: similitud de Jaccard estimada a partir
+    # de la cual se marca un posible duplicado
+    SIMILARITY_THRESHOLD = 0.7
+    # Documentos completos de las tesis: directorio donde se guardan, procesos que
+    # extraen el texto (None usa todos los núcleos) y palabras por pasaje indexado
+    DOCUMENTS_DIR = os.environ.get('AENETA_DOCUMENTS_DIR', 'documentos')
+    INGEST_WORKERS = None
+    PASSAGE_WORDS = 100
+    # Conciliación diaria de los resúmenes del tablero: cada cuántos segundos se
+    # revisa la hora y a qué hora del día se recalculan desde las tablas base
+    ANALYTICS_RECONCILE = True
+    ANALYTICS_RECONCILE_INTERVAL = 600
+    ANALYTICS_RECONCILE_HOUR = 2
+    # API JSON: tamaño mínimo de una respuesta para comprimirla (bytes), nivel de
+    # gzip, calidad de brotli y máximo de llaves en una búsqueda por lote
+    API_COMPRESS_MIN_SIZE = 1024
+    API_GZIP_LEVEL = 6
+    API_BROTLI_QUALITY = 5
+    API_BATCH_MAX = 1000
+    # Cada cuántos segundos se revisa el outbox aunque no haya avisos
+    OUTBOX_POLL_INTERVAL = 5.0
+    # Mantenimiento del índice: segmentos del mismo nivel que se fusionan juntos,
+    # intervalo del planificador (segundos) y hora del día para la optimización completa
+    INDEX_MERGE_FACTOR = 10
+    INDEX_MAINTENANCE = True
+    INDEX_MAINTENANCE_INTERVAL = 300
+    INDEX_OPTIMIZE_HOUR = 3
+    # Identificadores de tesis: tamaño del bloque que reserva cada proceso y llave
+    # de la permutación que hace que los números consecutivos parezcan aleatorios
+    IDENTIFIER_BLOCK_SIZE = 100
+    IDENTIFIER_KEY = 'aeneta'
+    # Trazas por petición en JSONL (None las desactiva) y fracción de peticiones muestreadas
+    TRACE_FILE = os.environ.get('AENETA_TRACE_FILE')
+    TRACE_SAMPLE_RATE = 0.1
+    # Token para /metrics: se pide como `Authorization: Bearer <token>`; sin
+    # token configurado la ruta no existe (404)
+    METRICS_TOKEN = os.environ.get('AENETA_METRICS_TOKEN')
+    # Máximo de sentencias SQL por petición cuando TESTING está activo (None lo desactiva)
+    SQL_STATEMENT_LIMIT = 20
+
+# Las extensiones y el blueprint se registran en create_app(); al importar el
+# módulo no se crea ninguna aplicación ni se abre la base de datos o el índice
+db = SQLAlchemy()
+# Rutas y comandos de la aplicación; cli_group=None deja los comandos en `flask`
+bp = Blueprint('aeneta', __name__, cli_group=None)
+
+# Servicios de cada aplicación (índice, cachés, colas y sus hilos). Se crean en
+# create_app() y los nombres globales los resuelven con la aplicación actual.
+def servicio(nombre):
+    return LocalProxy(lambda: current_app.extensions['aeneta'][nombre])
+
+# Configuración del motor de almacenamiento
+def configurar_sqlite(engine, pragmas):
+    if engine.dialect.name != 'sqlite':
+        return
+    @event.listens_for(engine, 'connect')
+    def aplicar_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for nombre, valor in pragmas.items():
+            cursor.execute(f'PRAGMA {nombre} = {valor}')
+        cursor.close()
 
 # Configurar Flask-Login
 login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
+login_manager.login_view = 'aeneta.login'
+
+# Analizadores: el texto en español se reduce a raíces y sin acentos. Los
+# acentos se quitan antes de la raíz para que "imágenes médicas" e "imagenes
+# medicas" den los mismos términos. Los nombres sólo van en minúsculas y sin acentos.
+ANALIZADOR_ES = RegexTokenizer() | LowercaseFilter() | StopFilter(lang='es') | CharsetFilter(accent_map) | StemFilter(lang='es')
+ANALIZADOR_NOMBRES = RegexTokenizer() | LowercaseFilter() | CharsetFilter(accent_map)
 
 # Definir el esquema de búsqueda
 schema = Schema(
-    title=TEXT(stored=True),
-    authors=TEXT(stored=True),
-    summary=TEXT(stored=True),
-    keywords=TEXT(stored=True),
-    content=TEXT(stored=True)
+    clave=ID(stored=True, unique=True),
+    tipo=ID(stored=True),
+    thesis_id=NUMERIC(stored=True),
+    identifier=ID(stored=True),
+    pagina=NUMERIC(stored=True),
+    title=TEXT(stored=True, analyzer=ANALIZADOR_ES),
+    authors=TEXT(stored=True, analyzer=ANALIZADOR_NOMBRES),
+    summary=TEXT(stored=True, analyzer=ANALIZADOR_ES),
+    keywords=TEXT(stored=True, analyzer=ANALIZADOR_ES),
+    content=TEXT(stored=True, analyzer=ANALIZADOR_ES)
 )
 
-# Crear el directorio para el índice si no existe
-if not os.path.exists("indexdir"):
-    os.mkdir("indexdir")
-
-# Crear un índice en el directorio (si ya existe, se abre)
-if not os.path.exists("indexdir/index"):
-    index = create_in("indexdir", schema)
-else:
-    index = open_dir("indexdir")
+# Campos y analizadores de un esquema; Schema.__eq__ no compara analizadores,
+# así que esto es lo que decide si un índice existente quedó desactualizado
+def firma_esquema(esquema):
+    firma = {}
+    for nombre, campo in esquema.items():
+        analizador = getattr(campo, 'analyzer', None)
+        partes = getattr(analizador, 'items', [analizador] if analizador is not None else [])
+        firma[nombre] = (type(campo).__name__,) + tuple(type(parte).__name__ for parte in partes)
+    return firma
+
+# Abre el índice, creándolo sólo si no existe. La creación se hace con el
+# candado de Whoosh y volviendo a revisar, así que varios procesos que
+# arrancan a la vez nunca borran un índice que otro ya creó.
+def abrir_indice(directorio):
+    if not exists_in(directorio):
+        almacenamiento = FileStorage(directorio).create()
+        candado = almacenamiento.lock('CREAR_LOCK')
+        candado.acquire(blocking=True)
+        try:
+            if not exists_in(directorio):
+                return create_in(directorio, schema)
+        finally:
+            candado.release()
+    indice = open_dir(directorio)
+    if firma_esquema(indice.schema) != firma_esquema(schema):
+        current_app.logger.warning('El esquema del índice en %s no es el actual; ejecute flask setup', directorio)
+    return indice
+
+# Índice abierto de forma perezosa en cada proceso (también después de un fork)
+class IndicePerezoso:
+    def __init__(self, app):
+        self.app = app
+        self.candado = threading.Lock()
+        self.indice = None
+        self.pid = None
+
+    def abrir(self):
+        with self.candado:
+            if self.indice is None or self.pid != os.getpid():
+                self.indice = abrir_indice(self.app.config['INDEX_DIR'])
+                self.pid = os.getpid()
+            return self.indice
+
+    def cerrar(self):
+        with self.candado:
+            self.indice = None
+
+    def __getattr__(self, nombre):
+        return getattr(self.abrir(), nombre)
+
+index = servicio('index')
 
 # Definir modelos
 class User(UserMixin, db.Model):
@@ -51,28 +251,28 @@ class Alumno(db.Model):
     boleta = db.Column(db.String(50), nullable=False)
     area = db.Column(db.String(150), nullable=False)
     semester = db.Column(db.String(50), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
     user = db.relationship('User', backref=db.backref('alumno', uselist=False, cascade='all, delete-orphan'))
 
 class Docente(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(150), nullable=False)
     specialization = db.Column(db.String(150), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
     user = db.relationship('User', backref=db.backref('docente', uselist=False, cascade='all, delete-orphan'))
 
 class PersonalAdministrativo(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(150), nullable=False)
     role_description = db.Column(db.String(250), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
     user = db.relationship('User', backref=db.backref('admin', uselist=False, cascade='all, delete-orphan'))
 
 class Sinodal(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(150), nullable=False)
     specialization = db.Column(db.String(150), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
     user = db.relationship('User', backref=db.backref('sinodal', uselist=False, cascade='all, delete-orphan'))
 
 class Egresado(db.Model):
@@ -81,32 +281,38 @@ class Egresado(db.Model):
     boleta = db.Column(db.String(50), nullable=False)
     area = db.Column(db.String(150), nullable=False)
     generation = db.Column(db.String(50), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
     user = db.relationship('User', backref=db.backref('egresado', uselist=False, cascade='all, delete-orphan'))
 
+# Los índices de vigencia empiezan por end_date: las convocatorias abiertas o
+# próximas (end_date >= hoy) son un rango pequeño al final del índice
 class Convocatoria(db.Model):
+    __table_args__ = (db.Index('ix_convocatoria_vigencia', 'end_date', 'start_date'),)
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(150), nullable=False)
     description = db.Column(db.String(500), nullable=False)
-    start_date = db.Column(db.String(50), nullable=False)
-    end_date = db.Column(db.String(50), nullable=False)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=False)
 
 class InscripcionConvocatoria(db.Model):
+    # Un alumno se inscribe a lo más una vez en cada convocatoria
+    __table_args__ = (db.Index('ux_inscripcion_convocatoria_alumno_convocatoria', 'alumno_id', 'convocatoria_id', unique=True),)
     id = db.Column(db.Integer, primary_key=True)
-    convocatoria_id = db.Column(db.Integer, db.ForeignKey('convocatoria.id', ondelete='CASCADE'), nullable=False)
+    convocatoria_id = db.Column(db.Integer, db.ForeignKey('convocatoria.id', ondelete='CASCADE'), nullable=False, index=True)
     alumno_id = db.Column(db.Integer, db.ForeignKey('alumno.id', ondelete='CASCADE'), nullable=False)
     convocatoria = db.relationship('Convocatoria', backref=db.backref('inscripciones', cascade='all, delete-orphan'))
     alumno = db.relationship('Alumno', backref=db.backref('inscripciones', cascade='all, delete-orphan'))
 
 class CalendarioConvocatoria(db.Model):
+    __table_args__ = (db.Index('ix_calendario_convocatoria_vigencia', 'end_date', 'start_date'),)
     id = db.Column(db.Integer, primary_key=True)
-    start_date = db.Column(db.String(50), nullable=False)
-    end_date = db.Column(db.String(50), nullable=False)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=False)
     requirements = db.Column(db.String(500), nullable=False)
 
 class Seminario(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    date = db.Column(db.String(50), nullable=False)
+    date = db.Column(db.Date, nullable=False, index=True)
     topic = db.Column(db.String(150), nullable=False)
     speaker = db.Column(db.String(150), nullable=False)
 
@@ -117,118 +323,2792 @@ class TrabajoTitulacion(db.Model):
     authors = db.Column(db.String(150), nullable=False)
     summary = db.Column(db.String(500), nullable=False)
     keywords = db.Column(db.String(150), nullable=False)
-    status = db.Column(db.String(50), nullable=True)
+    # Estatus materializado, se actualiza en cada asignación y calificación
+    status = db.Column(db.String(50), nullable=True, default='Por asignar sinodales', index=True)
+    num_asignaciones = db.Column(db.Integer, nullable=False, default=0)
+    num_evaluaciones = db.Column(db.Integer, nullable=False, default=0)
+    suma_calificaciones = db.Column(db.Integer, nullable=False, default=0)
+    promedio = db.Column(db.Float, nullable=True)
+    # Firma MinHash de título, resumen y palabras clave (ver firma_minhash)
+    firma_minhash = db.Column(db.LargeBinary, nullable=True)
 
 class Evaluacion(db.Model):
+    __table_args__ = (db.Index('ix_evaluacion_thesis_sinodal', 'thesis_id', 'sinodal_id'),)
     id = db.Column(db.Integer, primary_key=True)
     thesis_id = db.Column(db.Integer, db.ForeignKey('trabajo_titulacion.id', ondelete='CASCADE'), nullable=False)
-    sinodal_id = db.Column(db.Integer, db.ForeignKey('sinodal.id', ondelete='CASCADE'), nullable=False)
+    sinodal_id = db.Column(db.Integer, db.ForeignKey('sinodal.id', ondelete='CASCADE'), nullable=False, index=True)
     grade = db.Column(db.Integer, nullable=False)
     comentario = db.Column(db.String(500), nullable=True)
     trabajo = db.relationship('TrabajoTitulacion', backref=db.backref('evaluaciones', cascade='all, delete-orphan'))
     sinodal = db.relationship('Sinodal', backref=db.backref('evaluaciones', cascade='all, delete-orphan'))
 
 class AsignacionSinodal(db.Model):
+    __table_args__ = (db.Index('ix_asignacion_sinodal_thesis_sinodal', 'thesis_id', 'sinodal_id'),)
     id = db.Column(db.Integer, primary_key=True)
     thesis_id = db.Column(db.Integer, db.ForeignKey('trabajo_titulacion.id', ondelete='CASCADE'), nullable=False)
-    sinodal_id = db.Column(db.Integer, db.ForeignKey('sinodal.id', ondelete='CASCADE'), nullable=False)
+    sinodal_id = db.Column(db.Integer, db.ForeignKey('sinodal.id', ondelete='CASCADE'), nullable=False, index=True)
     trabajo = db.relationship('TrabajoTitulacion', backref=db.backref('asignaciones', cascade='all, delete-orphan'))
     sinodal = db.relationship('Sinodal', backref=db.backref('asignaciones', cascade='all, delete-orphan'))
 
-# Crear la base de datos y las tablas
-with app.app_context():
-    db.create_all()
+# Bandas LSH de las firmas MinHash: dos tesis son candidatas a duplicado si
+# coinciden en al menos una banda
+class BandaSimilitud(db.Model):
+    __table_args__ = (db.Index('ix_banda_similitud_banda_hash', 'banda', 'hash'),)
+    id = db.Column(db.Integer, primary_key=True)
+    thesis_id = db.Column(db.Integer, db.ForeignKey('trabajo_titulacion.id', ondelete='CASCADE'), nullable=False, index=True)
+    banda = db.Column(db.SmallInteger, nullable=False)
+    hash = db.Column(db.Integer, nullable=False)
+
+# Secuencias persistentes; cada proceso reserva bloques de valores a la vez
+class SecuenciaIdentificador(db.Model):
+    nombre = db.Column(db.String(50), primary_key=True)
+    siguiente = db.Column(db.Integer, nullable=False, default=0)
+
+# Outbox de indexación: operaciones pendientes para el índice de Whoosh que se
+# escriben en la misma transacción que la tesis y se aplican en segundo plano
+class OperacionIndice(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    operacion = db.Column(db.String(10), nullable=False)
+    # Sin llave foránea: una operación 'delete' debe sobrevivir a la tesis
+    thesis_id = db.Column(db.Integer, nullable=False)
+    creada = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# Versión de cada tabla; se incrementa en cada commit que la modifica y
+# forma parte de la llave de la caché de páginas y del ETag
+class VersionTabla(db.Model):
+    tabla = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    modificada = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# Resúmenes para el tablero de coordinación: un contador por dimensión
+# (área, generación, convocatoria, sinodal, rol), clave y métrica. Las rutas
+# de escritura los incrementan en su misma transacción y los promedios se
+# derivan al leer; la etiqueta guarda el nombre a mostrar.
+class ResumenAnalitico(db.Model):
+    dimension = db.Column(db.String(20), primary_key=True)
+    clave = db.Column(db.String(150), primary_key=True)
+    metrica = db.Column(db.String(30), primary_key=True)
+    valor = db.Column(db.Integer, nullable=False, default=0)
+    etiqueta = db.Column(db.String(150), nullable=True)
+
+# Búsqueda de tesis en el índice de Whoosh
+CAMPOS_BUSQUEDA_TESIS = {'identifier': 4.0, 'title': 3.0, 'keywords': 2.0, 'authors': 1.5, 'summary': 1.0}
+CAMPOS_BUSQUEDA_GENERAL = ['title', 'content', 'authors', 'keywords', 'summary']
+TAMANO_PAGINA_BUSQUEDA = 20
+TAMANO_BLOQUE_INDEXACION = 500
+
+def documento_tesis(trabajo):
+    return dict(
+        clave=f'tesis:{trabajo.id}', tipo='tesis', thesis_id=trabajo.id, identifier=trabajo.identifier,
+        title=trabajo.title, authors=trabajo.authors, summary=trabajo.summary,
+        keywords=trabajo.keywords, content=trabajo.summary
+    )
+
+# Vuelve a indexar todas las tesis de la base de datos (reemplaza las existentes)
+def reindexar_tesis(writer):
+    total = 0
+    for trabajo in TrabajoTitulacion.query.yield_per(TAMANO_BLOQUE_INDEXACION):
+        writer.update_document(**documento_tesis(trabajo))
+        total += 1
+    return total
+
+# Documentos completos de las tesis. El texto se extrae página por página en
+# procesos aparte (ver documentos.py) y se escribe como pasajes en un archivo JSONL; el hilo de
+# indexación lo lee línea por línea, así que ningún proceso tiene el documento
+# entero en memoria.
+EXTENSIONES_DOCUMENTO = ('.txt', '.pdf')
+PASAJES_POR_TESIS = 3
+
+# Reemplaza los pasajes de una tesis con los del archivo JSONL (sin archivo
+# sólo los borra). Se llama con el writer del hilo de indexación. Los pasajes
+# no llevan el título para que una coincidencia en él no repita la tesis.
+def escribir_pasajes(writer, thesis_id, identifier=None, ruta=None):
+    writer.delete_by_query(Prefix('clave', f'pasaje:{thesis_id}:'))
+    if ruta is None:
+        return 0
+    total = 0
+    with open(ruta, encoding='utf-8') as entrada:
+        for total, linea in enumerate(entrada, 1):
+            pasaje = json.loads(linea)
+            writer.add_document(
+                clave=f'pasaje:{thesis_id}:{total}', tipo='pasaje', thesis_id=thesis_id, identifier=identifier,
+                pagina=pasaje['pagina'], content=pasaje['texto']
+            )
+    return total
+
+# Guarda el documento subido como <identificador>.<extensión> y reemplaza el
+# que hubiera con otra extensión
+def guardar_documento(archivo, identifier):
+    extension = os.path.splitext(archivo.filename or '')[1].lower()
+    if extension not in EXTENSIONES_DOCUMENTO:
+        raise ValueError(f'Formato de documento no soportado: {extension or "sin extensión"}')
+    directorio = current_app.config['DOCUMENTS_DIR']
+    os.makedirs(directorio, exist_ok=True)
+    for otra in EXTENSIONES_DOCUMENTO:
+        if otra != extension and os.path.exists(os.path.join(directorio, identifier + otra)):
+            os.remove(os.path.join(directorio, identifier + otra))
+    ruta = os.path.join(directorio, identifier + extension)
+    archivo.save(ruta)
+    return ruta
+
+def documentos_guardados():
+    directorio = current_app.config['DOCUMENTS_DIR']
+    if not os.path.isdir(directorio):
+        return
+    for entrada in os.scandir(directorio):
+        nombre, extension = os.path.splitext(entrada.name)
+        if entrada.is_file() and extension.lower() in EXTENSIONES_DOCUMENTO:
+            yield nombre, entrada.path
+
+# Pool de procesos para la extracción, creado de forma perezosa en cada proceso.
+# Usa spawn: los hijos no heredan los hilos ni las conexiones del padre.
+class ExtractorDocumentos:
+    def __init__(self, app):
+        self.app = app
+        self.candado = threading.Lock()
+        self.pool = None
+        self.pid = None
+
+    def obtener_pool(self):
+        with self.candado:
+            if self.pool is None or self.pid != os.getpid():
+                self.pool = ProcessPoolExecutor(self.app.config['INGEST_WORKERS'] or os.cpu_count(),
+                                                mp_context=multiprocessing.get_context('spawn'))
+                self.pid = os.getpid()
+            return self.pool
+
+    # Regresa el Future de la extracción y el archivo de pasajes que escribirá
+    def extraer(self, thesis_id, ruta):
+        directorio = os.path.join(self.app.config['DOCUMENTS_DIR'], '.pasajes')
+        os.makedirs(directorio, exist_ok=True)
+        destino = os.path.abspath(os.path.join(directorio, f'{thesis_id}.{uuid.uuid4().hex}.jsonl'))
+        # Los procesos del pool sólo importan documentos.py, no la aplicación
+        from documentos import extraer_documento
+        futuro = self.obtener_pool().submit(extraer_documento, os.path.abspath(ruta), destino, self.app.config['PASSAGE_WORDS'])
+        return futuro, destino
+
+    # Manda los pasajes extraídos a la cola de indexación; también se llama
+    # desde el hilo del pool, sin contexto de aplicación
+    def encolar(self, futuro, thesis_id, identifier, destino):
+        if futuro.exception() is not None:
+            self.app.logger.error('No se pudo extraer el documento de la tesis %s: %s', identifier, futuro.exception())
+            if os.path.exists(destino):
+                os.remove(destino)
+            return False
+        with self.app.app_context():
+            cola_indexacion.agregar('pasajes', dict(thesis_id=thesis_id, identifier=identifier, ruta=destino))
+        return True
+
+    # Extracción en segundo plano para una petición: no espera al pool
+    def enviar(self, thesis_id, identifier, ruta):
+        futuro, destino = self.extraer(thesis_id, ruta)
+        futuro.add_done_callback(functools.partial(self.encolar, thesis_id=thesis_id, identifier=identifier, destino=destino))
+        return futuro
+
+extractor_documentos = servicio('extractor_documentos')
+
+# Extrae en paralelo una serie de (identificador, ruta) y espera a que los
+# pasajes queden en el índice. Regresa un resumen de la ingesta.
+def ingerir_documentos(documentos, progreso=None):
+    resumen = {'documentos': 0, 'paginas': 0, 'pasajes': 0, 'errores': 0, 'sin_tesis': 0}
+    pendientes = {}
+    documentos = iter(documentos)
+    while True:
+        rutas = dict(itertools.islice(documentos, TAMANO_BLOQUE_INDEXACION))
+        if not rutas:
+            break
+        trabajos = db.session.execute(
+            select(TrabajoTitulacion.id, TrabajoTitulacion.identifier).where(TrabajoTitulacion.identifier.in_(list(rutas)))
+        )
+        encontrados = 0
+        for thesis_id, identifier in trabajos:
+            futuro, destino = extractor_documentos.extraer(thesis_id, rutas[identifier])
+            pendientes[futuro] = (thesis_id, identifier, destino)
+            encontrados += 1
+        resumen['sin_tesis'] += len(rutas) - encontrados
+    for futuro in as_completed(pendientes):
+        if extractor_documentos.encolar(futuro, *pendientes.pop(futuro)):
+            paginas, pasajes = futuro.result()
+            resumen['documentos'] += 1
+            resumen['paginas'] += paginas
+            resumen['pasajes'] += pasajes
+        else:
+            resumen['errores'] += 1
+        if progreso:
+            progreso(resumen)
+    cola_indexacion.esperar()
+    return resumen
+
+# Searchers de larga duración, uno por hilo, que sólo se renuevan cuando
+# cambia la generación del índice
+class SearchersCompartidos:
+    def __init__(self):
+        self.locales = threading.local()
+
+    def obtener(self):
+        searcher = getattr(self.locales, 'searcher', None)
+        if searcher is None or self.locales.pid != os.getpid():
+            searcher = index.searcher()
+        elif not searcher.up_to_date():
+            searcher = searcher.refresh()
+        self.locales.searcher = searcher
+        self.locales.pid = os.getpid()
+        return searcher
+
+searchers = servicio('searchers')
+
+# Caché LRU con vigencia (TTL) y tamaño acotado, local a cada proceso
+class CacheLRU:
+    def __init__(self, capacidad, ttl):
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self.entradas = OrderedDict()
+        self.candado = threading.Lock()
+        self.pid = os.getpid()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave):
+        ahora = time.monotonic()
+        with self.candado:
+            if self.pid != os.getpid():
+                # El contenido heredado por fork no se invalida desde este proceso
+                self.entradas.clear()
+                self.pid = os.getpid()
+            entrada = self.entradas.get(clave)
+            if entrada is not None and entrada[0] > ahora:
+                self.entradas.move_to_end(clave)
+                self.aciertos += 1
+                return entrada[1]
+            self.fallos += 1
+            return None
+
+    def guardar(self, clave, valor):
+        with self.candado:
+            self.entradas[clave] = (time.monotonic() + self.ttl(), valor)
+            self.entradas.move_to_end(clave)
+            while len(self.entradas) > self.capacidad():
+                self.entradas.popitem(last=False)
+
+    def invalidar(self, clave):
+        with self.candado:
+            self.entradas.pop(clave, None)
+
+    def limpiar(self):
+        with self.candado:
+            self.entradas.clear()
+
+    def estado(self):
+        return {'entradas': len(self.entradas), 'aciertos': self.aciertos, 'fallos': self.fallos}
+
+# Caché de resultados de búsqueda. Cada entrada está etiquetada con la
+# generación del índice, así que un commit la invalida.
+class CacheBusqueda(CacheLRU):
+    def __init__(self, app):
+        super().__init__(lambda: app.config['SEARCH_CACHE_SIZE'], lambda: app.config['SEARCH_CACHE_TTL'])
+        self.generacion = None
+
+    def obtener_o_calcular(self, clave, calcular):
+        generacion = index.latest_generation()
+        if generacion != self.generacion:
+            self.limpiar()
+            self.generacion = generacion
+        valor = self.obtener(clave)
+        if valor is None:
+            with medir('whoosh_busqueda'):
+                valor = calcular(searchers.obtener())
+            if generacion == self.generacion:
+                self.guardar(clave, valor)
+        return valor
+
+cache_busqueda = servicio('cache_busqueda')
+
+# Clave de caché: tipo de búsqueda, consulta con espacios normalizados, campos y página
+def clave_busqueda(tipo, consulta, campos, pagina=1):
+    return (tipo, ' '.join(consulta.split()), tuple(campos), pagina)
+
+# Regresa las tesis de una página de resultados ordenadas por relevancia y el total de coincidencias
+def buscar_tesis(consulta, pagina=1):
+    def calcular(searcher):
+        parser = MultifieldParser(list(CAMPOS_BUSQUEDA_TESIS), index.schema, fieldboosts=CAMPOS_BUSQUEDA_TESIS)
+        query = parser.parse(consulta)
+        if consulta.isdigit():
+            # Permite buscar por número parcial del identificador
+            query = Or([query, Prefix('identifier', consulta)])
+        resultados = searcher.search_page(query, pagina, pagelen=TAMANO_PAGINA_BUSQUEDA, filter=Term('tipo', 'tesis'))
+        return [r['thesis_id'] for r in resultados], resultados.total
+    ids, total = cache_busqueda.obtener_o_calcular(
+        clave_busqueda('tesis', consulta, CAMPOS_BUSQUEDA_TESIS, pagina), calcular
+    )
+    # Una sola consulta IN para hidratar las filas de la página
+    por_id = {t.id: t for t in TrabajoTitulacion.query.filter(TrabajoTitulacion.id.in_(ids))} if ids else {}
+    return [por_id[i] for i in ids if i in por_id], total
+
+# Búsqueda general en tesis, pasajes de documentos y formas de titulación
+def buscar_general(consulta):
+    def calcular(searcher):
+        query = MultifieldParser(CAMPOS_BUSQUEDA_GENERAL, index.schema).parse(consulta)
+        # Como máximo PASAJES_POR_TESIS resultados de la misma tesis
+        results = searcher.search(query, collapse=FieldFacet('thesis_id'), collapse_limit=PASAJES_POR_TESIS)
+        # Los pasajes no guardan el título; se toma de la tesis con una sola consulta
+        ids = {r['thesis_id'] for r in results if r['tipo'] == 'pasaje'}
+        titulos = dict(db.session.execute(
+            select(TrabajoTitulacion.id, TrabajoTitulacion.title).where(TrabajoTitulacion.id.in_(ids))
+        ).all()) if ids else {}
+        return [{
+            'title': r.get('title', titulos.get(r.get('thesis_id'))), 'identifier': r.get('identifier'),
+            'content': r['content'], 'tipo': r['tipo'], 'thesis_id': r.get('thesis_id'), 'pagina': r.get('pagina'),
+            'fragmento': r.highlights('content') or None
+        } for r in results]
+    return cache_busqueda.obtener_o_calcular(clave_busqueda('general', consulta, CAMPOS_BUSQUEDA_GENERAL), calcular)
+
+# Sugerencias para autocompletar: claves normalizadas en un arreglo ordenado y
+# búsqueda por prefijo con bisect. Cada palabra de un texto inicia una clave,
+# así que "neuro" también completa "Redes neuronales". Vive en la memoria de
+# cada proceso y no consulta SQLite ni Whoosh al responder.
+ORDEN_SUGERENCIA = {'identifier': 0, 'title': 1, 'authors': 2, 'keywords': 3}
+CANDIDATOS_POR_SUGERENCIA = 8
+
+def entradas_sugerencia(thesis_id, identifier, title, authors, keywords):
+    textos = [('identifier', identifier), ('title', title)]
+    textos += [('authors', autor) for autor in (authors or '').replace(';', ',').split(',')]
+    textos += [('keywords', palabra) for palabra in (keywords or '').split(',')]
+    for tipo, texto in textos:
+        texto = (texto or '').strip()
+        palabras = normalizar_texto(texto).split()
+        for i in range(len(palabras)):
+            # El último campo indica si la clave empieza al inicio del texto
+            yield ' '.join(palabras[i:]), (texto, tipo, thesis_id, identifier, i == 0)
+
+class IndiceSugerencias:
+    def __init__(self, app):
+        self.app = app
+        self.candado = threading.Lock()
+        # Claves y valores ordenados, más un búfer ordenado y pequeño con lo
+        # agregado después de construir; se reemplazan juntos en una sola tupla
+        self.datos = ([], [], [], [])
+        self.pid = None
+        self.construido = None
+        self.construyendo = False
+        # Entradas agregadas mientras se construye, que la consulta pudo no ver
+        self.durante = None
+
+    def asegurar(self):
+        if self.pid != os.getpid() or self.construido is None:
+            self.construir()
+        elif time.monotonic() - self.construido > self.app.config['SUGGEST_REFRESH'] and not self.construyendo:
+            self.construyendo = True
+            threading.Thread(target=self.reconstruir, name='sugerencias', daemon=True).start()
+
+    def reconstruir(self):
+        try:
+            with self.app.app_context():
+                self.construir()
+        except Exception:
+            self.app.logger.exception('No se pudo reconstruir el índice de sugerencias')
+        finally:
+            self.construyendo = False
+
+    def construir(self):
+        with self.candado:
+            self.durante = []
+        entradas = []
+        consulta = select(
+            TrabajoTitulacion.id, TrabajoTitulacion.identifier, TrabajoTitulacion.title,
+            TrabajoTitulacion.authors, TrabajoTitulacion.keywords
+        ).execution_options(yield_per=TAMANO_BLOQUE_INDEXACION)
+        for fila in db.session.execute(consulta):
+            entradas.extend(entradas_sugerencia(*fila))
+        with self.candado:
+            entradas.extend(self.durante)
+            self.durante = None
+            entradas.sort(key=lambda entrada: entrada[0])
+            self.datos = ([clave for clave, _ in entradas], [valor for _, valor in entradas], [], [])
+            self.construido = time.monotonic()
+            self.pid = os.getpid()
+        return len(entradas)
+
+    def agregar(self, thesis_id, identifier, title, authors, keywords):
+        nuevas = list(entradas_sugerencia(thesis_id, identifier, title, authors, keywords))
+        with self.candado:
+            if self.durante is not None:
+                self.durante.extend(nuevas)
+            if self.pid != os.getpid() or self.construido is None:
+                # Se verá cuando este proceso construya el índice
+                return
+            # Copia al escribir sólo del búfer; las lecturas concurrentes siguen con
+            # la tupla anterior. Al llenarse se funde con el arreglo principal en
+            # una pasada, una vez por lote y no en cada inserción.
+            claves, valores, claves_buffer, valores_buffer = self.datos
+            claves_buffer, valores_buffer = list(claves_buffer), list(valores_buffer)
+            for clave, valor in nuevas:
+                i = bisect.bisect_right(claves_buffer, clave)
+                claves_buffer.insert(i, clave)
+                valores_buffer.insert(i, valor)
+            if len(claves_buffer) < self.app.config['SUGGEST_BUFFER_SIZE']:
+                self.datos = (claves, valores, claves_buffer, valores_buffer)
+                return
+            entradas = list(heapq.merge(zip(claves, valores), zip(claves_buffer, valores_buffer), key=lambda e: e[0]))
+            self.datos = ([clave for clave, _ in entradas], [valor for _, valor in entradas], [], [])
+
+    # Obliga a reconstruir desde la base en la siguiente consulta
+    def invalidar(self):
+        with self.candado:
+            self.construido = None
+
+    def sugerir(self, prefijo, limite=10):
+        prefijo = normalizar_texto(prefijo)
+        if not prefijo:
+            return []
+        self.asegurar()
+        claves, valores, claves_buffer, valores_buffer = self.datos
+        candidatos = {}
+        for valor in itertools.chain(
+            con_prefijo(claves, valores, prefijo, limite * CANDIDATOS_POR_SUGERENCIA),
+            con_prefijo(claves_buffer, valores_buffer, prefijo, limite * CANDIDATOS_POR_SUGERENCIA),
+        ):
+            texto, tipo, thesis_id, identifier, al_inicio = valor
+            llave = (tipo, texto.lower())
+            if llave not in candidatos or (al_inicio and not candidatos[llave][4]):
+                candidatos[llave] = valor
+        # Primero lo que coincide desde el inicio del texto, luego por tipo y longitud
+        ordenados = sorted(
+            candidatos.values(), key=lambda v: (not v[4], ORDEN_SUGERENCIA[v[1]], len(v[0]), v[0])
+        )
+        return [
+            {'texto': texto, 'tipo': tipo, 'thesis_id': thesis_id, 'identifier': identifier}
+            for texto, tipo, thesis_id, identifier, _ in ordenados[:limite]
+        ]
+
+indice_sugerencias = servicio('indice_sugerencias')
+
+# Valores cuya clave empieza con el prefijo, a lo más `maximo`
+def con_prefijo(claves, valores, prefijo, maximo):
+    i = bisect.bisect_left(claves, prefijo)
+    fin = min(len(claves), i + maximo)
+    while i < fin and claves[i].startswith(prefijo):
+        yield valores[i]
+        i += 1
+
+# Detección de casi duplicados: firmas MinHash y bandas LSH (ver similitud.py)
+# guardadas en SQLite. El módulo se importa al usarse por primera vez.
+
+# Calcula y guarda firma y bandas de tesis ya insertadas; `ejecutor` es la
+# sesión o, en las migraciones, la conexión. filas: (id, title, summary, keywords)
+def indexar_similitud(filas, ejecutor=None):
+    from similitud import firma_minhash, codificar_firma, bandas_lsh
+    ejecutor = ejecutor or db.session
+    firmas, bandas = [], []
+    for thesis_id, title, summary, keywords in filas:
+        firma = firma_minhash(title, summary, keywords)
+        if firma is None:
+            continue
+        firmas.append({'b_id': thesis_id, 'b_firma': codificar_firma(firma)})
+        bandas += [{'thesis_id': thesis_id, 'banda': banda, 'hash': valor} for banda, valor in bandas_lsh(firma)]
+    if firmas:
+        tabla = TrabajoTitulacion.__table__
+        ejecutor.execute(
+            update(tabla).where(tabla.c.id == bindparam('b_id')).values(firma_minhash=bindparam('b_firma')), firmas
+        )
+        ejecutor.execute(insert(BandaSimilitud.__table__), bandas)
+    return len(firmas)
+
+# Tesis ya registradas que probablemente son casi duplicados del texto dado:
+# candidatos por bandas (índice sobre banda, hash) y verificación con la firma
+def buscar_similares(title, summary, keywords, umbral=None, excluir=None):
+    from similitud import firma_minhash, bandas_lsh, decodificar_firma, similitud_firmas
+    umbral = umbral or current_app.config['SIMILARITY_THRESHOLD']
+    firma = firma_minhash(title, summary, keywords)
+    if firma is None:
+        return []
+    candidatos = db.session.execute(
+        select(BandaSimilitud.thesis_id).distinct()
+        .where(tuple_(BandaSimilitud.banda, BandaSimilitud.hash).in_(bandas_lsh(firma)))
+    ).scalars().all()
+    similares = []
+    for i in range(0, len(candidatos), TAMANO_BLOQUE_INDEXACION):
+        for fila in db.session.execute(
+            select(TrabajoTitulacion.id, TrabajoTitulacion.identifier, TrabajoTitulacion.title, TrabajoTitulacion.firma_minhash)
+            .where(TrabajoTitulacion.id.in_(candidatos[i:i + TAMANO_BLOQUE_INDEXACION]))
+        ):
+            if fila.id == excluir or fila.firma_minhash is None:
+                continue
+            similitud = similitud_firmas(firma, decodificar_firma(fila.firma_minhash))
+            if similitud >= umbral:
+                similares.append((similitud, fila.id, fila.identifier, fila.title))
+    similares.sort(reverse=True)
+    return similares
+
+# Grupos de casi duplicados en todo el corpus: listas de (id, similitud máxima)
+def grupos_duplicados(umbral=None):
+    from similitud import grupos_similares
+    umbral = umbral or current_app.config['SIMILARITY_THRESHOLD']
+    ids, firmas = [], []
+    for fila in db.session.execute(
+        select(TrabajoTitulacion.id, TrabajoTitulacion.firma_minhash)
+        .where(TrabajoTitulacion.firma_minhash.is_not(None))
+        .execution_options(yield_per=TAMANO_BLOQUE_INDEXACION)
+    ):
+        ids.append(fila.id)
+        firmas.append(fila.firma_minhash)
+
+    def avisar(tamano, banda):
+        current_app.logger.info('Cubeta LSH de %d tesis en la banda %d; se parte con más bandas', tamano, banda)
+    return [[(ids[i], maxima) for i, maxima in grupo] for grupo in grupos_similares(firmas, umbral, avisar)]
+
+# Cola de indexación: agrupa los documentos en commits por lote desde un hilo
+# de fondo, para que las peticiones no esperen la E/S de Whoosh.
+class ColaIndexacion:
+    def __init__(self, app):
+        self.app = app
+        self.cola = queue.Queue()
+        self.candado = threading.Lock()
+        self.hilo = None
+        self.pid = None
+        self.ultimo_commit = None
+        self.ultima_latencia = None
+        self.ultimo_lote = 0
+        self.documentos_indexados = 0
+        self.documentos_fallidos = 0
+        self.intentos = {}
+
+    # Operaciones: ('update', documento), ('delete', clave) o ('pasajes', datos de escribir_pasajes)
+    def agregar(self, operacion, dato):
+        self.iniciar()
+        self.cola.put((operacion, dato))
+
+    def iniciar(self):
+        with self.candado:
+            if self.pid != os.getpid():
+                # Después de un fork el hilo del proceso padre no existe en el hijo
+                self.cola = queue.Queue()
+                self.hilo = None
+                self.pid = os.getpid()
+            if self.hilo is None or not self.hilo.is_alive():
+                self.hilo = threading.Thread(target=self.ejecutar, name='cola-indexacion', daemon=True)
+                self.hilo.start()
+
+    # Despierta al hilo para que aplique las operaciones pendientes del outbox
+    def notificar(self):
+        self.agregar('outbox', None)
+
+    def ejecutar(self):
+        atrasado = False
+        while True:
+            lote = self.recolectar(0 if atrasado else self.app.config['OUTBOX_POLL_INTERVAL'])
+            try:
+                with self.app.app_context():
+                    procesadas = self.procesar([item for item in lote if item[0] != 'outbox'])
+                atrasado = procesadas == self.app.config['INDEX_BATCH_SIZE']
+            except Exception:
+                self.app.logger.exception('No se pudo procesar el outbox de indexación')
+                atrasado = False
+            finally:
+                for _ in lote:
+                    self.cola.task_done()
+
+    def recolectar(self, espera):
+        try:
+            lote = [self.cola.get(timeout=espera)]
+        except queue.Empty:
+            return []
+        limite = time.monotonic() + self.app.config['INDEX_BATCH_WAIT']
+        while len(lote) < self.app.config['INDEX_BATCH_SIZE']:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(self.cola.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    # Escribe los documentos en memoria junto con un lote del outbox en un solo commit
+    # y borra del outbox las operaciones aplicadas. Regresa cuántas se tomaron del outbox.
+    def procesar(self, documentos, limite=None):
+        escritos = False
+        try:
+            operaciones, ids = leer_outbox(limite or self.app.config['INDEX_BATCH_SIZE'])
+            if not documentos and not operaciones:
+                return 0
+            escritos = self.escribir(documentos + operaciones)
+            if escritos and ids:
+                OperacionIndice.query.filter(OperacionIndice.id.in_(ids)).delete(synchronize_session=False)
+                db.session.commit()
+            return len(ids)
+        finally:
+            # Las operaciones del outbox siguen en la base; las que sólo están en
+            # memoria vuelven a la cola si el lote no llegó al índice
+            if escritos:
+                self.descartar(documentos)
+            else:
+                self.reencolar(documentos)
+
+    # Los archivos de pasajes sólo se necesitan hasta escribirlos
+    def descartar(self, documentos):
+        for operacion, dato in documentos:
+            self.intentos.pop(llave_operacion(operacion, dato), None)
+            if operacion == 'pasajes' and dato.get('ruta') and os.path.exists(dato['ruta']):
+                os.remove(dato['ruta'])
+
+    def reencolar(self, documentos):
+        limite = self.app.config['INDEX_REQUEUE_LIMIT']
+        descartados = []
+        for operacion, dato in documentos:
+            llave = llave_operacion(operacion, dato)
+            self.intentos[llave] = self.intentos.get(llave, 0) + 1
+            if self.intentos[llave] >= limite:
+                descartados.append((operacion, dato))
+            else:
+                self.cola.put((operacion, dato))
+        if descartados:
+            self.app.logger.error('Se descartaron %d documentos del índice después de %d lotes fallidos: %s',
+                                  len(descartados), limite, [llave_operacion(*d) for d in descartados])
+            self.descartar(descartados)
+
+    def escribir(self, lote):
+        espera = 0.05
+        for intento in range(self.app.config['INDEX_LOCK_RETRIES']):
+            inicio = time.perf_counter()
+            try:
+                writer = index.writer()
+            except LockError:
+                # Otro proceso tiene el candado del índice; reintentar con espera exponencial
+                time.sleep(espera)
+                espera = min(espera * 2, 2.0)
+                continue
+            # Los pasajes que se agregan no se ven al borrar dentro del mismo
+            # writer, así que de cada tesis sólo se escriben los más recientes
+            ultimos_pasajes = {dato['thesis_id']: i for i, (operacion, dato) in enumerate(lote) if operacion == 'pasajes'}
+            try:
+                for i, (operacion, dato) in enumerate(lote):
+                    if operacion == 'delete':
+                        writer.delete_by_term('clave', dato)
+                    elif operacion == 'pasajes':
+                        if ultimos_pasajes[dato['thesis_id']] == i:
+                            escribir_pasajes(writer, **dato)
+                    else:
+                        writer.update_document(**dato)
+                with medir('whoosh_commit'):
+                    writer.commit(mergetype=fusionar_por_niveles)
+            except Exception:
+                writer.cancel()
+                self.documentos_fallidos += len(lote)
+                self.app.logger.exception('No se pudo escribir un lote de %d documentos en el índice', len(lote))
+                return False
+            self.ultima_latencia = time.perf_counter() - inicio
+            self.ultimo_commit = time.time()
+            self.ultimo_lote = len(lote)
+            self.documentos_indexados += len(lote)
+            return True
+        # Las operaciones del outbox se conservan y se reintentan en el siguiente
+        # ciclo; procesar() regresa a la cola las que sólo están en memoria
+        self.documentos_fallidos += len(lote)
+        self.app.logger.error('Índice bloqueado; no se escribió un lote de %d documentos', len(lote))
+        return False
+
+    # Espera a que la cola se vacíe (para comandos y al terminar el proceso)
+    def esperar(self, timeout=None):
+        limite = None if timeout is None else time.monotonic() + timeout
+        while self.cola.unfinished_tasks and self.hilo is not None and self.hilo.is_alive():
+            if limite is not None and time.monotonic() >= limite:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def estado(self):
+        return {
+            'pendientes': self.cola.unfinished_tasks,
+            'ultimo_commit': self.ultimo_commit,
+            'ultima_latencia_ms': None if self.ultima_latencia is None else round(self.ultima_latencia * 1000, 3),
+            'ultimo_lote': self.ultimo_lote,
+            'documentos_indexados': self.documentos_indexados,
+            'documentos_fallidos': self.documentos_fallidos,
+        }
+
+cola_indexacion = servicio('cola_indexacion')
+
+def llave_operacion(operacion, dato):
+    if operacion == 'delete':
+        return dato
+    if operacion == 'pasajes':
+        return dato.get('ruta') or f'pasajes:{dato["thesis_id"]}'
+    return dato['clave']
+
+# Registra en la transacción actual una operación pendiente para el índice
+def encolar_indexacion(thesis_id, operacion='update'):
+    db.session.add(OperacionIndice(operacion=operacion, thesis_id=thesis_id))
+
+# Lee un lote del outbox en orden y lo convierte en operaciones del índice.
+# Sólo cuenta la última operación de cada tesis y el documento se arma con la
+# fila actual, así que aplicar el mismo lote dos veces da el mismo resultado.
+def leer_outbox(limite):
+    filas = OperacionIndice.query.order_by(OperacionIndice.id).limit(limite).all()
+    if not filas:
+        return [], []
+    ultima = {}
+    for fila in filas:
+        ultima[fila.thesis_id] = fila.operacion
+    trabajos = {t.id: t for t in TrabajoTitulacion.query.filter(TrabajoTitulacion.id.in_(list(ultima)))}
+    operaciones = []
+    for thesis_id, operacion in ultima.items():
+        trabajo = trabajos.get(thesis_id)
+        if operacion == 'delete' or trabajo is None:
+            operaciones.append(('delete', f'tesis:{thesis_id}'))
+            operaciones.append(('pasajes', {'thesis_id': thesis_id}))
+        else:
+            operaciones.append(('update', documento_tesis(trabajo)))
+    return operaciones, [fila.id for fila in filas]
+
+# Política de fusión por niveles: los segmentos se agrupan por orden de magnitud
+# de su número de documentos y un nivel se fusiona al juntar INDEX_MERGE_FACTOR segmentos.
+def niveles_a_fusionar(segments):
+    factor = current_app.config['INDEX_MERGE_FACTOR']
+    niveles = defaultdict(list)
+    for segment in segments:
+        niveles[int(math.log(max(segment.doc_count_all(), 1), factor))].append(segment)
+    return [grupo for grupo in niveles.values() if len(grupo) >= factor]
+
+def fusionar_por_niveles(writer, segments):
+    fusionados = set()
+    for grupo in niveles_a_fusionar(segments):
+        for segment in grupo:
+            reader = SegmentReader(writer.storage, writer.schema, segment)
+            writer.add_reader(reader)
+            reader.close()
+            fusionados.add(segment.segment_id())
+    return [segment for segment in segments if segment.segment_id() not in fusionados]
+
+def fusionar_segmentos():
+    if not niveles_a_fusionar(index._segments()):
+        return False
+    writer = index.writer()
+    writer.commit(mergetype=fusionar_por_niveles)
+    return True
+
+def optimizar_indice():
+    if len(index._segments()) <= 1:
+        return False
+    writer = index.writer()
+    writer.commit(optimize=True)
+    return True
+
+# Reconstruye el índice desde TrabajoTitulacion en un directorio lateral y lo
+# intercambia con un solo commit; las búsquedas ven el índice anterior hasta ese momento.
+def reconstruir_indice(directorio_lateral=None):
+    directorio_lateral = directorio_lateral or current_app.config['INDEX_DIR'] + '.rebuild'
+    shutil.rmtree(directorio_lateral, ignore_errors=True)
+    os.mkdir(directorio_lateral)
+    try:
+        nuevo = create_in(directorio_lateral, schema)
+        writer = nuevo.writer()
+        total = reindexar_tesis(writer)
+        # Las formas de titulación y los pasajes de los documentos sólo existen en el índice
+        with index.searcher() as searcher:
+            for tipo in ('titulacion', 'pasaje'):
+                for documento in searcher.documents(tipo=tipo):
+                    writer.add_document(**documento)
+                    total += 1
+        writer.commit(optimize=True)
+
+        writer = index.writer(timeout=60)
+        try:
+            with nuevo.reader() as lector:
+                claves = {documento['clave'] for documento in lector.all_stored_fields()}
+                writer.add_reader(lector)
+            # Documentos que llegaron al índice activo durante la construcción
+            with index.searcher() as searcher:
+                for documento in searcher.all_stored_fields():
+                    if documento.get('clave') not in claves:
+                        writer.add_document(**documento)
+                        total += 1
+            writer.commit(mergetype=CLEAR)
+        except Exception:
+            writer.cancel()
+            raise
+        nuevo.close()
+    finally:
+        shutil.rmtree(directorio_lateral, ignore_errors=True)
+    return total
+
+# Planificador de mantenimiento: fusiona segmentos periódicamente y optimiza
+# el índice una vez al día en la hora de baja actividad.
+class MantenimientoIndice:
+    def __init__(self, app):
+        self.app = app
+        self.candado = threading.Lock()
+        self.hilo = None
+        self.pid = None
+        self.ultima_optimizacion = None
+
+    def iniciar(self):
+        with self.candado:
+            if self.pid != os.getpid() or self.hilo is None or not self.hilo.is_alive():
+                self.pid = os.getpid()
+                self.hilo = threading.Thread(target=self.ejecutar, name='mantenimiento-indice', daemon=True)
+                self.hilo.start()
+
+    def ejecutar(self):
+        while True:
+            time.sleep(self.app.config['INDEX_MAINTENANCE_INTERVAL'])
+            self.ejecutar_ciclo()
+
+    def ejecutar_ciclo(self):
+        try:
+            ahora = datetime.now()
+            with self.app.app_context():
+                if ahora.hour == self.app.config['INDEX_OPTIMIZE_HOUR'] and self.ultima_optimizacion != ahora.date():
+                    optimizar_indice()
+                    self.ultima_optimizacion = ahora.date()
+                else:
+                    fusionar_segmentos()
+        except LockError:
+            # Otro proceso está escribiendo; se intenta en el siguiente ciclo
+            pass
+        except Exception:
+            self.app.logger.exception('Falló el mantenimiento del índice')
+
+mantenimiento_indice = servicio('mantenimiento_indice')
+
+# Los hilos de fondo se inician en cada proceso con su primera petición
+@bp.before_app_request
+def iniciar_hilos_indice():
+    cola_indexacion.iniciar()
+    if current_app.config['INDEX_MAINTENANCE']:
+        mantenimiento_indice.iniciar()
+    if current_app.config['ANALYTICS_RECONCILE']:
+        conciliador_resumenes.iniciar()
+
+# Asignación de identificadores de tesis. Los números salen de una secuencia
+# persistente en bloques por proceso y se pasan por una permutación biyectiva
+# del rango 100000-999999, así que no se repiten aunque haya varios procesos.
+BASE_IDENTIFICADORES = 100000
+ESPACIO_IDENTIFICADORES = 900000
+
+# Red de Feistel de 4 rondas sobre 20 bits con recorrido de ciclo para
+# quedarse dentro del espacio de identificadores
+def permutar_identificador(numero):
+    llave = current_app.config['IDENTIFIER_KEY'].encode()
+    while True:
+        izquierda, derecha = numero >> 10, numero & 0x3FF
+        for ronda in range(4):
+            mezcla = zlib.crc32(llave + bytes([ronda]) + derecha.to_bytes(2, 'big')) & 0x3FF
+            izquierda, derecha = derecha, izquierda ^ mezcla
+        numero = (izquierda << 10) | derecha
+        if numero < ESPACIO_IDENTIFICADORES:
+            return numero
+
+class AsignadorIdentificadores:
+    def __init__(self, secuencia='tesis'):
+        self.secuencia = secuencia
+        self.candado = threading.Lock()
+        self.pendientes = deque()
+        self.pid = None
+
+    # Reserva un bloque en una transacción corta con su propia conexión;
+    # debe llamarse fuera de una transacción de escritura de la sesión.
+    def reservar(self, tamano):
+        with db.engine.begin() as conexion:
+            fin = conexion.execute(
+                update(SecuenciaIdentificador)
+                .where(SecuenciaIdentificador.nombre == self.secuencia)
+                .values(siguiente=SecuenciaIdentificador.siguiente + tamano)
+                .returning(SecuenciaIdentificador.siguiente)
+            ).scalar()
+            if fin is None:
+                raise RuntimeError(f'No existe la secuencia {self.secuencia}')
+        inicio = fin - tamano
+        if inicio >= ESPACIO_IDENTIFICADORES:
+            raise RuntimeError('Se agotaron los identificadores de tesis')
+        candidatos = [
+            str(BASE_IDENTIFICADORES + permutar_identificador(n))
+            for n in range(inicio, min(fin, ESPACIO_IDENTIFICADORES))
+        ]
+        # Una consulta por bloque descarta los identificadores aleatorios anteriores a la secuencia
+        usados = {i for (i,) in db.session.query(TrabajoTitulacion.identifier).filter(TrabajoTitulacion.identifier.in_(candidatos))}
+        self.pendientes.extend(c for c in candidatos if c not in usados)
+
+    def tomar(self, cantidad=1):
+        with self.candado:
+            if self.pid != os.getpid():
+                # Un bloque heredado por fork también lo tiene el proceso padre
+                self.pendientes.clear()
+                self.pid = os.getpid()
+            while len(self.pendientes) < cantidad:
+                self.reservar(max(current_app.config['IDENTIFIER_BLOCK_SIZE'], cantidad - len(self.pendientes)))
+            return [self.pendientes.popleft() for _ in range(cantidad)]
+
+    def siguiente(self):
+        return self.tomar(1)[0]
+
+asignador_identificadores = servicio('asignador_identificadores')
+
+# Motor de estatus de titulación
+SINODALES_REQUERIDOS = 3
+CALIFICACION_APROBATORIA = 8
+
+EstatusTesis = namedtuple('EstatusTesis', ['asignaciones', 'evaluaciones', 'suma', 'promedio', 'estatus'])
+
+def derivar_estatus(asignaciones, evaluaciones, promedio):
+    # Única definición de la regla de estatus de una tesis
+    if asignaciones < SINODALES_REQUERIDOS:
+        return 'Por asignar sinodales'
+    if evaluaciones < SINODALES_REQUERIDOS:
+        return 'Calificando'
+    if promedio >= CALIFICACION_APROBATORIA:
+        return 'Aprobado'
+    return 'Reprobado'
+
+# Calcula el estatus de varias tesis con una sola consulta agregada.
+# Regresa {thesis_id: EstatusTesis}; sin `thesis_ids` calcula todas las tesis.
+def calcular_estatus(thesis_ids=None, sesion=None):
+    sesion = sesion or db.session
+    asignaciones = sesion.query(
+        AsignacionSinodal.thesis_id.label('thesis_id'),
+        func.count(AsignacionSinodal.id).label('total')
+    )
+    evaluaciones = sesion.query(
+        Evaluacion.thesis_id.label('thesis_id'),
+        func.count(Evaluacion.id).label('total'),
+        func.sum(Evaluacion.grade).label('suma'),
+        func.avg(Evaluacion.grade).label('promedio')
+    )
+    tesis = sesion.query(TrabajoTitulacion.id)
+    if thesis_ids is not None:
+        thesis_ids = list(thesis_ids)
+        if not thesis_ids:
+            return {}
+        asignaciones = asignaciones.filter(AsignacionSinodal.thesis_id.in_(thesis_ids))
+        evaluaciones = evaluaciones.filter(Evaluacion.thesis_id.in_(thesis_ids))
+        tesis = tesis.filter(TrabajoTitulacion.id.in_(thesis_ids))
+    asignaciones = asignaciones.group_by(AsignacionSinodal.thesis_id).subquery()
+    evaluaciones = evaluaciones.group_by(Evaluacion.thesis_id).subquery()
+    filas = tesis.add_columns(
+        func.coalesce(asignaciones.c.total, 0),
+        func.coalesce(evaluaciones.c.total, 0),
+        func.coalesce(evaluaciones.c.suma, 0),
+        evaluaciones.c.promedio
+    ).outerjoin(
+        asignaciones, asignaciones.c.thesis_id == TrabajoTitulacion.id
+    ).outerjoin(
+        evaluaciones, evaluaciones.c.thesis_id == TrabajoTitulacion.id
+    ).all()
+    resultado = {}
+    for thesis_id, num_asignaciones, num_evaluaciones, suma, promedio in filas:
+        resultado[thesis_id] = EstatusTesis(
+            num_asignaciones, num_evaluaciones, suma, promedio,
+            derivar_estatus(num_asignaciones, num_evaluaciones, promedio)
+        )
+    return resultado
+
+# Actualiza el estatus materializado de una tesis dentro de la transacción
+# en curso; el llamador hace el commit junto con la asignación o evaluación.
+def registrar_cambio_estatus(thesis_id, asignaciones=0, calificacion=None):
+    thesis = db.session.get(TrabajoTitulacion, thesis_id)
+    # Los incrementos se hacen en SQL para no perder escrituras concurrentes
+    if asignaciones:
+        thesis.num_asignaciones = TrabajoTitulacion.num_asignaciones + asignaciones
+    if calificacion is not None:
+        thesis.num_evaluaciones = TrabajoTitulacion.num_evaluaciones + 1
+        thesis.suma_calificaciones = TrabajoTitulacion.suma_calificaciones + calificacion
+    db.session.flush()
+    if thesis.num_evaluaciones:
+        thesis.promedio = thesis.suma_calificaciones / thesis.num_evaluaciones
+    thesis.status = derivar_estatus(thesis.num_asignaciones, thesis.num_evaluaciones, thesis.promedio)
+    return thesis
+
+# Recalcula desde cero el estatus materializado (todas las tesis si se omite `thesis_ids`)
+def recalcular_estatus(thesis_ids=None, sesion=None):
+    sesion = sesion or db.session
+    valores = [
+        {
+            'id': thesis_id,
+            'num_asignaciones': e.asignaciones,
+            'num_evaluaciones': e.evaluaciones,
+            'suma_calificaciones': e.suma,
+            'promedio': e.promedio,
+            'status': e.estatus,
+        }
+        for thesis_id, e in calcular_estatus(thesis_ids, sesion).items()
+    ]
+    if valores:
+        sesion.execute(update(TrabajoTitulacion), valores)
+    return len(valores)
+
+# Compara el estatus materializado contra un recálculo completo
+def verificar_estatus():
+    esperado = calcular_estatus()
+    diferencias = []
+    for thesis in db.session.query(
+        TrabajoTitulacion.id, TrabajoTitulacion.num_asignaciones, TrabajoTitulacion.num_evaluaciones,
+        TrabajoTitulacion.suma_calificaciones, TrabajoTitulacion.status
+    ):
+        e = esperado[thesis.id]
+        guardado = (thesis.num_asignaciones, thesis.num_evaluaciones, thesis.suma_calificaciones, thesis.status)
+        if guardado != (e.asignaciones, e.evaluaciones, e.suma, e.estatus):
+            diferencias.append((thesis.id, guardado, e))
+    return diferencias
+
+# Resúmenes analíticos. Los incrementos son un Counter con llaves
+# (dimensión, clave, métrica) y se escriben con un solo upsert que suma al
+# valor guardado. La conciliación los recalcula desde las tablas base.
+METRICAS_SINODAL = ('tesis', 'evaluaciones', 'suma_calificaciones', 'pendientes')
+# Fila con el día (ordinal) de la última conciliación; no se muestra en el tablero
+MARCA_CONCILIACION = ('sistema', 'conciliacion', 'dia')
+
+def sentencia_resumen(incrementos, etiquetas=None):
+    etiquetas = etiquetas or {}
+    sentencia = insert_sqlite(ResumenAnalitico).values([
+        {'dimension': dimension, 'clave': str(clave), 'metrica': metrica, 'valor': valor,
+         'etiqueta': etiquetas.get((dimension, clave))}
+        for (dimension, clave, metrica), valor in incrementos.items()
+    ])
+    return sentencia.on_conflict_do_update(
+        index_elements=['dimension', 'clave', 'metrica'],
+        set_={'valor': ResumenAnalitico.valor + sentencia.excluded.valor,
+              'etiqueta': func.coalesce(sentencia.excluded.etiqueta, ResumenAnalitico.etiqueta)}
+    )
+
+# Aplica los incrementos en la transacción del llamador (sesión o conexión)
+def acumular_resumen(incrementos, etiquetas=None, ejecutor=None):
+    if incrementos:
+        (ejecutor or db.session).execute(sentencia_resumen(incrementos, etiquetas))
+
+# Incrementos por el alta de usuarios de un rol; cada perfil es un dict con
+# los campos del modelo (y el id en el caso de los sinodales)
+def resumen_perfiles(rol, perfiles):
+    incrementos, etiquetas = Counter(), {}
+    for perfil in perfiles:
+        incrementos['rol', rol, 'usuarios'] += 1
+        if rol == 'student':
+            incrementos['area', perfil['area'], 'alumnos'] += 1
+        elif rol == 'egresado':
+            incrementos['generacion', perfil['generation'], 'egresados'] += 1
+        elif rol == 'sinodal':
+            # Filas en cero para que el sinodal aparezca antes de su primera asignación
+            for metrica in METRICAS_SINODAL:
+                incrementos['sinodal', perfil['id'], metrica] += 0
+            etiquetas['sinodal', perfil['id']] = perfil['name']
+    return incrementos, etiquetas
+
+# Incrementos por nuevas asignaciones (thesis_id, sinodal_id). Una asignación
+# queda pendiente mientras el sinodal no haya calificado esa tesis. Se llama
+# antes de insertar las asignaciones.
+def resumen_asignaciones(pares):
+    incrementos = Counter()
+    if not pares:
+        return incrementos
+    calificadas = set()
+    for i in range(0, len(pares), TAMANO_BLOQUE_INDEXACION):
+        calificadas.update((fila.thesis_id, fila.sinodal_id) for fila in db.session.execute(
+            select(Evaluacion.thesis_id, Evaluacion.sinodal_id).distinct()
+            .where(tuple_(Evaluacion.thesis_id, Evaluacion.sinodal_id).in_(pares[i:i + TAMANO_BLOQUE_INDEXACION]))
+        ))
+    for thesis_id, sinodal_id in pares:
+        incrementos['sinodal', sinodal_id, 'tesis'] += 1
+        if (thesis_id, sinodal_id) not in calificadas:
+            incrementos['sinodal', sinodal_id, 'pendientes'] += 1
+    return incrementos
+
+# Incrementos por una evaluación nueva; se llama antes de agregarla a la sesión.
+# La primera calificación del sinodal a una tesis cierra sus asignaciones pendientes.
+def resumen_evaluacion(thesis_id, sinodal_id, grade):
+    incrementos = Counter()
+    incrementos['sinodal', sinodal_id, 'evaluaciones'] += 1
+    incrementos['sinodal', sinodal_id, 'suma_calificaciones'] += grade
+    previa = db.session.query(Evaluacion.id).filter_by(thesis_id=thesis_id, sinodal_id=sinodal_id).first()
+    if previa is None:
+        asignadas = db.session.query(func.count(AsignacionSinodal.id)).filter_by(
+            thesis_id=thesis_id, sinodal_id=sinodal_id
+        ).scalar()
+        incrementos['sinodal', sinodal_id, 'pendientes'] -= asignadas
+    return incrementos
+
+# Descuenta a un usuario que se va a borrar junto con sus registros en cascada
+def descontar_usuario(user):
+    incrementos = Counter()
+    incrementos['rol', user.role, 'usuarios'] -= 1
+    if user.alumno:
+        incrementos['area', user.alumno.area, 'alumnos'] -= 1
+        for inscripcion in user.alumno.inscripciones:
+            incrementos['area', user.alumno.area, 'inscripciones'] -= 1
+            incrementos['convocatoria', inscripcion.convocatoria_id, 'inscripciones'] -= 1
+    if user.egresado:
+        incrementos['generacion', user.egresado.generation, 'egresados'] -= 1
+    if user.sinodal:
+        db.session.execute(ResumenAnalitico.__table__.delete().where(
+            ResumenAnalitico.dimension == 'sinodal', ResumenAnalitico.clave == str(user.sinodal.id)
+        ))
+    acumular_resumen(incrementos)
+
+# Recalcula todos los resúmenes desde las tablas base con consultas agregadas.
+# Regresa (valores, etiquetas) con las mismas llaves que los incrementos.
+def calcular_resumenes(ejecutor=None):
+    ejecutor = ejecutor or db.session
+    valores, etiquetas = Counter(), {}
+    for rol, total in ejecutor.execute(select(User.role, func.count(User.id)).group_by(User.role)):
+        valores['rol', rol, 'usuarios'] = total
+    valores['global', 'tesis', 'registradas'] = ejecutor.execute(select(func.count(TrabajoTitulacion.id))).scalar()
+    for area, total in ejecutor.execute(select(Alumno.area, func.count(Alumno.id)).group_by(Alumno.area)):
+        valores['area', area, 'alumnos'] = total
+    for area, total in ejecutor.execute(
+        select(Alumno.area, func.count(InscripcionConvocatoria.id))
+        .join(InscripcionConvocatoria, InscripcionConvocatoria.alumno_id == Alumno.id).group_by(Alumno.area)
+    ):
+        valores['area', area, 'inscripciones'] = total
+    for generacion, total in ejecutor.execute(select(Egresado.generation, func.count(Egresado.id)).group_by(Egresado.generation)):
+        valores['generacion', generacion, 'egresados'] = total
+    inscripciones = select(
+        InscripcionConvocatoria.convocatoria_id.label('id'), func.count().label('total')
+    ).group_by(InscripcionConvocatoria.convocatoria_id).subquery()
+    for convocatoria_id, title, total in ejecutor.execute(
+        select(Convocatoria.id, Convocatoria.title, func.coalesce(inscripciones.c.total, 0))
+        .outerjoin(inscripciones, inscripciones.c.id == Convocatoria.id)
+    ):
+        valores['convocatoria', convocatoria_id, 'inscripciones'] = total
+        etiquetas['convocatoria', convocatoria_id] = title
+    asignaciones = select(
+        AsignacionSinodal.sinodal_id.label('id'), func.count().label('total')
+    ).group_by(AsignacionSinodal.sinodal_id).subquery()
+    evaluaciones = select(
+        Evaluacion.sinodal_id.label('id'), func.count().label('total'), func.sum(Evaluacion.grade).label('suma')
+    ).group_by(Evaluacion.sinodal_id).subquery()
+    calificada = select(Evaluacion.id).where(
+        Evaluacion.thesis_id == AsignacionSinodal.thesis_id, Evaluacion.sinodal_id == AsignacionSinodal.sinodal_id
+    ).exists()
+    pendientes = select(
+        AsignacionSinodal.sinodal_id.label('id'), func.count().label('total')
+    ).where(~calificada).group_by(AsignacionSinodal.sinodal_id).subquery()
+    for fila in ejecutor.execute(
+        select(Sinodal.id, Sinodal.name, func.coalesce(asignaciones.c.total, 0), func.coalesce(evaluaciones.c.total, 0),
+               func.coalesce(evaluaciones.c.suma, 0), func.coalesce(pendientes.c.total, 0))
+        .outerjoin(asignaciones, asignaciones.c.id == Sinodal.id)
+        .outerjoin(evaluaciones, evaluaciones.c.id == Sinodal.id)
+        .outerjoin(pendientes, pendientes.c.id == Sinodal.id)
+    ):
+        for metrica, valor in zip(METRICAS_SINODAL, fila[2:]):
+            valores['sinodal', fila[0], metrica] = valor
+        etiquetas['sinodal', fila[0]] = fila[1]
+    return valores, etiquetas
+
+# Deja los resúmenes guardados igual que un recálculo completo. Regresa las
+# diferencias encontradas como (llave, guardado, esperado); un contador que
+# falta cuenta como cero.
+def conciliar(ejecutor=None):
+    ejecutor = ejecutor or db.session
+    esperados, etiquetas = calcular_resumenes(ejecutor)
+    esperados = {(d, str(c), m): v for (d, c, m), v in esperados.items()}
+    etiquetas = {(d, str(c)): e for (d, c), e in etiquetas.items()}
+    guardados = {}
+    for fila in ejecutor.execute(select(
+        ResumenAnalitico.dimension, ResumenAnalitico.clave, ResumenAnalitico.metrica,
+        ResumenAnalitico.valor, ResumenAnalitico.etiqueta
+    ).where(ResumenAnalitico.dimension != MARCA_CONCILIACION[0])):
+        guardados[fila.dimension, fila.clave, fila.metrica] = (fila.valor, fila.etiqueta)
+    diferencias = [
+        (llave, guardados.get(llave, (0, None))[0], esperados.get(llave, 0))
+        for llave in sorted(set(esperados) | set(guardados))
+        if guardados.get(llave, (0, None))[0] != esperados.get(llave, 0)
+    ]
+    sobrantes = [llave for llave in guardados if llave not in esperados]
+    for i in range(0, len(sobrantes), TAMANO_BLOQUE_INDEXACION):
+        ejecutor.execute(ResumenAnalitico.__table__.delete().where(tuple_(
+            ResumenAnalitico.dimension, ResumenAnalitico.clave, ResumenAnalitico.metrica
+        ).in_(sobrantes[i:i + TAMANO_BLOQUE_INDEXACION])))
+    cambios = [
+        llave for llave, valor in esperados.items()
+        if guardados.get(llave) != (valor, etiquetas.get(llave[:2]))
+    ]
+    for i in range(0, len(cambios), TAMANO_BLOQUE_INDEXACION):
+        sentencia = insert_sqlite(ResumenAnalitico).values([
+            {'dimension': d, 'clave': c, 'metrica': m, 'valor': esperados[d, c, m], 'etiqueta': etiquetas.get((d, c))}
+            for d, c, m in cambios[i:i + TAMANO_BLOQUE_INDEXACION]
+        ])
+        ejecutor.execute(sentencia.on_conflict_do_update(
+            index_elements=['dimension', 'clave', 'metrica'],
+            set_={'valor': sentencia.excluded.valor, 'etiqueta': sentencia.excluded.etiqueta}
+        ))
+    return diferencias
+
+# Conciliación diaria. La primera sentencia escribe la marca del día, así que
+# la transacción toma el candado de escritura de SQLite antes de leer y ningún
+# incremento concurrente se pierde; si otro proceso ya concilió hoy no hace nada.
+# Regresa las diferencias corregidas o None si se omitió.
+def conciliar_resumenes(forzar=False):
+    hoy = date.today().toordinal()
+    dimension, clave, metrica = MARCA_CONCILIACION
+    sentencia = insert_sqlite(ResumenAnalitico).values(dimension=dimension, clave=clave, metrica=metrica, valor=hoy)
+    sentencia = sentencia.on_conflict_do_update(
+        index_elements=['dimension', 'clave', 'metrica'], set_={'valor': hoy},
+        where=None if forzar else ResumenAnalitico.valor < hoy
+    )
+    try:
+        if db.session.execute(sentencia).rowcount == 0:
+            db.session.rollback()
+            return None
+        diferencias = conciliar()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    if diferencias:
+        current_app.logger.warning('Conciliación de resúmenes: %d contadores corregidos', len(diferencias))
+    return diferencias
+
+# Tablero: lee sólo la tabla de resúmenes (una fila por grupo, sin recorrer
+# inscripciones, asignaciones ni evaluaciones)
+def leer_resumenes():
+    grupos = defaultdict(dict)
+    etiquetas = {}
+    conciliado = None
+    for fila in db.session.execute(select(
+        ResumenAnalitico.dimension, ResumenAnalitico.clave, ResumenAnalitico.metrica,
+        ResumenAnalitico.valor, ResumenAnalitico.etiqueta
+    )):
+        if (fila.dimension, fila.clave, fila.metrica) == MARCA_CONCILIACION:
+            conciliado = date.fromordinal(fila.valor).isoformat()
+            continue
+        grupos[fila.dimension, fila.clave][fila.metrica] = fila.valor
+        if fila.etiqueta is not None:
+            etiquetas[fila.dimension, fila.clave] = fila.etiqueta
+
+    def de(dimension):
+        return sorted((clave, metricas) for (d, clave), metricas in grupos.items() if d == dimension)
+
+    def promedio(suma, total):
+        return round(suma / total, 2) if total else None
+
+    return {
+        'usuarios': {rol: m.get('usuarios', 0) for rol, m in de('rol')},
+        'tesis': grupos.get(('global', 'tesis'), {}).get('registradas', 0),
+        'areas': [
+            {'area': area, 'alumnos': m.get('alumnos', 0), 'inscripciones': m.get('inscripciones', 0),
+             'inscripciones_por_alumno': promedio(m.get('inscripciones', 0), m.get('alumnos', 0))}
+            for area, m in de('area')
+        ],
+        'generaciones': [{'generacion': generacion, 'egresados': m.get('egresados', 0)} for generacion, m in de('generacion')],
+        'convocatorias': sorted((
+            {'id': int(clave), 'title': etiquetas.get(('convocatoria', clave)), 'inscripciones': m.get('inscripciones', 0)}
+            for clave, m in de('convocatoria')
+        ), key=lambda c: c['id']),
+        'sinodales': sorted((
+            {'id': int(clave), 'name': etiquetas.get(('sinodal', clave)), 'tesis': m.get('tesis', 0),
+             'evaluaciones': m.get('evaluaciones', 0), 'pendientes': m.get('pendientes', 0),
+             'promedio': promedio(m.get('suma_calificaciones', 0), m.get('evaluaciones', 0))}
+            for clave, m in de('sinodal')
+        ), key=lambda s: (-s['pendientes'], -s['tesis'], s['id'])),
+        'conciliado': conciliado,
+    }
+
+# Planificador de la conciliación: revisa cada ANALYTICS_RECONCILE_INTERVAL
+# segundos y concilia una vez al día a la hora indicada
+class ConciliadorResumenes:
+    def __init__(self, app):
+        self.app = app
+        self.candado = threading.Lock()
+        self.hilo = None
+        self.pid = None
+
+    def iniciar(self):
+        with self.candado:
+            if self.pid != os.getpid() or self.hilo is None or not self.hilo.is_alive():
+                self.pid = os.getpid()
+                self.hilo = threading.Thread(target=self.ejecutar, name='conciliador-resumenes', daemon=True)
+                self.hilo.start()
+
+    def ejecutar(self):
+        while True:
+            time.sleep(self.app.config['ANALYTICS_RECONCILE_INTERVAL'])
+            self.ejecutar_ciclo()
+
+    def ejecutar_ciclo(self):
+        if datetime.now().hour != self.app.config['ANALYTICS_RECONCILE_HOUR']:
+            return
+        try:
+            with self.app.app_context():
+                conciliar_resumenes()
+        except OperationalError:
+            # Base bloqueada por otro escritor; se intenta en el siguiente ciclo
+            pass
+        except Exception:
+            self.app.logger.exception('Falló la conciliación de los resúmenes')
+
+conciliador_resumenes = servicio('conciliador_resumenes')
+
+# Asignación automática de sinodales: se cargan las tesis incompletas, los
+# sinodales y su carga, y el plan se resuelve como un flujo de costo mínimo
+# (ver asignacion.py)
+def planear_asignaciones(carga_maxima=None):
+    from asignacion import planear
+    carga_maxima = carga_maxima or current_app.config['SINODAL_MAX_LOAD']
+    pendientes = db.session.execute(
+        select(TrabajoTitulacion.id, TrabajoTitulacion.keywords, TrabajoTitulacion.num_asignaciones)
+        .where(TrabajoTitulacion.num_asignaciones < SINODALES_REQUERIDOS)
+        .order_by(TrabajoTitulacion.id)
+    ).all()
+    sinodales = db.session.execute(select(Sinodal.id, Sinodal.specialization).order_by(Sinodal.id)).all()
+    # La carga sólo cuenta las tesis que aún no terminan de calificarse
+    carga = defaultdict(int, db.session.execute(
+        select(AsignacionSinodal.sinodal_id, func.count())
+        .join(TrabajoTitulacion, TrabajoTitulacion.id == AsignacionSinodal.thesis_id)
+        .where(TrabajoTitulacion.status.in_(['Por asignar sinodales', 'Calificando']))
+        .group_by(AsignacionSinodal.sinodal_id)
+    ).all())
+    asignados = defaultdict(set)
+    ids_pendientes = [t.id for t in pendientes]
+    for i in range(0, len(ids_pendientes), TAMANO_BLOQUE_INDEXACION):
+        for thesis_id, sinodal_id in db.session.execute(
+            select(AsignacionSinodal.thesis_id, AsignacionSinodal.sinodal_id)
+            .where(AsignacionSinodal.thesis_id.in_(ids_pendientes[i:i + TAMANO_BLOQUE_INDEXACION]))
+        ):
+            asignados[thesis_id].add(sinodal_id)
+    return planear(pendientes, sinodales, carga, asignados, carga_maxima, SINODALES_REQUERIDOS)
+
+# Guarda el plan con una sola inserción masiva y actualiza el estatus materializado
+def aplicar_asignaciones(plan):
+    if plan.asignaciones:
+        acumular_resumen(resumen_asignaciones([(thesis_id, sinodal_id) for thesis_id, sinodal_id, _ in plan.asignaciones]))
+        db.session.execute(insert(AsignacionSinodal), [
+            {'thesis_id': thesis_id, 'sinodal_id': sinodal_id} for thesis_id, sinodal_id, _ in plan.asignaciones
+        ])
+        recalcular_estatus({thesis_id for thesis_id, _, _ in plan.asignaciones})
+    db.session.commit()
+
+# Columnas agregadas a tablas que ya existían en bases de datos anteriores
+COLUMNAS_NUEVAS = {
+    'trabajo_titulacion': [
+        ('status', 'VARCHAR(50)'),
+        ('num_asignaciones', 'INTEGER NOT NULL DEFAULT 0'),
+        ('num_evaluaciones', 'INTEGER NOT NULL DEFAULT 0'),
+        ('suma_calificaciones', 'INTEGER NOT NULL DEFAULT 0'),
+        ('promedio', 'FLOAT'),
+    ],
+}
+
+# Migraciones versionadas del esquema. La versión aplicada se guarda en
+# PRAGMA user_version y cada migración corre en su propia transacción.
+MIGRACIONES = []
+
+def migracion(version, descripcion):
+    def registrar(funcion):
+        MIGRACIONES.append((version, descripcion, funcion))
+        return funcion
+    return registrar
+
+# Tablas tal como estaban antes de las migraciones versionadas. Cada migración
+# lleva su propio DDL fijo para que no dependa de cómo estén hoy los modelos.
+ESQUEMA_BASE = (
+    """CREATE TABLE IF NOT EXISTS user (
+        id INTEGER NOT NULL,
+        username VARCHAR(150) NOT NULL,
+        password VARCHAR(150) NOT NULL,
+        role VARCHAR(50) NOT NULL,
+        PRIMARY KEY (id),
+        UNIQUE (username)
+    )""",
+    """CREATE TABLE IF NOT EXISTS convocatoria (
+        id INTEGER NOT NULL,
+        title VARCHAR(150) NOT NULL,
+        description VARCHAR(500) NOT NULL,
+        start_date VARCHAR(50) NOT NULL,
+        end_date VARCHAR(50) NOT NULL,
+        PRIMARY KEY (id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS calendario_convocatoria (
+        id INTEGER NOT NULL,
+        start_date VARCHAR(50) NOT NULL,
+        end_date VARCHAR(50) NOT NULL,
+        requirements VARCHAR(500) NOT NULL,
+        PRIMARY KEY (id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS seminario (
+        id INTEGER NOT NULL,
+        date VARCHAR(50) NOT NULL,
+        topic VARCHAR(150) NOT NULL,
+        speaker VARCHAR(150) NOT NULL,
+        PRIMARY KEY (id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS trabajo_titulacion (
+        id INTEGER NOT NULL,
+        identifier VARCHAR(10) NOT NULL,
+        title VARCHAR(150) NOT NULL,
+        authors VARCHAR(150) NOT NULL,
+        summary VARCHAR(500) NOT NULL,
+        keywords VARCHAR(150) NOT NULL,
+        status VARCHAR(50),
+        PRIMARY KEY (id),
+        UNIQUE (identifier)
+    )""",
+    """CREATE TABLE IF NOT EXISTS alumno (
+        id INTEGER NOT NULL,
+        name VARCHAR(150) NOT NULL,
+        boleta VARCHAR(50) NOT NULL,
+        area VARCHAR(150) NOT NULL,
+        semester VARCHAR(50) NOT NULL,
+        user_id INTEGER NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(user_id) REFERENCES user (id) ON DELETE CASCADE
+    )""",
+    """CREATE TABLE IF NOT EXISTS docente (
+        id INTEGER NOT NULL,
+        name VARCHAR(150) NOT NULL,
+        specialization VARCHAR(150) NOT NULL,
+        user_id INTEGER NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(user_id) REFERENCES user (id) ON DELETE CASCADE
+    )""",
+    """CREATE TABLE IF NOT EXISTS personal_administrativo (
+        id INTEGER NOT NULL,
+        name VARCHAR(150) NOT NULL,
+        role_description VARCHAR(250) NOT NULL,
+        user_id INTEGER NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(user_id) REFERENCES user (id) ON DELETE CASCADE
+    )""",
+    """CREATE TABLE IF NOT EXISTS sinodal (
+        id INTEGER NOT NULL,
+        name VARCHAR(150) NOT NULL,
+        specialization VARCHAR(150) NOT NULL,
+        user_id INTEGER NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(user_id) REFERENCES user (id) ON DELETE CASCADE
+    )""",
+    """CREATE TABLE IF NOT EXISTS egresado (
+        id INTEGER NOT NULL,
+        name VARCHAR(150) NOT NULL,
+        boleta VARCHAR(50) NOT NULL,
+        area VARCHAR(150) NOT NULL,
+        generation VARCHAR(50) NOT NULL,
+        user_id INTEGER NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(user_id) REFERENCES user (id) ON DELETE CASCADE
+    )""",
+    """CREATE TABLE IF NOT EXISTS inscripcion_convocatoria (
+        id INTEGER NOT NULL,
+        convocatoria_id INTEGER NOT NULL,
+        alumno_id INTEGER NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(convocatoria_id) REFERENCES convocatoria (id) ON DELETE CASCADE,
+        FOREIGN KEY(alumno_id) REFERENCES alumno (id) ON DELETE CASCADE
+    )""",
+    """CREATE TABLE IF NOT EXISTS evaluacion (
+        id INTEGER NOT NULL,
+        thesis_id INTEGER NOT NULL,
+        sinodal_id INTEGER NOT NULL,
+        grade INTEGER NOT NULL,
+        comentario VARCHAR(500),
+        PRIMARY KEY (id),
+        FOREIGN KEY(thesis_id) REFERENCES trabajo_titulacion (id) ON DELETE CASCADE,
+        FOREIGN KEY(sinodal_id) REFERENCES sinodal (id) ON DELETE CASCADE
+    )""",
+    """CREATE TABLE IF NOT EXISTS asignacion_sinodal (
+        id INTEGER NOT NULL,
+        thesis_id INTEGER NOT NULL,
+        sinodal_id INTEGER NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(thesis_id) REFERENCES trabajo_titulacion (id) ON DELETE CASCADE,
+        FOREIGN KEY(sinodal_id) REFERENCES sinodal (id) ON DELETE CASCADE
+    )""",
+)
+
+@migracion(1, 'Esquema base')
+def migracion_esquema_base(conexion):
+    for sentencia in ESQUEMA_BASE:
+        conexion.exec_driver_sql(sentencia)
+
+@migracion(2, 'Estatus materializado de tesis')
+def migracion_estatus_materializado(conexion):
+    agregadas = False
+    for tabla, columnas in COLUMNAS_NUEVAS.items():
+        existentes = {columna['name'] for columna in inspect(conexion).get_columns(tabla)}
+        for nombre, tipo in columnas:
+            if nombre not in existentes:
+                conexion.exec_driver_sql(f'ALTER TABLE {tabla} ADD COLUMN {nombre} {tipo}')
+                agregadas = True
+    conexion.exec_driver_sql('CREATE INDEX IF NOT EXISTS ix_trabajo_titulacion_status ON trabajo_titulacion (status)')
+    if agregadas:
+        # La regla de estatus tal como era en esta versión: 3 sinodales y 8 para aprobar
+        conexion.exec_driver_sql(
+            'UPDATE trabajo_titulacion SET '
+            'num_asignaciones = (SELECT COUNT(*) FROM asignacion_sinodal a WHERE a.thesis_id = trabajo_titulacion.id), '
+            'num_evaluaciones = (SELECT COUNT(*) FROM evaluacion e WHERE e.thesis_id = trabajo_titulacion.id), '
+            'suma_calificaciones = (SELECT COALESCE(SUM(e.grade), 0) FROM evaluacion e WHERE e.thesis_id = trabajo_titulacion.id), '
+            'promedio = (SELECT AVG(e.grade) FROM evaluacion e WHERE e.thesis_id = trabajo_titulacion.id)'
+        )
+        conexion.exec_driver_sql(
+            "UPDATE trabajo_titulacion SET status = CASE "
+            "WHEN num_asignaciones < 3 THEN 'Por asignar sinodales' "
+            "WHEN num_evaluaciones < 3 THEN 'Calificando' "
+            "WHEN promedio >= 8 THEN 'Aprobado' "
+            "ELSE 'Reprobado' END"
+        )
+
+# El índice de inscripciones todavía no es único aquí; la migración 7 quita
+# los duplicados antes de reemplazarlo por uno único
+INDICES_LLAVES = (
+    'CREATE INDEX IF NOT EXISTS ix_alumno_user_id ON alumno (user_id)',
+    'CREATE INDEX IF NOT EXISTS ix_docente_user_id ON docente (user_id)',
+    'CREATE INDEX IF NOT EXISTS ix_personal_administrativo_user_id ON personal_administrativo (user_id)',
+    'CREATE INDEX IF NOT EXISTS ix_sinodal_user_id ON sinodal (user_id)',
+    'CREATE INDEX IF NOT EXISTS ix_egresado_user_id ON egresado (user_id)',
+    'CREATE INDEX IF NOT EXISTS ix_inscripcion_convocatoria_alumno_convocatoria ON inscripcion_convocatoria (alumno_id, convocatoria_id)',
+    'CREATE INDEX IF NOT EXISTS ix_inscripcion_convocatoria_convocatoria_id ON inscripcion_convocatoria (convocatoria_id)',
+    'CREATE INDEX IF NOT EXISTS ix_evaluacion_thesis_sinodal ON evaluacion (thesis_id, sinodal_id)',
+    'CREATE INDEX IF NOT EXISTS ix_evaluacion_sinodal_id ON evaluacion (sinodal_id)',
+    'CREATE INDEX IF NOT EXISTS ix_asignacion_sinodal_thesis_sinodal ON asignacion_sinodal (thesis_id, sinodal_id)',
+    'CREATE INDEX IF NOT EXISTS ix_asignacion_sinodal_sinodal_id ON asignacion_sinodal (sinodal_id)',
+)
+
+@migracion(3, 'Índices de llaves foráneas')
+def migracion_indices_llaves(conexion):
+    for sentencia in INDICES_LLAVES:
+        conexion.exec_driver_sql(sentencia)
+
+@migracion(4, 'Secuencia de identificadores de tesis')
+def migracion_secuencia_identificadores(conexion):
+    conexion.exec_driver_sql(
+        'CREATE TABLE IF NOT EXISTS secuencia_identificador ('
+        'nombre VARCHAR(50) NOT NULL, siguiente INTEGER NOT NULL, PRIMARY KEY (nombre))'
+    )
+    conexion.exec_driver_sql("INSERT OR IGNORE INTO secuencia_identificador (nombre, siguiente) VALUES ('tesis', 0)")
+
+@migracion(5, 'Versiones de tablas para la caché de páginas')
+def migracion_versiones_tablas(conexion):
+    conexion.exec_driver_sql(
+        'CREATE TABLE IF NOT EXISTS version_tabla ('
+        'tabla VARCHAR(50) NOT NULL, version INTEGER NOT NULL, modificada DATETIME NOT NULL, PRIMARY KEY (tabla))'
+    )
+
+# Formatos de fecha aceptados en formularios, importaciones y datos anteriores
+FORMATOS_FECHA = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d')
+
+def parsear_fecha(valor):
+    if isinstance(valor, date):
+        return valor
+    texto = str(valor or '').strip()
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            pass
+    raise ValueError(f'Fecha inválida: {valor!r}')
+
+COLUMNAS_FECHA = {
+    'convocatoria': ('start_date', 'end_date'),
+    'calendario_convocatoria': ('start_date', 'end_date'),
+    'seminario': ('date',),
+}
+
+# SQLite guarda las fechas como texto ISO sin importar el tipo declarado, así
+# que basta con normalizar los valores anteriores; uno que no se pueda
+# interpretar detiene la migración en lugar de romper las lecturas después
+@migracion(6, 'Fechas nativas e índices de vigencia')
+def migracion_fechas(conexion):
+    invalidas = []
+    for tabla, columnas in COLUMNAS_FECHA.items():
+        filas = conexion.exec_driver_sql(f"SELECT id, {', '.join(columnas)} FROM {tabla}").all()
+        for fila in filas:
+            valores = {}
+            for columna, valor in zip(columnas, fila[1:]):
+                try:
+                    valores[columna] = parsear_fecha(valor).isoformat()
+                except ValueError:
+                    invalidas.append(f'{tabla}.{columna} id={fila[0]}: {valor!r}')
+            if valores and len(valores) == len(columnas):
+                asignaciones = ', '.join(f'{columna} = ?' for columna in columnas)
+                conexion.exec_driver_sql(
+                    f'UPDATE {tabla} SET {asignaciones} WHERE id = ?',
+                    tuple(valores[columna] for columna in columnas) + (fila[0],)
+                )
+    if invalidas:
+        raise RuntimeError('Fechas que no se pudieron convertir:\n' + '\n'.join(invalidas))
+    conexion.exec_driver_sql('CREATE INDEX IF NOT EXISTS ix_convocatoria_vigencia ON convocatoria (end_date, start_date)')
+    conexion.exec_driver_sql('CREATE INDEX IF NOT EXISTS ix_calendario_convocatoria_vigencia ON calendario_convocatoria (end_date, start_date)')
+    conexion.exec_driver_sql('CREATE INDEX IF NOT EXISTS ix_seminario_date ON seminario (date)')
+
+# Se conserva la inscripción más antigua de cada par duplicado
+@migracion(7, 'Inscripciones únicas por alumno y convocatoria')
+def migracion_inscripciones_unicas(conexion):
+    conexion.exec_driver_sql(
+        'DELETE FROM inscripcion_convocatoria WHERE id NOT IN '
+        '(SELECT MIN(id) FROM inscripcion_convocatoria GROUP BY alumno_id, convocatoria_id)'
+    )
+    conexion.exec_driver_sql('DROP INDEX IF EXISTS ix_inscripcion_convocatoria_alumno_convocatoria')
+    conexion.exec_driver_sql(
+        'CREATE UNIQUE INDEX IF NOT EXISTS ux_inscripcion_convocatoria_alumno_convocatoria '
+        'ON inscripcion_convocatoria (alumno_id, convocatoria_id)'
+    )
+
+@migracion(8, 'Firmas MinHash y bandas LSH de tesis')
+def migracion_firmas_minhash(conexion):
+    existentes = {columna['name'] for columna in inspect(conexion).get_columns('trabajo_titulacion')}
+    if 'firma_minhash' not in existentes:
+        conexion.exec_driver_sql('ALTER TABLE trabajo_titulacion ADD COLUMN firma_minhash BLOB')
+    conexion.exec_driver_sql(
+        'CREATE TABLE IF NOT EXISTS banda_similitud ('
+        'id INTEGER NOT NULL, thesis_id INTEGER NOT NULL, banda SMALLINT NOT NULL, hash INTEGER NOT NULL, '
+        'PRIMARY KEY (id), FOREIGN KEY(thesis_id) REFERENCES trabajo_titulacion (id) ON DELETE CASCADE)'
+    )
+    conexion.exec_driver_sql('CREATE INDEX IF NOT EXISTS ix_banda_similitud_thesis_id ON banda_similitud (thesis_id)')
+    conexion.exec_driver_sql('CREATE INDEX IF NOT EXISTS ix_banda_similitud_banda_hash ON banda_similitud (banda, hash)')
+    ultimo = 0
+    while True:
+        filas = conexion.exec_driver_sql(
+            'SELECT id, title, summary, keywords FROM trabajo_titulacion '
+            'WHERE firma_minhash IS NULL AND id > ? ORDER BY id LIMIT 500', (ultimo,)
+        ).all()
+        if not filas:
+            break
+        firmas, bandas = firmas_migracion_8(filas)
+        if firmas:
+            conexion.exec_driver_sql('UPDATE trabajo_titulacion SET firma_minhash = ? WHERE id = ?', firmas)
+            conexion.exec_driver_sql('INSERT INTO banda_similitud (thesis_id, banda, hash) VALUES (?, ?, ?)', bandas)
+        ultimo = filas[-1][0]
+
+# Firmas MinHash y bandas LSH tal como se calculaban en la migración 8 (128
+# permutaciones con semilla 20240601, 32 bandas de 4 filas, trigramas de
+# palabras normalizadas). Es una copia congelada: si similitud.py cambia, esta
+# migración sigue escribiendo lo mismo. Regresa los parámetros de los UPDATE e INSERT.
+def firmas_migracion_8(filas):
+    primo = (1 << 31) - 1
+    rng = random.Random(20240601)
+    coeficientes = [(rng.randrange(1, primo), rng.randrange(primo)) for _ in range(128)]
+    firmas, bandas = [], []
+    for thesis_id, title, summary, keywords in filas:
+        texto = unicodedata.normalize('NFKD', ' '.join((title or '', summary or '', keywords or '')).lower())
+        palabras = ''.join(c if c.isalnum() else ' ' for c in texto if not unicodedata.combining(c)).split()
+        if not palabras:
+            continue
+        hashes = [zlib.crc32(' '.join(palabras[i:i + 3]).encode()) for i in range(max(len(palabras) - 2, 1))]
+        firma = array.array('I', (min((a * h + b) % primo for h in set(hashes)) for a, b in coeficientes))
+        if sys.byteorder == 'big':
+            firma.byteswap()
+        datos = firma.tobytes()
+        firmas.append((datos, thesis_id))
+        bandas += [(thesis_id, banda, zlib.crc32(datos[banda * 16:(banda + 1) * 16]) - (1 << 31)) for banda in range(32)]
+    return firmas, bandas
+
+# Resúmenes iniciales calculados desde las tablas base como eran en la versión 9
+RESUMENES_MIGRACION_9 = (
+    "SELECT 'rol', role, 'usuarios', COUNT(*), NULL FROM user GROUP BY role",
+    "SELECT 'global', 'tesis', 'registradas', COUNT(*), NULL FROM trabajo_titulacion",
+    "SELECT 'area', area, 'alumnos', COUNT(*), NULL FROM alumno GROUP BY area",
+    "SELECT 'area', a.area, 'inscripciones', COUNT(*), NULL FROM alumno a "
+    "JOIN inscripcion_convocatoria i ON i.alumno_id = a.id GROUP BY a.area",
+    "SELECT 'generacion', generation, 'egresados', COUNT(*), NULL FROM egresado GROUP BY generation",
+    "SELECT 'convocatoria', CAST(c.id AS TEXT), 'inscripciones', "
+    "(SELECT COUNT(*) FROM inscripcion_convocatoria i WHERE i.convocatoria_id = c.id), c.title FROM convocatoria c",
+    "SELECT 'sinodal', CAST(s.id AS TEXT), 'tesis', "
+    "(SELECT COUNT(*) FROM asignacion_sinodal a WHERE a.sinodal_id = s.id), s.name FROM sinodal s",
+    "SELECT 'sinodal', CAST(s.id AS TEXT), 'evaluaciones', "
+    "(SELECT COUNT(*) FROM evaluacion e WHERE e.sinodal_id = s.id), s.name FROM sinodal s",
+    "SELECT 'sinodal', CAST(s.id AS TEXT), 'suma_calificaciones', "
+    "(SELECT COALESCE(SUM(e.grade), 0) FROM evaluacion e WHERE e.sinodal_id = s.id), s.name FROM sinodal s",
+    "SELECT 'sinodal', CAST(s.id AS TEXT), 'pendientes', "
+    "(SELECT COUNT(*) FROM asignacion_sinodal a WHERE a.sinodal_id = s.id AND NOT EXISTS "
+    "(SELECT 1 FROM evaluacion e WHERE e.thesis_id = a.thesis_id AND e.sinodal_id = a.sinodal_id)), s.name FROM sinodal s",
+)
+
+@migracion(9, 'Resúmenes analíticos del tablero')
+def migracion_resumenes(conexion):
+    conexion.exec_driver_sql(
+        'CREATE TABLE IF NOT EXISTS resumen_analitico ('
+        'dimension VARCHAR(20) NOT NULL, clave VARCHAR(150) NOT NULL, metrica VARCHAR(30) NOT NULL, '
+        'valor INTEGER NOT NULL, etiqueta VARCHAR(150), PRIMARY KEY (dimension, clave, metrica))'
+    )
+    conexion.exec_driver_sql('DELETE FROM resumen_analitico')
+    for sentencia in RESUMENES_MIGRACION_9:
+        conexion.exec_driver_sql(
+            'INSERT INTO resumen_analitico (dimension, clave, metrica, valor, etiqueta) ' + sentencia
+        )
+
+# El outbox de indexación es posterior al esquema base. Las bases que ya tenían
+# la tabla (la migración 1 la creaba antes) la conservan con sus operaciones.
+@migracion(10, 'Outbox de operaciones del índice')
+def migracion_outbox_indice(conexion):
+    conexion.exec_driver_sql(
+        'CREATE TABLE IF NOT EXISTS operacion_indice ('
+        'id INTEGER NOT NULL, operacion VARCHAR(10) NOT NULL, thesis_id INTEGER NOT NULL, '
+        'creada DATETIME NOT NULL, PRIMARY KEY (id))'
+    )
+
+def version_esquema(conexion):
+    return conexion.exec_driver_sql('PRAGMA user_version').scalar()
+
+# Aplica las migraciones pendientes. BEGIN IMMEDIATE toma el candado de
+# escritura antes de leer la versión, así dos procesos no migran a la vez.
+def migrar(engine=None):
+    aplicadas = []
+    with (engine or db.engine).connect() as conexion:
+        dbapi = conexion.connection.driver_connection
+        nivel = dbapi.isolation_level
+        # Sin transacciones implícitas del driver; el DDL queda dentro de BEGIN/COMMIT
+        dbapi.isolation_level = None
+        try:
+            for version, descripcion, funcion in sorted(MIGRACIONES, key=lambda m: m[0]):
+                conexion.exec_driver_sql('BEGIN IMMEDIATE')
+                try:
+                    if version > version_esquema(conexion):
+                        funcion(conexion)
+                        conexion.exec_driver_sql(f'PRAGMA user_version = {version}')
+                        aplicadas.append((version, descripcion))
+                    conexion.exec_driver_sql('COMMIT')
+                except Exception:
+                    conexion.exec_driver_sql('ROLLBACK')
+                    raise
+        finally:
+            dbapi.isolation_level = nivel
+    return aplicadas
+
+# Preparación única de una instalación: migraciones, índice y usuario inicial.
+# Se ejecuta con `flask setup` antes de arrancar los workers, no al importar.
+def preparar_aplicacion():
+    aplicadas = migrar()
+    directorio = current_app.config['INDEX_DIR']
+    reconstruido = False
+    if not exists_in(directorio) or firma_esquema(open_dir(directorio).schema) != firma_esquema(schema):
+        # Sólo aquí se reemplaza un índice existente, cuando su esquema cambió
+        os.makedirs(directorio, exist_ok=True)
+        create_in(directorio, schema)
+        index.cerrar()
+        writer = index.writer()
+        reindexar_tesis(writer)
+        writer.commit()
+        reconstruido = True
+        # Los pasajes se vuelven a extraer de los documentos guardados
+        ingerir_documentos(documentos_guardados())
     # Verificar si el usuario 'atzin' ya existe
     if not User.query.filter_by(username='atzin').first():
         # Crear el usuario 'atzin'
         user = User(username='atzin', password='atzin', role='admin')
         db.session.add(user)
+        acumular_resumen(*resumen_perfiles('admin', [{}]))
         db.session.commit()
+    return aplicadas, reconstruido
+
+@bp.cli.command('setup')
+def setup():
+    aplicadas, reconstruido = preparar_aplicacion()
+    for version, descripcion in aplicadas:
+        print(f'Aplicada la migración {version}: {descripcion}')
+    if reconstruido:
+        print('Índice creado y tesis indexadas.')
+    print('Instalación lista.')
+
+# Aplicar las migraciones pendientes del esquema
+@bp.cli.command('migrate')
+def migrate():
+    with db.engine.connect() as conexion:
+        print(f'Versión del esquema: {version_esquema(conexion)}')
+    for version, descripcion in migrar():
+        print(f'Aplicada la migración {version}: {descripcion}')
+
+# Reconstruir el estatus materializado de todas las tesis
+@bp.cli.command('rebuild-status')
+def rebuild_status():
+    total = recalcular_estatus()
+    db.session.commit()
+    print(f'Estatus recalculado para {total} tesis.')
+
+# Volver a indexar todas las tesis de la base de datos
+@bp.cli.command('reindex-theses')
+def reindex_theses():
+    writer = index.writer()
+    try:
+        total = reindexar_tesis(writer)
+        writer.commit()
+    except Exception:
+        writer.cancel()
+        raise
+    print(f'{total} tesis indexadas.')
+
+# Aplicar todas las operaciones pendientes del outbox de indexación
+@bp.cli.command('drain-outbox')
+def drain_outbox():
+    total = 0
+    while True:
+        procesadas = cola_indexacion.procesar([])
+        total += procesadas
+        if procesadas < current_app.config['INDEX_BATCH_SIZE']:
+            break
+    print(f'{total} operaciones aplicadas; pendientes: {OperacionIndice.query.count()}.')
+
+# Fusionar segmentos del índice según la política por niveles
+@bp.cli.command('index-merge')
+def index_merge():
+    antes = len(index._segments())
+    fusionar_segmentos()
+    print(f'Segmentos: {antes} -> {len(index._segments())}')
+
+# Fusionar todos los segmentos del índice en uno solo
+@bp.cli.command('index-optimize')
+def index_optimize():
+    antes = len(index._segments())
+    optimizar_indice()
+    print(f'Segmentos: {antes} -> {len(index._segments())}')
+
+# Reconstruir el índice completo desde la base de datos
+@bp.cli.command('index-rebuild')
+def index_rebuild():
+    total = reconstruir_indice()
+    print(f'Índice reconstruido con {total} documentos.')
+
+# Ejecutar el planificador de mantenimiento en primer plano (proceso dedicado)
+@bp.cli.command('index-maintenance')
+def index_maintenance():
+    while True:
+        mantenimiento_indice.ejecutar_ciclo()
+        time.sleep(current_app.config['INDEX_MAINTENANCE_INTERVAL'])
+
+# Verificar que el estatus materializado coincida con un recálculo completo
+@bp.cli.command('check-status')
+def check_status():
+    diferencias = verificar_estatus()
+    for thesis_id, guardado, esperado in diferencias:
+        print(f'Tesis {thesis_id}: guardado={guardado} esperado={esperado}')
+    if diferencias:
+        raise SystemExit(1)
+    print('El estatus materializado es consistente.')
+
+# Recalcular los resúmenes del tablero; con --check sólo reporta las diferencias
+@bp.cli.command('reconcile-analytics')
+@click.option('--check', 'solo_revisar', is_flag=True, help='Sólo reportar diferencias sin corregirlas')
+def reconcile_analytics(solo_revisar):
+    if solo_revisar:
+        diferencias = conciliar()
+        db.session.rollback()
+    else:
+        diferencias = conciliar_resumenes(forzar=True)
+    for llave, guardado, esperado in diferencias:
+        print(f"{'/'.join(llave)}: guardado={guardado} esperado={esperado}")
+    if solo_revisar and diferencias:
+        raise SystemExit(1)
+    print(f'{len(diferencias)} contadores con diferencias.')
+
+# Importación masiva de alumnos, egresados, docentes, sinodales y tesis.
+# Cada tipo indica el modelo del perfil, el rol del usuario y los campos obligatorios.
+TIPOS_IMPORTACION = {
+    'alumno': (Alumno, 'student', ['name', 'boleta', 'area', 'semester']),
+    'egresado': (Egresado, 'egresado', ['name', 'boleta', 'area', 'generation']),
+    'docente': (Docente, 'teacher', ['name', 'specialization']),
+    'sinodal': (Sinodal, 'sinodal', ['name', 'specialization']),
+    'tesis': (TrabajoTitulacion, None, ['title', 'authors', 'summary', 'keywords']),
+}
+TAMANO_BLOQUE_IMPORTACION = 1000
+
+def bloques(total, tamano=TAMANO_BLOQUE_IMPORTACION):
+    for inicio in range(0, total, tamano):
+        yield range(inicio, min(total, inicio + tamano))
+
+# Lee un archivo CSV o JSONL registro por registro; regresa pares (línea, registro)
+def leer_registros(archivo, formato):
+    if formato == 'jsonl':
+        for linea, texto in enumerate(archivo, start=1):
+            if texto.strip():
+                try:
+                    yield linea, json.loads(texto)
+                except ValueError as e:
+                    yield linea, e
+    else:
+        # La línea 1 es el encabezado
+        for linea, registro in enumerate(csv.DictReader(archivo), start=2):
+            yield linea, registro
+
+def validar_registro(registro, campos, con_usuario, usernames):
+    if isinstance(registro, Exception):
+        return f'Registro inválido: {registro}'
+    if not isinstance(registro, dict):
+        return 'Registro inválido'
+    requeridos = campos + (['username', 'password'] if con_usuario else [])
+    faltantes = [campo for campo in requeridos if not str(registro.get(campo) or '').strip()]
+    if faltantes:
+        return f"Faltan campos: {', '.join(faltantes)}"
+    if con_usuario and registro['username'] in usernames:
+        return f"El nombre de usuario ya existe: {registro['username']}"
+    return None
+
+# Inserta un bloque ya validado; regresa los ids de las tesis insertadas
+def insertar_bloque(tipo, registros):
+    modelo, rol, campos = TIPOS_IMPORTACION[tipo]
+    if rol is None:
+        identificadores = asignador_identificadores.tomar(len(registros))
+        filas = [
+            dict({campo: registro[campo] for campo in campos}, identifier=identifier)
+            for registro, identifier in zip(registros, identificadores)
+        ]
+        ids = db.session.execute(insert(modelo).returning(modelo.id, sort_by_parameter_order=True), filas).scalars().all()
+        db.session.execute(insert(OperacionIndice), [{'operacion': 'add', 'thesis_id': i} for i in ids])
+        acumular_resumen(Counter({('global', 'tesis', 'registradas'): len(ids)}))
+        indexar_similitud([
+            (thesis_id, fila['title'], fila['summary'], fila['keywords']) for thesis_id, fila in zip(ids, filas)
+        ])
+        return ids
+    usuarios = db.session.execute(
+        insert(User).returning(User.id, User.username),
+        [{'username': r['username'], 'password': r['password'], 'role': rol} for r in registros]
+    )
+    ids_usuario = {fila.username: fila.id for fila in usuarios}
+    # SQLite puede reutilizar el id de un usuario borrado
+    for user_id in ids_usuario.values():
+        cache_usuarios.invalidar(user_id)
+    perfiles = [dict({campo: r[campo] for campo in campos}, user_id=ids_usuario[r['username']]) for r in registros]
+    ids = db.session.execute(insert(modelo).returning(modelo.id, sort_by_parameter_order=True), perfiles).scalars().all()
+    acumular_resumen(*resumen_perfiles(rol, [dict(perfil, id=i) for perfil, i in zip(perfiles, ids)]))
+    return []
+
+# Importa registros en transacciones por bloque. Los registros con errores se
+# reportan y se omiten sin detener la importación.
+def importar_registros(tipo, registros, tamano_bloque=TAMANO_BLOQUE_IMPORTACION, progreso=None):
+    modelo, rol, campos = TIPOS_IMPORTACION[tipo]
+    # Una sola consulta para los nombres de usuario existentes
+    usernames = set() if rol is None else {u for (u,) in db.session.query(User.username)}
+    resumen = {'procesados': 0, 'insertados': 0, 'errores': [], 'tesis': []}
+    registros = iter(registros)
+    while True:
+        bloque = list(itertools.islice(registros, tamano_bloque))
+        if not bloque:
+            break
+        validos = []
+        for linea, registro in bloque:
+            error = validar_registro(registro, campos, rol is not None, usernames)
+            if error:
+                resumen['errores'].append((linea, error))
+                continue
+            if rol is not None:
+                usernames.add(registro['username'])
+            validos.append((linea, registro))
+        try:
+            resumen['tesis'] += insertar_bloque(tipo, [r for _, r in validos])
+            db.session.commit()
+            resumen['insertados'] += len(validos)
+        except IntegrityError:
+            # Se repite registro por registro para aislar las filas que fallan
+            db.session.rollback()
+            for linea, registro in validos:
+                try:
+                    resumen['tesis'] += insertar_bloque(tipo, [registro])
+                    db.session.commit()
+                    resumen['insertados'] += 1
+                except IntegrityError as e:
+                    db.session.rollback()
+                    resumen['errores'].append((linea, str(e.orig)))
+        resumen['procesados'] += len(bloque)
+        if progreso:
+            progreso(resumen)
+    return resumen
+
+# Importar registros desde un archivo CSV o JSONL
+@bp.cli.command('import-data')
+@click.argument('tipo', type=click.Choice(list(TIPOS_IMPORTACION)))
+@click.argument('archivo', type=click.Path(exists=True, dir_okay=False))
+@click.option('--chunk-size', default=TAMANO_BLOQUE_IMPORTACION, show_default=True)
+def import_data(tipo, archivo, chunk_size):
+    formato = 'jsonl' if archivo.endswith(('.jsonl', '.json')) else 'csv'
+    def progreso(resumen):
+        print(f"{resumen['procesados']} procesados, {resumen['insertados']} insertados, {len(resumen['errores'])} errores")
+    with open(archivo, newline='', encoding='utf-8') as f:
+        resumen = importar_registros(tipo, leer_registros(f, formato), chunk_size, progreso)
+    for linea, error in resumen['errores']:
+        print(f'Línea {linea}: {error}')
+    if resumen['tesis']:
+        # Las tesis importadas se indexan en un solo commit de Whoosh
+        cola_indexacion.procesar([], limite=len(resumen['tesis']) + OperacionIndice.query.count())
+        print(f"{len(resumen['tesis'])} tesis indexadas.")
+
+# Asignación automática de sinodales a todas las tesis incompletas
+@bp.cli.command('assign-sinodales')
+@click.option('--max-load', type=int, help='Máximo de tesis activas por sinodal')
+@click.option('--dry-run', is_flag=True, help='Sólo mostrar el plan, sin guardarlo')
+def assign_sinodales(max_load, dry_run):
+    inicio = time.perf_counter()
+    plan = planear_asignaciones(max_load)
+    plan.resumen['duracion_s'] = round(time.perf_counter() - inicio, 3)
+    print(json.dumps(plan.resumen, sort_keys=True))
+    if not dry_run:
+        aplicar_asignaciones(plan)
+        print(f'{len(plan.asignaciones)} asignaciones guardadas.')
+
+# Reporta los grupos de tesis casi duplicadas de todo el corpus
+@bp.cli.command('find-duplicates')
+@click.option('--threshold', type=float, help='Similitud mínima (por omisión SIMILARITY_THRESHOLD)')
+@click.option('--output', type=click.Path(dir_okay=False), help='Guardar los grupos en JSON')
+def find_duplicates(threshold, output):
+    inicio = time.perf_counter()
+    grupos = grupos_duplicados(threshold)
+    titulos = {}
+    ids = [thesis_id for grupo in grupos for thesis_id, _ in grupo]
+    for i in range(0, len(ids), TAMANO_BLOQUE_INDEXACION):
+        for fila in db.session.execute(
+            select(TrabajoTitulacion.id, TrabajoTitulacion.identifier, TrabajoTitulacion.title)
+            .where(TrabajoTitulacion.id.in_(ids[i:i + TAMANO_BLOQUE_INDEXACION]))
+        ):
+            titulos[fila.id] = (fila.identifier, fila.title)
+    resultado = [
+        [{'thesis_id': thesis_id, 'identifier': titulos[thesis_id][0], 'title': titulos[thesis_id][1],
+          'similitud': round(similitud, 3)} for thesis_id, similitud in grupo]
+        for grupo in grupos
+    ]
+    for grupo in resultado:
+        print(' | '.join(f"{t['identifier']} {t['title']} ({t['similitud']})" for t in grupo))
+    print(f'{len(resultado)} grupos en {time.perf_counter() - inicio:.2f}s')
+    if output:
+        with open(output, 'w') as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+
+# Ingesta de documentos completos. Cada archivo se llama como el identificador
+# de su tesis y se copia a DOCUMENTS_DIR para que una reconstrucción del
+# índice pueda volver a extraerlo; --all vuelve a procesar los ya guardados.
+@bp.cli.command('ingest-documents')
+@click.argument('rutas', nargs=-1, type=click.Path(exists=True, dir_okay=False))
+@click.option('--all', 'todos', is_flag=True, help='Volver a ingerir todos los documentos guardados')
+@click.option('--workers', type=int, help='Procesos de extracción (por omisión INGEST_WORKERS)')
+def ingest_documents(rutas, todos, workers):
+    if workers:
+        current_app.config['INGEST_WORKERS'] = workers
+    documentos = []
+    for ruta in rutas:
+        identifier, extension = os.path.splitext(os.path.basename(ruta))
+        if extension.lower() not in EXTENSIONES_DOCUMENTO:
+            print(f'Se omite {ruta}: formato no soportado')
+            continue
+        if TrabajoTitulacion.query.filter_by(identifier=identifier).first() is None:
+            print(f'Se omite {ruta}: no hay una tesis con el identificador {identifier}')
+            continue
+        destino = os.path.join(current_app.config['DOCUMENTS_DIR'], identifier + extension.lower())
+        os.makedirs(current_app.config['DOCUMENTS_DIR'], exist_ok=True)
+        if not os.path.exists(destino) or not os.path.samefile(ruta, destino):
+            shutil.copyfile(ruta, destino)
+        documentos.append((identifier, destino))
+    if todos:
+        documentos = itertools.chain(documentos, documentos_guardados())
+    inicio = time.perf_counter()
+    def progreso(resumen):
+        print(f"\r{resumen['documentos']} documentos, {resumen['pasajes']} pasajes", end='', flush=True)
+    resumen = ingerir_documentos(documentos, progreso)
+    print()
+    print(f"{resumen['documentos']} documentos, {resumen['paginas']} páginas y {resumen['pasajes']} pasajes "
+          f"en {time.perf_counter() - inicio:.2f}s; {resumen['errores']} con error, {resumen['sin_tesis']} sin tesis")
+
+# Perfiles de carga por vista: relaciones que la plantilla recorre en cada fila
+PERFILES_CARGA = {
+    'list_students': [joinedload(Alumno.user)],
+    'list_teachers': [joinedload(Docente.user)],
+    'list_egresados': [joinedload(Egresado.user)],
+    'list_admins': [joinedload(PersonalAdministrativo.user)],
+    'list_sinodales': [joinedload(Sinodal.user)],
+    'list_asignaciones': [joinedload(AsignacionSinodal.trabajo), joinedload(AsignacionSinodal.sinodal)],
+    'ver_calificaciones': [joinedload(Evaluacion.sinodal)],
+    'consultar_estatus': [joinedload(InscripcionConvocatoria.convocatoria)],
+}
+
+# Aplica el perfil de carga de la vista (por omisión, la vista de la petición
+# actual, sin el prefijo del blueprint)
+def con_perfil(query, perfil=None):
+    return query.options(*PERFILES_CARGA.get(perfil or request.endpoint.rpartition('.')[2], []))
+
+class LimiteConsultasExcedido(AssertionError):
+    pass
+
+# Instrumentación: histogramas por ruta que se exponen en /metrics con el
+# formato de texto de Prometheus. Los valores son locales a cada proceso.
+LIMITES_SEGUNDOS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LIMITES_SENTENCIAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+def etiquetas_prometheus(etiquetas):
+    if not etiquetas:
+        return ''
+    valores = ','.join(
+        '{}="{}"'.format(nombre, str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for nombre, valor in etiquetas
+    )
+    return '{' + valores + '}'
+
+class Histograma:
+    def __init__(self, nombre, ayuda, limites):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.limites = limites
+        self.series = {}
+
+    def observar(self, etiquetas, valor):
+        serie = self.series.get(etiquetas)
+        if serie is None:
+            serie = self.series[etiquetas] = [0] * len(self.limites) + [0.0, 0]
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                serie[i] += 1
+        serie[-2] += valor
+        serie[-1] += 1
+
+    def exponer(self):
+        lineas = [f'# HELP {self.nombre} {self.ayuda}', f'# TYPE {self.nombre} histogram']
+        for etiquetas, serie in sorted(self.series.items()):
+            for limite, cuenta in zip(self.limites, serie):
+                lineas.append(f'{self.nombre}_bucket{etiquetas_prometheus(etiquetas + (("le", limite),))} {cuenta}')
+            lineas.append(f'{self.nombre}_bucket{etiquetas_prometheus(etiquetas + (("le", "+Inf"),))} {serie[-1]}')
+            lineas.append(f'{self.nombre}_sum{etiquetas_prometheus(etiquetas)} {serie[-2]}')
+            lineas.append(f'{self.nombre}_count{etiquetas_prometheus(etiquetas)} {serie[-1]}')
+        return lineas
+
+class Metricas:
+    def __init__(self):
+        self.candado = threading.Lock()
+        self.histogramas = {}
+
+    def observar(self, nombre, ayuda, etiquetas, valor, limites=LIMITES_SEGUNDOS):
+        with self.candado:
+            histograma = self.histogramas.get(nombre)
+            if histograma is None:
+                histograma = self.histogramas[nombre] = Histograma(nombre, ayuda, limites)
+            histograma.observar(tuple(etiquetas), valor)
+
+    def exponer(self, medidores=()):
+        lineas = []
+        with self.candado:
+            for nombre in sorted(self.histogramas):
+                lineas.extend(self.histogramas[nombre].exponer())
+        for nombre, tipo, ayuda, valor in medidores:
+            lineas += [f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} {tipo}', f'{nombre} {valor}']
+        return '\n'.join(lineas) + '\n'
+
+metricas = Metricas()
+
+# Mide un bloque de código: se acumula en la petición actual (si la hay) y
+# se registra en el histograma aeneta_<nombre>_seconds
+@contextmanager
+def medir(nombre):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracion = time.perf_counter() - inicio
+        metricas.observar(f'aeneta_{nombre}_seconds', f'Tiempo de {nombre} en segundos', (), duracion)
+        if has_request_context():
+            setattr(g, f'tiempo_{nombre}', g.get(f'tiempo_{nombre}', 0.0) + duracion)
+
+# Escritor de trazas en segundo plano: las peticiones sólo encolan la traza y
+# se descarta si la cola está llena, para no bloquear nunca una respuesta
+class EscritorTrazas:
+    def __init__(self, app, capacidad=10000):
+        self.app = app
+        self.cola = queue.Queue(maxsize=capacidad)
+        self.candado = threading.Lock()
+        self.hilo = None
+        self.pid = None
+        self.descartadas = 0
+
+    def agregar(self, traza):
+        with self.candado:
+            if self.pid != os.getpid() or self.hilo is None or not self.hilo.is_alive():
+                self.pid = os.getpid()
+                self.hilo = threading.Thread(target=self.ejecutar, name='escritor-trazas', daemon=True)
+                self.hilo.start()
+        try:
+            self.cola.put_nowait(traza)
+        except queue.Full:
+            self.descartadas += 1
+
+    def ejecutar(self):
+        while True:
+            trazas = [self.cola.get()]
+            while True:
+                try:
+                    trazas.append(self.cola.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with open(self.app.config['TRACE_FILE'], 'a', encoding='utf-8') as archivo:
+                    for traza in trazas:
+                        archivo.write(json.dumps(traza, ensure_ascii=False) + '\n')
+            except OSError:
+                self.app.logger.exception('No se pudieron escribir %d trazas', len(trazas))
+
+escritor_trazas = servicio('escritor_trazas')
+
+@before_render_template.connect
+def iniciar_plantilla(sender, template, context, **extra):
+    g.inicio_plantilla = time.perf_counter()
+
+@template_rendered.connect
+def terminar_plantilla(sender, template, context, **extra):
+    inicio = g.pop('inicio_plantilla', None)
+    if inicio is not None:
+        g.tiempo_plantilla = g.get('tiempo_plantilla', 0.0) + time.perf_counter() - inicio
+
+@bp.before_app_request
+def iniciar_medicion():
+    g.inicio_peticion = time.perf_counter()
+
+@bp.after_app_request
+def registrar_medicion(response):
+    inicio = g.get('inicio_peticion')
+    if inicio is None:
+        return response
+    duracion = time.perf_counter() - inicio
+    ruta = (('endpoint', request.endpoint or 'desconocido'),)
+    etiquetas = ruta + (('method', request.method), ('status', response.status_code))
+    valores = {
+        'sentencias_sql': g.get('sentencias_sql', 0),
+        'tiempo_sql': g.get('tiempo_sql', 0.0),
+        'tiempo_whoosh': g.get('tiempo_whoosh_busqueda', 0.0),
+        'tiempo_plantilla': g.get('tiempo_plantilla', 0.0),
+    }
+    metricas.observar('aeneta_request_duration_seconds', 'Duración de las peticiones', etiquetas, duracion)
+    metricas.observar('aeneta_request_sql_statements', 'Sentencias SQL por petición', ruta, valores['sentencias_sql'], LIMITES_SENTENCIAS)
+    metricas.observar('aeneta_request_sql_seconds', 'Tiempo en SQL por petición', ruta, valores['tiempo_sql'])
+    metricas.observar('aeneta_request_whoosh_seconds', 'Tiempo en búsquedas de Whoosh por petición', ruta, valores['tiempo_whoosh'])
+    metricas.observar('aeneta_request_template_seconds', 'Tiempo de renderizado de plantillas por petición', ruta, valores['tiempo_plantilla'])
+    if current_app.config['TRACE_FILE'] and random.random() < current_app.config['TRACE_SAMPLE_RATE']:
+        escritor_trazas.agregar(dict(
+            valores, ts=time.time(), endpoint=request.endpoint, method=request.method,
+            path=request.path, status=response.status_code, duracion=duracion
+        ))
+    return response
+
+# Cuenta y cronometra las sentencias SQL emitidas durante cada petición
+@event.listens_for(Engine, 'before_cursor_execute')
+def contar_sentencia(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.sentencias_sql = g.get('sentencias_sql', 0) + 1
+        conn.info.setdefault('inicio_sentencia', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def cronometrar_sentencia(conn, cursor, statement, parameters, context, executemany):
+    inicios = conn.info.get('inicio_sentencia')
+    if inicios and has_request_context():
+        g.tiempo_sql = g.get('tiempo_sql', 0.0) + time.perf_counter() - inicios.pop()
+
+# En modo de pruebas, falla si una petición excede el límite de sentencias (detecta N+1)
+@bp.after_app_request
+def verificar_limite_consultas(response):
+    limite = current_app.config.get('SQL_STATEMENT_LIMIT')
+    if current_app.testing and limite is not None and g.get('sentencias_sql', 0) > limite:
+        raise LimiteConsultasExcedido(
+            f'{request.endpoint} ejecutó {g.sentencias_sql} sentencias SQL (límite {limite})'
+        )
+    return response
+
+# Paginación por llave (keyset) para las rutas de listado
+TAMANO_PAGINA = 50
+TAMANO_PAGINA_MAXIMO = 200
+TAMANO_BLOQUE_EXPORTACION = 500
+
+Pagina = namedtuple('Pagina', ['items', 'siguiente', 'tamano'])
+
+def codificar_cursor(valores):
+    valores = [valor.isoformat() if isinstance(valor, date) else valor for valor in valores]
+    return base64.urlsafe_b64encode(json.dumps(valores).encode()).decode()
+
+def decodificar_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        return None
+
+# Una comparación contra NULL nunca es verdadera, así que las columnas que
+# admiten NULL se ordenan con un centinela mayor que cualquier valor real
+# (los NULL quedan al final en orden ascendente) y el cursor guarda el mismo
+def centinela_nulo(columna):
+    if isinstance(columna.type, db.Date):
+        return date.max
+    if isinstance(columna.type, (db.Integer, db.Float, db.Numeric)):
+        return sys.float_info.max
+    return '\U0010ffff'
+
+def expresion_orden(columna):
+    if not columna.expression.nullable:
+        return columna
+    return func.coalesce(columna, centinela_nulo(columna))
+
+# Ordena por la columna pedida en ?sort= (si está permitida) y por id como desempate
+def ordenar_keyset(query, modelo, orden, cursor=None):
+    sort = request.args.get('sort')
+    columna = getattr(modelo, sort) if sort in orden else None
+    descendente = request.args.get('order') == 'desc'
+    columnas = [modelo.id] if columna is None else [columna, modelo.id]
+    expresiones = [expresion_orden(c) for c in columnas]
+    # Un cursor que no corresponde al orden actual se ignora
+    if isinstance(cursor, list) and len(cursor) == len(columnas):
+        if columna is not None and isinstance(columna.type, db.Date):
+            try:
+                cursor = [parsear_fecha(cursor[0])] + cursor[1:]
+            except ValueError:
+                return ordenar_keyset(query, modelo, orden)
+        llave = tuple_(*expresiones) if columna is not None else modelo.id
+        valor = tuple_(*cursor) if columna is not None else cursor[0]
+        query = query.filter(llave < valor if descendente else llave > valor)
+    query = query.order_by(*[e.desc() if descendente else e.asc() for e in expresiones])
+    return query, columnas
+
+def llave_cursor(item, columnas):
+    valores = [getattr(item, c.key) for c in columnas]
+    return [
+        centinela_nulo(c) if valor is None and c.expression.nullable else valor
+        for c, valor in zip(columnas, valores)
+    ]
+
+# Restringe a lo vigente en la fecha dada: convocatorias abiertas (o también
+# las próximas), calendarios sin terminar y seminarios por venir. Todas las
+# condiciones son rangos sobre los índices de vigencia.
+def filtrar_vigentes(query, modelo, hoy=None, incluir_proximas=False):
+    hoy = hoy or date.today()
+    if hasattr(modelo, 'end_date'):
+        query = query.filter(modelo.end_date >= hoy)
+        if not incluir_proximas:
+            query = query.filter(modelo.start_date <= hoy)
+        return query
+    return query.filter(modelo.date >= hoy)
+
+def aplicar_filtros(query, modelo, filtros):
+    for campo in filtros:
+        valor = request.args.get(campo)
+        if valor:
+            query = query.filter(getattr(modelo, campo) == valor)
+    return query
+
+def paginar(query, modelo, orden=()):
+    try:
+        tamano = min(int(request.args.get('limit', TAMANO_PAGINA)), TAMANO_PAGINA_MAXIMO)
+    except ValueError:
+        tamano = TAMANO_PAGINA
+    tamano = max(tamano, 1)
+    cursor = decodificar_cursor(request.args['after']) if request.args.get('after') else None
+    query, columnas = ordenar_keyset(query, modelo, orden, cursor)
+    # Se pide un registro extra para saber si existe una página siguiente
+    items = query.limit(tamano + 1).all()
+    siguiente = None
+    if len(items) > tamano:
+        items = items[:tamano]
+        siguiente = codificar_cursor(llave_cursor(items[-1], columnas))
+    return Pagina(items, siguiente, tamano)
+
+# Recorre la consulta completa por bloques keyset (por id), de modo que nunca
+# se mantiene la tabla entera en memoria. La consulta debe incluir el id.
+def recorrer_keyset(query, modelo):
+    cursor = None
+    while True:
+        bloque_query, orden = ordenar_keyset(query, modelo, (), cursor)
+        bloque = bloque_query.limit(TAMANO_BLOQUE_EXPORTACION).all()
+        yield bloque
+        if len(bloque) < TAMANO_BLOQUE_EXPORTACION:
+            break
+        cursor = llave_cursor(bloque[-1], orden)
+        # Liberar los objetos del bloque anterior
+        db.session.expunge_all()
+
+# Exporta la consulta completa en CSV
+def exportar_csv(query, modelo, columnas, nombre):
+    def generar():
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer)
+        escritor.writerow(columnas)
+        for bloque in recorrer_keyset(query, modelo):
+            for item in bloque:
+                escritor.writerow([getattr(item, columna) for columna in columnas])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    return Response(
+        stream_with_context(generar()),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={nombre}.csv'}
+    )
+
+# Construye la URL de la vista actual cambiando algunos parámetros (None los elimina)
+@bp.app_template_global()
+def url_con_args(**cambios):
+    args = request.args.to_dict()
+    args.update(cambios)
+    args = {clave: valor for clave, valor in args.items() if valor is not None}
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+# Atiende una ruta de listado: filtros, página keyset o exportación completa (?format=csv)
+def listar(query, modelo, plantilla, nombre, columnas, orden=(), filtros=(), **contexto):
+    query = aplicar_filtros(query, modelo, filtros)
+    if request.args.get('format') == 'csv':
+        return exportar_csv(query, modelo, columnas, nombre)
+    pagina = paginar(con_perfil(query), modelo, orden)
+    contexto[nombre] = pagina.items
+    return render_template(plantilla, pagina=pagina, **contexto)
+
+# Versiones de tablas: cada sesión acumula las tablas que escribe (unidad de
+# trabajo y sentencias insert/update/delete masivas) y las incrementa dentro
+# de la misma transacción justo antes del commit
+TABLAS_SIN_VERSION = {'version_tabla', 'operacion_indice', 'secuencia_identificador'}
+
+def marcar_tablas(sesion, tablas):
+    sesion.info.setdefault('tablas_modificadas', set()).update(
+        tabla for tabla in tablas if tabla not in TABLAS_SIN_VERSION
+    )
+
+@event.listens_for(Session, 'after_flush')
+def registrar_tablas_flush(sesion, contexto):
+    marcar_tablas(sesion, (
+        objeto.__table__.name for objeto in itertools.chain(sesion.new, sesion.dirty, sesion.deleted)
+    ))
+
+@event.listens_for(Session, 'do_orm_execute')
+def registrar_tablas_sentencia(estado):
+    if estado.is_insert or estado.is_update or estado.is_delete:
+        marcar_tablas(estado.session, (estado.statement.table.name,))
+
+@event.listens_for(Session, 'before_commit')
+def incrementar_versiones(sesion):
+    sesion.flush()
+    tablas = sesion.info.pop('tablas_modificadas', None)
+    if not tablas:
+        return
+    sesion.execute(sentencia_versiones(tablas))
+
+def sentencia_versiones(tablas):
+    ahora = datetime.utcnow()
+    sentencia = insert_sqlite(VersionTabla).values([
+        {'tabla': tabla, 'version': 1, 'modificada': ahora} for tabla in sorted(tablas)
+    ])
+    return sentencia.on_conflict_do_update(
+        index_elements=['tabla'],
+        set_={'version': VersionTabla.version + 1, 'modificada': ahora}
+    )
+
+@event.listens_for(Session, 'after_rollback')
+def descartar_tablas(sesion):
+    sesion.info.pop('tablas_modificadas', None)
+
+def versiones_tablas(tablas):
+    filas = db.session.execute(
+        select(VersionTabla.tabla, VersionTabla.version, VersionTabla.modificada)
+        .where(VersionTabla.tabla.in_(tablas))
+    ).all()
+    versiones = {fila.tabla: (fila.version, fila.modificada) for fila in filas}
+    return tuple((tabla,) + versiones.get(tabla, (0, None)) for tabla in tablas)
+
+class CachePaginas(CacheLRU):
+    def __init__(self, app):
+        super().__init__(lambda: app.config['PAGE_CACHE_SIZE'], lambda: app.config['PAGE_CACHE_TTL'])
+
+cache_paginas = servicio('cache_paginas')
+
+# Cachea la página de una vista que sólo depende de las tablas indicadas, de
+# sus argumentos y del rol del usuario. Responde 304 si el ETag del navegador
+# coincide, sin consultar ni renderizar nada más.
+def cache_pagina(*tablas):
+    def decorador(vista):
+        @functools.wraps(vista)
+        def envoltura(**kwargs):
+            versiones = versiones_tablas(tablas)
+            clave = (
+                request.endpoint, tuple(sorted(kwargs.items())),
+                tuple(sorted(request.args.items(multi=True))), current_user.role,
+                # Las páginas filtradas por vigencia cambian de un día a otro
+                date.today().isoformat(),
+                tuple((tabla, version, modificada and modificada.isoformat()) for tabla, version, modificada in versiones),
+            )
+            etag = hashlib.sha1(repr(clave).encode('utf-8')).hexdigest()
+            fechas = [modificada for _, _, modificada in versiones if modificada is not None]
+            if etag in request.if_none_match:
+                response = Response(status=304)
+            else:
+                pagina = cache_paginas.obtener(clave)
+                if pagina is None:
+                    response = current_app.make_response(vista(**kwargs))
+                    if response.status_code != 200 or response.is_streamed:
+                        return response
+                    cache_paginas.guardar(clave, (response.get_data(), response.mimetype))
+                else:
+                    response = Response(pagina[0], mimetype=pagina[1])
+            response.set_etag(etag)
+            if fechas:
+                response.last_modified = max(fechas)
+            # Las páginas requieren sesión: el navegador las guarda pero revalida siempre
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return envoltura
+    return decorador
+
+# Inscripciones con commit agrupado: las peticiones concurrentes se encolan y
+# un solo hilo las escribe en una transacción por grupo con INSERT ... ON
+# CONFLICT DO NOTHING, así que repetir una inscripción no crea duplicados y
+# sólo hay un escritor compitiendo por el candado de SQLite
+class EscritorInscripciones:
+    def __init__(self, app, engine=None):
+        self.app = app
+        self.engine = engine
+        self.cola = queue.Queue()
+        self.candado = threading.Lock()
+        self.hilo = None
+        self.pid = None
+        self.grupos = 0
+        self.inscripciones = 0
+
+    def iniciar(self):
+        with self.candado:
+            if self.pid != os.getpid():
+                self.cola = queue.Queue()
+                self.hilo = None
+                self.pid = os.getpid()
+            if self.hilo is None or not self.hilo.is_alive():
+                self.hilo = threading.Thread(target=self.ejecutar, name='escritor-inscripciones', daemon=True)
+                self.hilo.start()
+
+    # Regresa True si la inscripción es nueva y False si ya existía
+    def inscribir(self, convocatoria_id, alumno_id, timeout=None):
+        self.iniciar()
+        futuro = Future()
+        self.cola.put(((convocatoria_id, alumno_id), futuro))
+        return futuro.result(timeout or self.app.config['ENROLLMENT_TIMEOUT'])
+
+    def ejecutar(self):
+        while True:
+            lote = self.recolectar()
+            try:
+                with self.app.app_context():
+                    nuevas = self.escribir([par for par, _ in lote])
+            except Exception as e:
+                self.app.logger.exception('No se pudo escribir un grupo de %d inscripciones', len(lote))
+                for _, futuro in lote:
+                    futuro.set_exception(e)
+                continue
+            for par, futuro in lote:
+                # Sólo la primera petición de un par repetido recibe True
+                futuro.set_result(par in nuevas)
+                nuevas.discard(par)
+
+    def recolectar(self):
+        lote = [self.cola.get()]
+        limite = time.monotonic() + self.app.config['ENROLLMENT_BATCH_WAIT']
+        while len(lote) < self.app.config['ENROLLMENT_BATCH_SIZE']:
+            restante = limite - time.monotonic()
+            try:
+                lote.append(self.cola.get(timeout=restante) if restante > 0 else self.cola.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def escribir(self, pares):
+        engine = self.engine or db.engine
+        pares = list(dict.fromkeys(pares))
+        espera = 0.05
+        for intento in range(self.app.config['ENROLLMENT_LOCK_RETRIES']):
+            try:
+                try:
+                    with engine.begin() as conexion:
+                        nuevas = self.insertar(conexion, pares)
+                except IntegrityError:
+                    # Una convocatoria o alumno borrado invalidaría todo el grupo
+                    nuevas = set()
+                    for par in pares:
+                        try:
+                            with engine.begin() as conexion:
+                                nuevas |= self.insertar(conexion, [par])
+                        except IntegrityError:
+                            self.app.logger.warning('Inscripción inválida: %s', par)
+            except OperationalError:
+                # La base está bloqueada por otro proceso; reintentar con espera exponencial
+                time.sleep(espera)
+                espera = min(espera * 2, 2.0)
+                continue
+            self.grupos += 1
+            self.inscripciones += len(nuevas)
+            return nuevas
+        raise OperationalError('INSERT inscripcion_convocatoria', None, 'database is locked')
+
+    def insertar(self, conexion, pares):
+        sentencia = insert_sqlite(InscripcionConvocatoria).on_conflict_do_nothing().returning(
+            InscripcionConvocatoria.convocatoria_id, InscripcionConvocatoria.alumno_id
+        )
+        filas = conexion.execute(sentencia, [{'convocatoria_id': c, 'alumno_id': a} for c, a in pares])
+        nuevas = {(fila.convocatoria_id, fila.alumno_id) for fila in filas}
+        if nuevas:
+            areas = {fila.id: fila.area for fila in conexion.execute(
+                select(Alumno.id, Alumno.area).where(Alumno.id.in_({alumno_id for _, alumno_id in nuevas}))
+            )}
+            incrementos = Counter()
+            for convocatoria_id, alumno_id in nuevas:
+                incrementos['convocatoria', convocatoria_id, 'inscripciones'] += 1
+                incrementos['area', areas[alumno_id], 'inscripciones'] += 1
+            acumular_resumen(incrementos, ejecutor=conexion)
+            conexion.execute(sentencia_versiones(['inscripcion_convocatoria', 'resumen_analitico']))
+        return nuevas
+
+    def estado(self):
+        return {'pendientes': self.cola.qsize(), 'grupos': self.grupos, 'inscripciones': self.inscripciones}
+
+escritor_inscripciones = servicio('escritor_inscripciones')
+
+# Usuario de la sesión: copia ligera del User junto con el id y nombre de su
+# perfil (Alumno, Sinodal, ...), que se puede compartir entre peticiones
+class UsuarioSesion(UserMixin):
+    def __init__(self, user, perfil):
+        self.id = user.id
+        self.username = user.username
+        self.role = user.role
+        self.perfil_id = perfil.id if perfil else None
+        self.perfil_nombre = perfil.name if perfil else None
+
+# Relación del User que contiene el perfil de cada rol
+PERFILES_ROL = {
+    'student': 'alumno',
+    'egresado': 'egresado',
+    'teacher': 'docente',
+    'sinodal': 'sinodal',
+    'admin': 'admin',
+}
+
+class CacheUsuarios(CacheLRU):
+    def __init__(self, app):
+        super().__init__(lambda: app.config['USER_CACHE_SIZE'], lambda: app.config['USER_CACHE_TTL'])
+
+    # Carga el usuario y su perfil en una sola consulta
+    def cargar(self, user_id):
+        usuario = self.obtener(user_id)
+        if usuario is None:
+            user = User.query.options(
+                *[joinedload(getattr(User, perfil)) for perfil in PERFILES_ROL.values()]
+            ).filter_by(id=user_id).first()
+            if user is None:
+                return None
+            usuario = UsuarioSesion(user, getattr(user, PERFILES_ROL.get(user.role, ''), None))
+            self.guardar(user_id, usuario)
+        return usuario
+
+cache_usuarios = servicio('cache_usuarios')
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return cache_usuarios.cargar(int(user_id))
 
 # Ruta para la página principal de búsqueda
-@app.route('/')
+@bp.route('/')
 @login_required
 def home():
     return render_template('index.html')
 
 # Ruta para el login
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
         user = User.query.filter_by(username=username, password=password).first()
         if user:
-            login_user(user)
+            login_user(cache_usuarios.cargar(user.id))
             flash('Logged in successfully.')
             next_page = request.args.get('next')
-            return redirect(next_page or url_for('home'))
+            return redirect(next_page or url_for('.home'))
         else:
             flash('Invalid username or password.')
     return render_template('login.html')
 
 # Ruta para el logout
-@app.route('/logout')
+@bp.route('/logout')
 @login_required
 def logout():
     logout_user()
     flash('Logged out successfully.')
-    return redirect(url_for('login'))
+    return redirect(url_for('.login'))
 
 # Ruta para procesar la búsqueda
-@app.route('/search', methods=['POST'])
+@bp.route('/search', methods=['POST'])
 @login_required
 def search():
-    query_str = request.form['query']
-    with index.searcher() as searcher:
-        query = QueryParser("content", index.schema).parse(query_str)
-        results = searcher.search(query)
-        return jsonify([{'title': r['title'], 'content': r['content']} for r in results])
+    resultados = buscar_general(request.form['query'])
+    # ?fields= (o el campo fields del formulario) recorta cada resultado
+    campos = campos_pedidos(CAMPOS_API_BUSQUEDA, CAMPOS_API_BUSQUEDA, request.values.get('fields'))
+    return respuesta_api([{campo: r[campo] for campo in campos} for r in resultados])
+
+# Ruta de sugerencias para autocompletar la búsqueda de tesis (?q=prefijo&limit=k)
+@bp.route('/suggest')
+@login_required
+def suggest():
+    prefijo = request.args.get('q', '')
+    limite = max(1, min(request.args.get('limit', 10, type=int), current_app.config['SUGGEST_MAX_RESULTS']))
+    return jsonify({'q': prefijo, 'sugerencias': indice_sugerencias.sugerir(prefijo, limite)})
+
+# Ruta para exponer las métricas en formato de Prometheus
+@bp.route('/metrics')
+def metrics():
+    token = current_app.config['METRICS_TOKEN']
+    if not token:
+        abort(404)
+    esperado = f'Bearer {token}'.encode()
+    if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), esperado):
+        return Response('Se requiere el token de métricas.\n', 401, {'WWW-Authenticate': 'Bearer'}, mimetype='text/plain')
+    estado = cola_indexacion.estado()
+    medidores = [
+        ('aeneta_index_queue_depth', 'gauge', 'Operaciones pendientes en la cola de indexación', estado['pendientes']),
+        ('aeneta_index_last_commit_latency_seconds', 'gauge', 'Latencia del último commit del índice',
+         (estado['ultima_latencia_ms'] or 0) / 1000),
+        ('aeneta_trace_dropped_total', 'counter', 'Trazas descartadas por cola llena', escritor_trazas.descartadas),
+    ]
+    return Response(metricas.exponer(medidores), mimetype='text/plain; version=0.0.4')
+
+# Ruta para consultar el estado de la cola de indexación
+@bp.route('/index_status')
+@login_required
+def index_status():
+    estado = cola_indexacion.estado()
+    estado['segmentos'] = len(index._segments())
+    estado['outbox_pendientes'] = OperacionIndice.query.count()
+    estado['cache_busqueda'] = cache_busqueda.estado()
+    estado['cache_paginas'] = cache_paginas.estado()
+    return jsonify(estado)
 
 # Ruta para la página de registro de formas de titulación
-@app.route('/register')
+@bp.route('/register')
 @login_required
 def register():
     return render_template('register.html')
 
 # Ruta para procesar el registro de formas de titulación
-@app.route('/register', methods=['POST'])
+@bp.route('/register', methods=['POST'])
 @login_required
 def register_post():
     title = request.form['title']
     content = request.form['requirements']
-    try:
-        writer = index.writer()
-        writer.add_document(title=title, content=content)
-        writer.commit()
-    except Exception as e:
-        writer.cancel()
-        raise e
-    return redirect(url_for('register'))
+    cola_indexacion.agregar('update', dict(clave=f'titulacion:{uuid.uuid4().hex}', tipo='titulacion', title=title, content=content))
+    return redirect(url_for('.register'))
 
 # Ruta para listar formas de titulación
-@app.route('/list_titulaciones')
+@bp.route('/list_titulaciones')
 @login_required
 def list_titulaciones():
-    titulaciones = []
-    with index.searcher() as searcher:
-        results = searcher.search(QueryParser("content", index.schema).parse("*"))
-        for r in results:
-            titulaciones.append({'title': r['title'], 'content': r['content']})
+    def calcular(searcher):
+        results = searcher.search(Term('tipo', 'titulacion'), limit=None)
+        return [{'title': r['title'], 'content': r['content']} for r in results]
+    titulaciones = cache_busqueda.obtener_o_calcular(clave_busqueda('titulaciones', '', ()), calcular)
     return render_template('list_titulaciones.html', titulaciones=titulaciones)
 
+# Ruta para importar registros desde un archivo CSV o JSONL
+@bp.route('/import', methods=['POST'])
+@login_required
+def import_post():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Solo el personal administrativo puede importar registros.'}), 403
+    tipo = request.form.get('tipo')
+    archivo = request.files.get('archivo')
+    if tipo not in TIPOS_IMPORTACION or archivo is None:
+        return jsonify({'error': 'Se requieren los campos tipo y archivo.'}), 400
+    formato = 'jsonl' if archivo.filename.endswith(('.jsonl', '.json')) else 'csv'
+    texto = io.TextIOWrapper(archivo.stream, encoding='utf-8', newline='')
+    resumen = importar_registros(tipo, leer_registros(texto, formato))
+    if resumen['tesis']:
+        cola_indexacion.notificar()
+        indice_sugerencias.invalidar()
+    return jsonify({
+        'procesados': resumen['procesados'],
+        'insertados': resumen['insertados'],
+        'errores': [{'linea': linea, 'error': error} for linea, error in resumen['errores']],
+    })
+
 # Ruta para la página de registro de egresados
-@app.route('/register_egresado')
+@bp.route('/register_egresado')
 @login_required
 def register_egresado():
     return render_template('register_egresado.html')
 
 # Ruta para procesar el registro de egresados
-@app.route('/register_egresado', methods=['POST'])
+@bp.route('/register_egresado', methods=['POST'])
 @login_required
 def register_egresado_post():
     name = request.form['name']
@@ -240,168 +3120,218 @@ def register_egresado_post():
     # Verificar si el nombre de usuario ya existe
     if User.query.filter_by(username=username).first():
         flash('El nombre de usuario ya existe. Por favor, elija otro.')
-        return redirect(url_for('register_egresado'))
+        return redirect(url_for('.register_egresado'))
     user = User(username=username, password=password, role='egresado')
     db.session.add(user)
-    db.session.commit()
+    db.session.flush()
     egresado = Egresado(name=name, boleta=boleta, area=area, generation=generation, user_id=user.id)
     db.session.add(egresado)
+    acumular_resumen(*resumen_perfiles('egresado', [{'generation': generation}]))
     db.session.commit()
-    return redirect(url_for('register_egresado'))
+    cache_usuarios.invalidar(user.id)
+    return redirect(url_for('.register_egresado'))
 
 # Ruta para listar egresados
-@app.route('/list_egresados')
+@bp.route('/list_egresados')
 @login_required
 def list_egresados():
-    egresados = Egresado.query.all()
-    return render_template('list_egresados.html', egresados=egresados)
+    return listar(Egresado.query, Egresado, 'list_egresados.html', 'egresados',
+                  ['id', 'name', 'boleta', 'area', 'generation'],
+                  orden=('name', 'boleta', 'generation'), filtros=('area', 'generation'))
 
 # Ruta para la página de registro del calendario de convocatorias
-@app.route('/register_calendar')
+@bp.route('/register_calendar')
 @login_required
 def register_calendar():
     return render_template('register_calendar.html')
 
 # Ruta para procesar el registro del calendario de convocatorias
-@app.route('/register_calendar', methods=['POST'])
+@bp.route('/register_calendar', methods=['POST'])
 @login_required
 def register_calendar_post():
-    start_date = request.form['start_date']
-    end_date = request.form['end_date']
     requirements = request.form['requirements']
+    try:
+        start_date = parsear_fecha(request.form['start_date'])
+        end_date = parsear_fecha(request.form['end_date'])
+    except ValueError as e:
+        flash(str(e))
+        return redirect(url_for('.register_calendar'))
+    if end_date < start_date:
+        flash('La fecha de fin no puede ser anterior a la de inicio.')
+        return redirect(url_for('.register_calendar'))
     calendario = CalendarioConvocatoria(start_date=start_date, end_date=end_date, requirements=requirements)
     db.session.add(calendario)
     db.session.commit()
-    return redirect(url_for('register_calendar'))
+    return redirect(url_for('.register_calendar'))
 
 # Ruta para listar calendarios de convocatorias
-@app.route('/list_calendars')
+@bp.route('/list_calendars')
 @login_required
+@cache_pagina('calendario_convocatoria')
 def list_calendars():
-    calendarios = CalendarioConvocatoria.query.all()
-    return render_template('list_calendars.html', calendarios=calendarios)
+    query = CalendarioConvocatoria.query
+    # Los alumnos sólo ven los calendarios que no han terminado
+    if current_user.role == 'student' or request.args.get('vigentes'):
+        query = filtrar_vigentes(query, CalendarioConvocatoria, incluir_proximas=True)
+    return listar(query, CalendarioConvocatoria, 'list_calendars.html', 'calendarios',
+                  ['id', 'start_date', 'end_date', 'requirements'],
+                  orden=('start_date', 'end_date'))
 
 # Ruta para la página de registro de convocatorias de titulación
-@app.route('/register_call')
+@bp.route('/register_call')
 @login_required
 def register_call():
     return render_template('register_call.html')
 
 # Ruta para procesar el registro de convocatorias de titulación
-@app.route('/register_call', methods=['POST'])
+@bp.route('/register_call', methods=['POST'])
 @login_required
 def register_call_post():
     title = request.form['title']
     description = request.form['description']
-    start_date = request.form['start_date']
-    end_date = request.form['end_date']
+    try:
+        start_date = parsear_fecha(request.form['start_date'])
+        end_date = parsear_fecha(request.form['end_date'])
+    except ValueError as e:
+        flash(str(e))
+        return redirect(url_for('.register_call'))
+    if end_date < start_date:
+        flash('La fecha de fin no puede ser anterior a la de inicio.')
+        return redirect(url_for('.register_call'))
     convocatoria = Convocatoria(title=title, description=description, start_date=start_date, end_date=end_date)
     db.session.add(convocatoria)
+    db.session.flush()
+    acumular_resumen(Counter({('convocatoria', convocatoria.id, 'inscripciones'): 0}),
+                     {('convocatoria', convocatoria.id): title})
     db.session.commit()
-    return redirect(url_for('register_call'))
+    return redirect(url_for('.register_call'))
 
 # Ruta para listar convocatorias de titulación
-@app.route('/list_calls')
+@bp.route('/list_calls')
 @login_required
+@cache_pagina('convocatoria')
 def list_calls():
-    convocatorias = Convocatoria.query.all()
-    return render_template('list_calls.html', convocatorias=convocatorias)
+    return listar(Convocatoria.query, Convocatoria, 'list_calls.html', 'convocatorias',
+                  ['id', 'title', 'description', 'start_date', 'end_date'],
+                  orden=('title', 'start_date', 'end_date'))
 
 # Ruta para la página de registro de seminarios de titulación
-@app.route('/register_seminar')
+@bp.route('/register_seminar')
 @login_required
 def register_seminar():
     return render_template('register_seminar.html')
 
 # Ruta para procesar el registro de seminarios de titulación
-@app.route('/register_seminar', methods=['POST'])
+@bp.route('/register_seminar', methods=['POST'])
 @login_required
 def register_seminar_post():
-    date = request.form['date']
+    try:
+        fecha = parsear_fecha(request.form['date'])
+    except ValueError as e:
+        flash(str(e))
+        return redirect(url_for('.register_seminar'))
     topic = request.form['topic']
     speaker = request.form['speaker']
-    seminario = Seminario(date=date, topic=topic, speaker=speaker)
+    seminario = Seminario(date=fecha, topic=topic, speaker=speaker)
     db.session.add(seminario)
     db.session.commit()
-    return redirect(url_for('register_seminar'))
+    return redirect(url_for('.register_seminar'))
 
 # Ruta para listar seminarios de titulación
-@app.route('/list_seminars')
+@bp.route('/list_seminars')
 @login_required
+@cache_pagina('seminario')
 def list_seminars():
-    seminarios = Seminario.query.all()
-    return render_template('list_seminars.html', seminarios=seminarios)
+    query = Seminario.query
+    # Los alumnos sólo ven los seminarios por venir
+    if current_user.role == 'student' or request.args.get('vigentes'):
+        query = filtrar_vigentes(query, Seminario)
+    return listar(query, Seminario, 'list_seminars.html', 'seminarios',
+                  ['id', 'date', 'topic', 'speaker'],
+                  orden=('date', 'topic', 'speaker'), filtros=('speaker',))
 
 # Ruta para la página de registro de trabajos de titulación
-@app.route('/register_thesis')
+@bp.route('/register_thesis')
 @login_required
 def register_thesis():
     return render_template('register_thesis.html')
 
 # Ruta para procesar el registro de trabajos de titulación
-@app.route('/register_thesis', methods=['POST'])
+@bp.route('/register_thesis', methods=['POST'])
 @login_required
 def register_thesis_post():
     title = request.form['title']
     authors = request.form['authors']
     summary = request.form['summary']
     keywords = request.form['keywords']
+    documento = request.files.get('documento')
+    if documento is not None and not documento.filename:
+        documento = None
+    if documento is not None and os.path.splitext(documento.filename)[1].lower() not in EXTENSIONES_DOCUMENTO:
+        flash('El documento debe ser un archivo .txt o .pdf.')
+        return redirect(url_for('.register_thesis'))
+
+    identifier = asignador_identificadores.siguiente()
+
+    # No se rechaza el registro: se avisa para que alguien lo revise
+    similares = buscar_similares(title, summary, keywords)
+
+    trabajo = TrabajoTitulacion(identifier=identifier, title=title, authors=authors, summary=summary, keywords=keywords)
+    db.session.add(trabajo)
+    db.session.flush()
+    thesis_id = trabajo.id
+    indexar_similitud([(thesis_id, title, summary, keywords)])
+    encolar_indexacion(thesis_id, 'add')
+    acumular_resumen(Counter({('global', 'tesis', 'registradas'): 1}))
+    db.session.commit()
+    for similitud, _, identificador_similar, titulo_similar in similares[:5]:
+        current_app.logger.warning('Tesis %s posible duplicado de %s (similitud %.2f)', identifier, identificador_similar, similitud)
+        flash(f'Posible duplicado de la tesis {identificador_similar} "{titulo_similar}" (similitud {similitud:.0%}).')
+    cola_indexacion.notificar()
+    indice_sugerencias.agregar(thesis_id, identifier, title, authors, keywords)
+    if documento is not None:
+        # La extracción sigue en el pool; los pasajes llegan al índice al terminar
+        extractor_documentos.enviar(thesis_id, identifier, guardar_documento(documento, identifier))
 
-    # Generar un identificador único
-    identifier = str(random.randint(100000, 999999))
-    while TrabajoTitulacion.query.filter_by(identifier=identifier).first():
-        identifier = str(random.randint(100000, 999999))
-
-    try:
-        writer = index.writer()
-        writer.add_document(title=title, authors=authors, summary=summary, keywords=keywords, content=summary)
-        writer.commit()
-
-        trabajo = TrabajoTitulacion(identifier=identifier, title=title, authors=authors, summary=summary, keywords=keywords)
-        db.session.add(trabajo)
-        db.session.commit()
-
-    except Exception as e:
-        writer.cancel()
-        raise e
-
-    return redirect(url_for('register_thesis'))
+    return redirect(url_for('.register_thesis'))
 
 # Ruta para listar todas las tesis
-@app.route('/list_theses')
+@bp.route('/list_theses')
 @login_required
 def list_theses():
-    theses = TrabajoTitulacion.query.all()
-    return render_template('list_theses.html', theses=theses)
+    return listar(TrabajoTitulacion.query, TrabajoTitulacion, 'list_theses.html', 'theses',
+                  ['id', 'identifier', 'title', 'authors', 'keywords', 'status'],
+                  orden=('identifier', 'title', 'authors'), filtros=('status',))
 
 # Ruta para ver los detalles de una tesis
-@app.route('/thesis/<identifier>')
+@bp.route('/thesis/<identifier>')
 @login_required
+@cache_pagina('trabajo_titulacion')
 def view_thesis(identifier):
     thesis = TrabajoTitulacion.query.filter_by(identifier=identifier).first_or_404()
     return render_template('view_thesis.html', thesis=thesis)
 
 # Ruta para buscar tesis
-@app.route('/search_thesis', methods=['GET', 'POST'])
+@bp.route('/search_thesis', methods=['GET', 'POST'])
 @login_required
 def search_thesis():
-    if request.method == 'POST':
-        query = request.form['query']
-        theses = TrabajoTitulacion.query.filter(
-            (TrabajoTitulacion.identifier.like(f"%{query}%")) | 
-            (TrabajoTitulacion.title.like(f"%{query}%"))
-        ).all()
-        return render_template('list_theses.html', theses=theses)
+    query = request.values.get('query')
+    if query:
+        pagina = request.args.get('page', 1, type=int)
+        theses, total = buscar_tesis(query, pagina)
+        paginas = max((total + TAMANO_PAGINA_BUSQUEDA - 1) // TAMANO_PAGINA_BUSQUEDA, 1)
+        busqueda = {'query': query, 'pagina': pagina, 'paginas': paginas, 'total': total}
+        return render_template('list_theses.html', theses=theses, busqueda=busqueda)
     return render_template('search_thesis.html')
 
 # Ruta para la página de registro de alumnos
-@app.route('/register_student')
+@bp.route('/register_student')
 @login_required
 def register_student():
     return render_template('register_student.html')
 
 # Ruta para procesar el registro de alumnos
-@app.route('/register_student', methods=['POST'])
+@bp.route('/register_student', methods=['POST'])
 @login_required
 def register_student_post():
     name = request.form['name']
@@ -413,30 +3343,33 @@ def register_student_post():
     # Verificar si el nombre de usuario ya existe
     if User.query.filter_by(username=username).first():
         flash('El nombre de usuario ya existe. Por favor, elija otro.')
-        return redirect(url_for('register_student'))
+        return redirect(url_for('.register_student'))
     user = User(username=username, password=password, role='student')
     db.session.add(user)
-    db.session.commit()
+    db.session.flush()
     student = Alumno(name=name, boleta=boleta, area=area, semester=semester, user_id=user.id)
     db.session.add(student)
+    acumular_resumen(*resumen_perfiles('student', [{'area': area}]))
     db.session.commit()
-    return redirect(url_for('register_student'))
+    cache_usuarios.invalidar(user.id)
+    return redirect(url_for('.register_student'))
 
 # Ruta para listar alumnos
-@app.route('/list_students')
+@bp.route('/list_students')
 @login_required
 def list_students():
-    alumnos = Alumno.query.all()
-    return render_template('list_students.html', alumnos=alumnos)
+    return listar(Alumno.query, Alumno, 'list_students.html', 'alumnos',
+                  ['id', 'name', 'boleta', 'area', 'semester'],
+                  orden=('name', 'boleta', 'semester'), filtros=('area', 'semester'))
 
 # Ruta para la página de registro de docentes
-@app.route('/register_teacher')
+@bp.route('/register_teacher')
 @login_required
 def register_teacher():
     return render_template('register_teacher.html')
 
 # Ruta para procesar el registro de docentes
-@app.route('/register_teacher', methods=['POST'])
+@bp.route('/register_teacher', methods=['POST'])
 @login_required
 def register_teacher_post():
     name = request.form['name']
@@ -446,30 +3379,33 @@ def register_teacher_post():
     # Verificar si el nombre de usuario ya existe
     if User.query.filter_by(username=username).first():
         flash('El nombre de usuario ya existe. Por favor, elija otro.')
-        return redirect(url_for('register_teacher'))
+        return redirect(url_for('.register_teacher'))
     user = User(username=username, password=password, role='teacher')
     db.session.add(user)
-    db.session.commit()
+    db.session.flush()
     teacher = Docente(name=name, specialization=specialization, user_id=user.id)
     db.session.add(teacher)
+    acumular_resumen(*resumen_perfiles('teacher', [{}]))
     db.session.commit()
-    return redirect(url_for('register_teacher'))
+    cache_usuarios.invalidar(user.id)
+    return redirect(url_for('.register_teacher'))
 
 # Ruta para listar docentes
-@app.route('/list_teachers')
+@bp.route('/list_teachers')
 @login_required
 def list_teachers():
-    docentes = Docente.query.all()
-    return render_template('list_teachers.html', docentes=docentes)
+    return listar(Docente.query, Docente, 'list_teachers.html', 'docentes',
+                  ['id', 'name', 'specialization'],
+                  orden=('name', 'specialization'), filtros=('specialization',))
 
 # Ruta para la página de registro de personal administrativo
-@app.route('/register_admin')
+@bp.route('/register_admin')
 @login_required
 def register_admin():
     return render_template('register_admin.html')
 
 # Ruta para procesar el registro de personal administrativo
-@app.route('/register_admin', methods=['POST'])
+@bp.route('/register_admin', methods=['POST'])
 @login_required
 def register_admin_post():
     name = request.form['name']
@@ -479,30 +3415,33 @@ def register_admin_post():
     # Verificar si el nombre de usuario ya existe
     if User.query.filter_by(username=username).first():
         flash('El nombre de usuario ya existe. Por favor, elija otro.')
-        return redirect(url_for('register_admin'))
+        return redirect(url_for('.register_admin'))
     user = User(username=username, password=password, role='admin')
     db.session.add(user)
-    db.session.commit()
+    db.session.flush()
     admin = PersonalAdministrativo(name=name, role_description=role_description, user_id=user.id)
     db.session.add(admin)
+    acumular_resumen(*resumen_perfiles('admin', [{}]))
     db.session.commit()
-    return redirect(url_for('register_admin'))
+    cache_usuarios.invalidar(user.id)
+    return redirect(url_for('.register_admin'))
 
 # Ruta para listar personal administrativo
-@app.route('/list_admins')
+@bp.route('/list_admins')
 @login_required
 def list_admins():
-    admins = PersonalAdministrativo.query.all()
-    return render_template('list_admins.html', admins=admins)
+    return listar(PersonalAdministrativo.query, PersonalAdministrativo, 'list_admins.html', 'admins',
+                  ['id', 'name', 'role_description'],
+                  orden=('name',))
 
 # Ruta para la página de registro de sinodales
-@app.route('/register_sinodal')
+@bp.route('/register_sinodal')
 @login_required
 def register_sinodal():
     return render_template('register_sinodal.html')
 
 # Ruta para procesar el registro de sinodales
-@app.route('/register_sinodal', methods=['POST'])
+@bp.route('/register_sinodal', methods=['POST'])
 @login_required
 def register_sinodal_post():
     name = request.form['name']
@@ -512,148 +3451,471 @@ def register_sinodal_post():
     # Verificar si el nombre de usuario ya existe
     if User.query.filter_by(username=username).first():
         flash('El nombre de usuario ya existe. Por favor, elija otro.')
-        return redirect(url_for('register_sinodal'))
+        return redirect(url_for('.register_sinodal'))
     user = User(username=username, password=password, role='sinodal')
     db.session.add(user)
-    db.session.commit()
+    db.session.flush()
     sinodal = Sinodal(name=name, specialization=specialization, user_id=user.id)
     db.session.add(sinodal)
+    db.session.flush()
+    acumular_resumen(*resumen_perfiles('sinodal', [{'id': sinodal.id, 'name': name}]))
     db.session.commit()
-    return redirect(url_for('register_sinodal'))
+    cache_usuarios.invalidar(user.id)
+    return redirect(url_for('.register_sinodal'))
 
 # Ruta para listar sinodales
-@app.route('/list_sinodales')
+@bp.route('/list_sinodales')
 @login_required
+@cache_pagina('sinodal', 'user')
 def list_sinodales():
-    sinodales = Sinodal.query.all()
-    return render_template('list_sinodales.html', sinodales=sinodales)
+    return listar(Sinodal.query, Sinodal, 'list_sinodales.html', 'sinodales',
+                  ['id', 'name', 'specialization'],
+                  orden=('name', 'specialization'), filtros=('specialization',))
 
 # Ruta para listar convocatorias disponibles para inscripciones
-@app.route('/list_available_calls')
+@bp.route('/list_available_calls')
 @login_required
 def list_available_calls():
-    convocatorias = Convocatoria.query.all()
-    return render_template('list_available_calls.html', convocatorias=convocatorias)
+    return listar(filtrar_vigentes(Convocatoria.query, Convocatoria), Convocatoria, 'list_available_calls.html', 'convocatorias',
+                  ['id', 'title', 'description', 'start_date', 'end_date'],
+                  orden=('title', 'start_date', 'end_date'))
 
 # Ruta para inscribir a un estudiante en una convocatoria
-@app.route('/inscribir_convocatoria/<int:convocatoria_id>', methods=['GET', 'POST'])
+@bp.route('/inscribir_convocatoria/<int:convocatoria_id>', methods=['GET', 'POST'])
 @login_required
 def inscribir_convocatoria(convocatoria_id):
     convocatoria = Convocatoria.query.get_or_404(convocatoria_id)
     if request.method == 'POST':
         if current_user.role != 'student':
             flash('Solo los estudiantes pueden inscribirse en las convocatorias.')
-            return redirect(url_for('list_available_calls'))
-        alumno = Alumno.query.filter_by(user_id=current_user.id).first()
-        inscripcion = InscripcionConvocatoria(convocatoria_id=convocatoria.id, alumno_id=alumno.id)
-        db.session.add(inscripcion)
-        db.session.commit()
-        flash('Inscripción realizada con éxito.')
-        return redirect(url_for('list_available_calls'))
+            return redirect(url_for('.list_available_calls'))
+        if current_user.perfil_id is None:
+            flash('Tu usuario no tiene un registro de alumno.')
+            return redirect(url_for('.list_available_calls'))
+        if not convocatoria.start_date <= date.today() <= convocatoria.end_date:
+            flash('La convocatoria no está abierta.')
+            return redirect(url_for('.list_available_calls'))
+        # Se libera la conexión de lectura antes de esperar al grupo
+        db.session.rollback()
+        if escritor_inscripciones.inscribir(convocatoria_id, current_user.perfil_id):
+            flash('Inscripción realizada con éxito.')
+        else:
+            flash('Ya estabas inscrito en esta convocatoria.')
+        return redirect(url_for('.list_available_calls'))
     return render_template('inscribir_convocatoria.html', convocatoria=convocatoria)
 
 # Ruta para consultar los detalles de una convocatoria específica
-@app.route('/consultar_convocatoria/<int:convocatoria_id>')
+@bp.route('/consultar_convocatoria/<int:convocatoria_id>')
 @login_required
+@cache_pagina('convocatoria')
 def consultar_convocatoria(convocatoria_id):
     convocatoria = Convocatoria.query.get_or_404(convocatoria_id)
     return render_template('consultar_convocatoria.html', convocatoria=convocatoria)
 
 # Ruta para listar usuarios
-@app.route('/list_users')
+@bp.route('/list_users')
 @login_required
 def list_users():
-    users = User.query.all()
-    return render_template('list_users.html', users=users)
+    # La contraseña nunca se incluye en la exportación
+    return listar(User.query, User, 'list_users.html', 'users',
+                  ['id', 'username', 'role'],
+                  orden=('username', 'role'), filtros=('role',))
 
 # Ruta para borrar un usuario
-@app.route('/delete_user/<int:user_id>', methods=['POST'])
+@bp.route('/delete_user/<int:user_id>', methods=['POST'])
 @login_required
 def delete_user(user_id):
     user = User.query.get_or_404(user_id)
+    # Las asignaciones y evaluaciones del sinodal se borran en cascada
+    afectadas = set()
+    if user.sinodal:
+        afectadas.update(a.thesis_id for a in user.sinodal.asignaciones)
+        afectadas.update(e.thesis_id for e in user.sinodal.evaluaciones)
+    descontar_usuario(user)
     db.session.delete(user)
+    if afectadas:
+        db.session.flush()
+        recalcular_estatus(afectadas)
     db.session.commit()
+    cache_usuarios.invalidar(user_id)
     flash('Usuario eliminado con éxito.')
-    return redirect(url_for('list_users'))
+    return redirect(url_for('.list_users'))
 
 # Ruta para la página de asignación de sinodales
-@app.route('/assign_sinodal')
+@bp.route('/assign_sinodal')
 @login_required
 def assign_sinodal():
-    theses = TrabajoTitulacion.query.all()
+    # Sólo las tesis a las que todavía les faltan sinodales
+    theses = TrabajoTitulacion.query.filter(TrabajoTitulacion.num_asignaciones < SINODALES_REQUERIDOS).all()
     sinodales = Sinodal.query.all()
     return render_template('assign_sinodal.html', theses=theses, sinodales=sinodales)
 
+# Ruta para listar las asignaciones de sinodales
+@bp.route('/list_asignaciones')
+@login_required
+def list_asignaciones():
+    return listar(AsignacionSinodal.query, AsignacionSinodal, 'list_asignaciones.html', 'asignaciones',
+                  ['id', 'thesis_id', 'sinodal_id'], filtros=('thesis_id', 'sinodal_id'))
+
 # Ruta para procesar la asignación de sinodales
-@app.route('/assign_sinodal', methods=['POST'])
+@bp.route('/assign_sinodal', methods=['POST'])
 @login_required
 def assign_sinodal_post():
     thesis_id = request.form['thesis_id']
     sinodal_id = request.form['sinodal_id']
+    acumular_resumen(resumen_asignaciones([(int(thesis_id), int(sinodal_id))]))
     asignacion = AsignacionSinodal(thesis_id=thesis_id, sinodal_id=sinodal_id)
     db.session.add(asignacion)
+    registrar_cambio_estatus(int(thesis_id), asignaciones=1)
     db.session.commit()
     flash('Sinodal asignado con éxito.')
-    return redirect(url_for('assign_sinodal'))
+    return redirect(url_for('.assign_sinodal'))
+
+# Ruta para la asignación automática de sinodales; con dry_run sólo regresa el plan
+@bp.route('/assign_sinodal/auto', methods=['POST'])
+@login_required
+def assign_sinodal_auto():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Solo el personal administrativo puede asignar sinodales en lote.'}), 403
+    carga_maxima = request.form.get('max_load', type=int)
+    dry_run = request.form.get('dry_run', '1') != '0'
+    plan = planear_asignaciones(carga_maxima)
+    if not dry_run:
+        aplicar_asignaciones(plan)
+    return jsonify({
+        'dry_run': dry_run,
+        'resumen': plan.resumen,
+        'asignaciones': [
+            {'thesis_id': thesis_id, 'sinodal_id': sinodal_id, 'costo': costo}
+            for thesis_id, sinodal_id, costo in plan.asignaciones
+        ],
+        'incompletas': plan.incompletas,
+    })
 
 # Ruta para calificar tesis
-@app.route('/calificar_tesis/<int:thesis_id>', methods=['GET', 'POST'])
+@bp.route('/calificar_tesis/<int:thesis_id>', methods=['GET', 'POST'])
 @login_required
 def calificar_tesis(thesis_id):
     if current_user.role != 'sinodal':
         flash('Solo los sinodales pueden calificar las tesis.')
-        return redirect(url_for('home'))
+        return redirect(url_for('.home'))
     thesis = TrabajoTitulacion.query.get_or_404(thesis_id)
     if request.method == 'POST':
         grade = int(request.form['grade'])
         comentario = request.form['comentario']
-        sinodal = Sinodal.query.filter_by(user_id=current_user.id).first()
-        evaluacion = Evaluacion(thesis_id=thesis.id, sinodal_id=sinodal.id, grade=grade, comentario=comentario)
+        if current_user.perfil_id is None:
+            flash('Tu usuario no tiene un registro de sinodal.')
+            return redirect(url_for('.list_theses'))
+        acumular_resumen(resumen_evaluacion(thesis.id, current_user.perfil_id, grade))
+        evaluacion = Evaluacion(thesis_id=thesis.id, sinodal_id=current_user.perfil_id, grade=grade, comentario=comentario)
         db.session.add(evaluacion)
+        registrar_cambio_estatus(thesis.id, calificacion=grade)
         db.session.commit()
         flash('Calificación registrada con éxito.')
-        return redirect(url_for('list_theses'))
+        return redirect(url_for('.list_theses'))
     return render_template('calificar_tesis.html', thesis=thesis)
 
 # Ruta para ver las calificaciones de una tesis
-@app.route('/ver_calificaciones/<int:thesis_id>')
+@bp.route('/ver_calificaciones/<int:thesis_id>')
 @login_required
 def ver_calificaciones(thesis_id):
     thesis = TrabajoTitulacion.query.get_or_404(thesis_id)
-    calificaciones = Evaluacion.query.filter_by(thesis_id=thesis.id).all()
+    calificaciones = con_perfil(Evaluacion.query).filter_by(thesis_id=thesis.id).all()
     return render_template('ver_calificaciones.html', thesis=thesis, calificaciones=calificaciones)
 
 # Ruta para listar todas las tesis con estatus
-@app.route('/list_theses_with_status')
+@bp.route('/list_theses_with_status')
 @login_required
 def list_theses_with_status():
-    theses = TrabajoTitulacion.query.all()
-    for thesis in theses:
-        asignaciones = AsignacionSinodal.query.filter_by(thesis_id=thesis.id).all()
-        if len(asignaciones) < 3:
-            thesis.status = 'Por asignar sinodales'
-        else:
-            calificaciones = Evaluacion.query.filter_by(thesis_id=thesis.id).all()
-            if len(calificaciones) < 3:
-                thesis.status = 'Calificando'
-            else:
-                promedio = sum(c.grade for c in calificaciones) / len(calificaciones)
-                if promedio >= 8:
-                    thesis.status = 'Aprobado'
-                else:
-                    thesis.status = 'Reprobado'
-    return render_template('list_theses_with_status.html', theses=theses)
+    return listar(TrabajoTitulacion.query, TrabajoTitulacion, 'list_theses_with_status.html', 'theses',
+                  ['id', 'identifier', 'title', 'status', 'num_asignaciones', 'num_evaluaciones', 'promedio'],
+                  orden=('title', 'status', 'promedio'), filtros=('status',))
+
+# Tablero de coordinación; sólo lee los resúmenes analíticos
+@bp.route('/dashboard')
+@login_required
+@cache_pagina('resumen_analitico')
+def dashboard():
+    if current_user.role != 'admin':
+        flash('Solo el personal administrativo puede consultar el tablero.')
+        return redirect(url_for('.home'))
+    return render_template('dashboard.html', resumen=leer_resumenes())
+
+# Los mismos resúmenes del tablero en JSON
+@bp.route('/dashboard/data')
+@login_required
+def dashboard_data():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Solo el personal administrativo puede consultar el tablero.'}), 403
+    return jsonify(leer_resumenes())
 
 # Ruta para consultar el estatus de titulación
-@app.route('/consultar_estatus')
+@bp.route('/consultar_estatus')
 @login_required
 def consultar_estatus():
     if current_user.role != 'student':
         flash('Solo los estudiantes pueden consultar el estatus de titulación.')
-        return redirect(url_for('home'))
-    alumno = Alumno.query.filter_by(user_id=current_user.id).first()
-    inscripciones = InscripcionConvocatoria.query.filter_by(alumno_id=alumno.id).all()
+        return redirect(url_for('.home'))
+    if current_user.perfil_id is None:
+        flash('Tu usuario no tiene un registro de alumno.')
+        return redirect(url_for('.home'))
+    inscripciones = con_perfil(InscripcionConvocatoria.query).filter_by(alumno_id=current_user.perfil_id).all()
     return render_template('consultar_estatus.html', inscripciones=inscripciones)
 
+# API JSON versionada (/api/v1). Cada recurso declara su modelo, los campos
+# que se pueden pedir con ?fields=, los que se regresan por omisión, la
+# columna de búsqueda por lote (?ids= o POST .../batch), los órdenes de ?sort=
+# y los filtros por igualdad. Sólo se consultan las columnas pedidas.
+RecursoApi = namedtuple('RecursoApi', ['modelo', 'campos', 'por_omision', 'llave', 'orden', 'filtros'])
+RECURSOS_API = {
+    'theses': RecursoApi(
+        TrabajoTitulacion,
+        ('id', 'identifier', 'title', 'authors', 'summary', 'keywords', 'status', 'num_asignaciones', 'num_evaluaciones', 'promedio'),
+        ('identifier', 'title', 'status'), 'identifier', ('identifier', 'title', 'promedio'), ('status',)
+    ),
+    'calls': RecursoApi(
+        Convocatoria, ('id', 'title', 'description', 'start_date', 'end_date'),
+        ('id', 'title', 'start_date', 'end_date'), 'id', ('title', 'start_date', 'end_date'), ()
+    ),
+    'enrollments': RecursoApi(
+        InscripcionConvocatoria, ('id', 'convocatoria_id', 'alumno_id'),
+        ('id', 'convocatoria_id', 'alumno_id'), 'id', (), ('convocatoria_id', 'alumno_id')
+    ),
+    'evaluations': RecursoApi(
+        Evaluacion, ('id', 'thesis_id', 'sinodal_id', 'grade', 'comentario'),
+        ('id', 'thesis_id', 'sinodal_id', 'grade'), 'id', ('grade',), ('thesis_id', 'sinodal_id')
+    ),
+}
+CAMPOS_API_BUSQUEDA = ('identifier', 'title', 'tipo', 'thesis_id', 'pagina', 'fragmento', 'content')
+CAMPOS_API_BUSQUEDA_COMPACTOS = ('identifier', 'title', 'tipo', 'pagina', 'fragmento')
+
+class ErrorApi(Exception):
+    def __init__(self, mensaje, status=400):
+        super().__init__(mensaje)
+        self.status = status
+
+@bp.app_errorhandler(ErrorApi)
+def responder_error_api(error):
+    return respuesta_api({'error': str(error)}, error.status)
+
+def obtener_recurso(nombre):
+    if nombre not in RECURSOS_API:
+        raise ErrorApi(f'Recurso desconocido: {nombre}', 404)
+    return RECURSOS_API[nombre]
+
+# Campos de ?fields= (lista separada por comas) validados contra los permitidos
+def campos_pedidos(permitidos, por_omision, pedidos=None):
+    if not pedidos:
+        return tuple(por_omision)
+    if isinstance(pedidos, str):
+        pedidos = pedidos.split(',')
+    pedidos = tuple(dict.fromkeys(campo.strip() for campo in pedidos if campo.strip()))
+    desconocidos = [campo for campo in pedidos if campo not in permitidos]
+    if desconocidos:
+        raise ErrorApi(f"Campos desconocidos: {', '.join(desconocidos)}")
+    return pedidos
+
+def valor_json(valor):
+    return valor.isoformat() if isinstance(valor, date) else valor
+
+def fila_api(fila, campos):
+    return {campo: valor_json(getattr(fila, campo)) for campo in campos}
+
+# Consulta sólo de las columnas pedidas más las que se necesitan para el
+# cursor o la llave del lote
+def consulta_api(recurso, campos, extra=()):
+    columnas = dict.fromkeys(campos + tuple(extra))
+    return recurso.modelo.query.with_entities(*[getattr(recurso.modelo, columna) for columna in columnas])
+
+# Codificación de la respuesta según Accept-Encoding: brotli si está
+# instalado, si no gzip; None si el cliente no acepta ninguna
+def codificacion_aceptada():
+    opciones = (['br'] if brotli is not None else []) + ['gzip']
+    return request.accept_encodings.best_match(opciones)
+
+# Comprime un flujo de bytes conforme se genera, sin juntarlo en memoria
+def comprimir_flujo(partes, codificacion):
+    if codificacion == 'br':
+        compresor = brotli.Compressor(quality=current_app.config['API_BROTLI_QUALITY'])
+        for parte in partes:
+            datos = compresor.process(parte)
+            if datos:
+                yield datos
+        yield compresor.finish()
+        return
+    # wbits=31: formato gzip con encabezado y CRC
+    compresor = zlib.compressobj(current_app.config['API_GZIP_LEVEL'], zlib.DEFLATED, 31)
+    for parte in partes:
+        datos = compresor.compress(parte)
+        if datos:
+            yield datos
+    yield compresor.flush()
+
+# Respuesta JSON compacta. Con `partes` (un generador de bytes) el cuerpo se
+# transmite y se comprime por bloques; si no, se comprime completo cuando
+# pasa de API_COMPRESS_MIN_SIZE.
+def respuesta_api(datos=None, status=200, partes=None, mimetype='application/json'):
+    codificacion = codificacion_aceptada()
+    if partes is None:
+        cuerpo = json.dumps(datos, ensure_ascii=False, separators=(',', ':'), default=valor_json).encode('utf-8')
+        if codificacion and len(cuerpo) >= current_app.config['API_COMPRESS_MIN_SIZE']:
+            cuerpo = b''.join(comprimir_flujo([cuerpo], codificacion))
+        else:
+            codificacion = None
+        response = Response(cuerpo, status, mimetype=mimetype)
+    else:
+        if codificacion:
+            partes = comprimir_flujo(partes, codificacion)
+        response = Response(stream_with_context(partes), status, mimetype=mimetype)
+    if codificacion:
+        response.headers['Content-Encoding'] = codificacion
+    response.vary.add('Accept-Encoding')
+    return response
+
+# Busca muchas llaves con una sola consulta IN y conserva el orden pedido
+def buscar_lote(recurso, valores, campos):
+    if recurso.llave == 'id':
+        try:
+            valores = [int(valor) for valor in valores]
+        except (TypeError, ValueError):
+            raise ErrorApi('Los ids deben ser números enteros.')
+    else:
+        valores = [str(valor).strip() for valor in valores]
+    valores = list(dict.fromkeys(valores))
+    if len(valores) > current_app.config['API_BATCH_MAX']:
+        raise ErrorApi(f"Se permiten a lo más {current_app.config['API_BATCH_MAX']} llaves por petición.")
+    columna = getattr(recurso.modelo, recurso.llave)
+    filas = consulta_api(recurso, campos, (recurso.llave,)).filter(columna.in_(valores)).all() if valores else []
+    por_llave = {getattr(fila, recurso.llave): fila for fila in filas}
+    return {
+        'data': [fila_api(por_llave[valor], campos) for valor in valores if valor in por_llave],
+        'missing': [valor for valor in valores if valor not in por_llave],
+    }
+
+# Listado con cursor (?limit=&after=&sort=&order=), filtros por igualdad,
+# ?vigentes=1 en convocatorias y búsqueda por lote con ?ids=a,b,c. Con
+# ?format=ndjson transmite todos los registros, un objeto por línea.
+# La API responde 401 en JSON en lugar de redirigir al formulario de login
+@login_manager.unauthorized_handler
+def no_autorizado():
+    if request.path.startswith('/api/'):
+        return respuesta_api({'error': 'Se requiere iniciar sesión.'}, 401)
+    flash(login_manager.login_message, category=login_manager.login_message_category)
+    return redirect(login_url(login_manager.login_view, next_url=request.url))
+
+@bp.route('/api/v1/<recurso>')
+@login_required
+def api_listar(recurso):
+    recurso = obtener_recurso(recurso)
+    campos = campos_pedidos(recurso.campos, recurso.por_omision, request.args.get('fields'))
+    if request.args.get('ids'):
+        return respuesta_api(buscar_lote(recurso, request.args['ids'].split(','), campos))
+    sort = request.args.get('sort')
+    query = consulta_api(recurso, campos, ('id', sort) if sort in recurso.orden else ('id',))
+    query = aplicar_filtros(query, recurso.modelo, recurso.filtros)
+    if request.args.get('vigentes') == '1' and hasattr(recurso.modelo, 'end_date'):
+        query = filtrar_vigentes(query, recurso.modelo)
+    if request.args.get('format') == 'ndjson':
+        def generar():
+            for bloque in recorrer_keyset(query, recurso.modelo):
+                yield ''.join(
+                    json.dumps(fila_api(fila, campos), ensure_ascii=False, separators=(',', ':')) + '\n'
+                    for fila in bloque
+                ).encode('utf-8')
+        return respuesta_api(partes=generar(), mimetype='application/x-ndjson')
+    pagina = paginar(query, recurso.modelo, recurso.orden)
+    return respuesta_api({'data': [fila_api(fila, campos) for fila in pagina.items], 'next': pagina.siguiente})
+
+# Búsqueda por lote con las llaves en el cuerpo: {"ids": [...], "fields": [...]}
+@bp.route('/api/v1/<recurso>/batch', methods=['POST'])
+@login_required
+def api_lote(recurso):
+    recurso = obtener_recurso(recurso)
+    cuerpo = request.get_json(silent=True)
+    if not isinstance(cuerpo, dict) or not isinstance(cuerpo.get('ids'), list):
+        raise ErrorApi('Se requiere un objeto JSON con la lista "ids".')
+    campos = campos_pedidos(recurso.campos, recurso.por_omision, cuerpo.get('fields'))
+    return respuesta_api(buscar_lote(recurso, cuerpo['ids'], campos))
+
+@bp.route('/api/v1/<recurso>/<llave>')
+@login_required
+def api_detalle(recurso, llave):
+    recurso = obtener_recurso(recurso)
+    campos = campos_pedidos(recurso.campos, recurso.campos, request.args.get('fields'))
+    resultado = buscar_lote(recurso, [llave], campos)
+    if not resultado['data']:
+        raise ErrorApi(f'No existe {llave}', 404)
+    return respuesta_api(resultado['data'][0])
+
+# Búsqueda general (?q=); por omisión sin el texto completo de cada resultado
+@bp.route('/api/v1/search')
+@login_required
+def api_buscar():
+    consulta = request.args.get('q', '').strip()
+    if not consulta:
+        raise ErrorApi('Se requiere el parámetro q.')
+    campos = campos_pedidos(CAMPOS_API_BUSQUEDA, CAMPOS_API_BUSQUEDA_COMPACTOS, request.args.get('fields'))
+    return respuesta_api({'data': [{campo: r[campo] for campo in campos} for r in buscar_general(consulta)]})
+
+# Después de un fork las conexiones heredadas del proceso padre no se usan:
+# cada worker abre las suyas (el índice y los hilos ya se revisan por pid)
+def reiniciar_despues_de_fork(app):
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+# Aplicaciones vivas del proceso. Los hooks de salida y de fork se registran
+# una sola vez y recorren este conjunto; al guardar referencias débiles, una
+# aplicación que ya nadie usa (p. ej. la de una prueba) se puede liberar.
+APLICACIONES = weakref.WeakSet()
+
+def esperar_colas_al_salir():
+    for app in list(APLICACIONES):
+        app.extensions['aeneta']['cola_indexacion'].esperar(10)
+
+def reiniciar_aplicaciones_despues_de_fork():
+    for app in list(APLICACIONES):
+        reiniciar_despues_de_fork(app)
+
+atexit.register(esperar_colas_al_salir)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reiniciar_aplicaciones_despues_de_fork)
+
+# Fábrica de la aplicación: cada llamada crea una aplicación nueva con la
+# configuración por omisión, AENETA_SETTINGS y el argumento `config` (en ese
+# orden, antes de registrar las extensiones) y sus servicios, y la agrega a
+# APLICACIONES. No toca la base ni el índice: eso lo hace `flask setup`.
+def create_app(config=None):
+    app = Flask(__name__)
+    app.config.from_object(Configuracion)
+    app.config.from_envvar('AENETA_SETTINGS', silent=True)
+    app.config.update(config or {})
+    db.init_app(app)
+    login_manager.init_app(app)
+    app.register_blueprint(bp)
+    with app.app_context():
+        for engine in db.engines.values():
+            configurar_sqlite(engine, app.config['SQLITE_PRAGMAS'])
+    app.extensions['aeneta'] = {
+        'index': IndicePerezoso(app),
+        'searchers': SearchersCompartidos(),
+        'cache_busqueda': CacheBusqueda(app),
+        'cache_paginas': CachePaginas(app),
+        'cache_usuarios': CacheUsuarios(app),
+        'indice_sugerencias': IndiceSugerencias(app),
+        'extractor_documentos': ExtractorDocumentos(app),
+        'cola_indexacion': ColaIndexacion(app),
+        'mantenimiento_indice': MantenimientoIndice(app),
+        'conciliador_resumenes': ConciliadorResumenes(app),
+        'asignador_identificadores': AsignadorIdentificadores(),
+        'escritor_trazas': EscritorTrazas(app),
+        'escritor_inscripciones': EscritorInscripciones(app),
+    }
+    APLICACIONES.add(app)
+    return app
+
 if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        preparar_aplicacion()
     app.run(debug=True)
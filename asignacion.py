@@ -0,0 +1,204 @@
+from collections import namedtuple, defaultdict, deque
+from texto import normalizar_texto
+import heapq
+import math
+
+# Asignación automática de sinodales como un problema de flujo de costo mínimo:
+#   fuente -> clase de tesis -> sinodal -> destino
+# Las tesis con la misma necesidad, los mismos costos de afinidad y los mismos
+# sinodales ya asignados forman una clase. La arista clase -> sinodal tiene
+# capacidad igual al número de tesis de la clase, así que el flujo se reparte
+# siempre en asignaciones de sinodales distintos para cada tesis (ver
+# repartir_clase). El costo de esa arista mide qué tan poco coincide la
+# especialización con las palabras clave; cada sinodal tiene una arista al
+# destino por nivel de carga, con un costo que crece con la carga y reparte el trabajo.
+PESO_CARGA = 5
+PALABRAS_VACIAS = {'del', 'las', 'los', 'para', 'por', 'con', 'una', 'uno', 'sus', 'the', 'and', 'for', 'of'}
+
+PlanAsignacion = namedtuple('PlanAsignacion', ['asignaciones', 'incompletas', 'resumen'])
+
+def tokens_afinidad(texto):
+    return frozenset(t for t in normalizar_texto(texto).split() if len(t) > 2 and t not in PALABRAS_VACIAS)
+
+def costo_afinidad(palabras_clave, especializacion):
+    if not especializacion:
+        return 50
+    return round(100 * (1 - len(palabras_clave & especializacion) / len(especializacion)))
+
+# Primal-dual: Dijkstra con potenciales (todos los costos iniciales son no
+# negativos) da las distancias y después un flujo bloqueante (Dinic) satura el
+# subgrafo de aristas con costo reducido cero. Cada fase aumenta todos los
+# caminos más cortos de la misma longitud, no uno solo.
+class FlujoCostoMinimo:
+    def __init__(self, nodos):
+        self.grafo = [[] for _ in range(nodos)]
+
+    def arista(self, origen, destino, capacidad, costo):
+        # Cada arista es [destino, capacidad, costo, índice de la reversa]
+        arista = [destino, capacidad, costo, len(self.grafo[destino])]
+        self.grafo[origen].append(arista)
+        self.grafo[destino].append([origen, 0, -costo, len(self.grafo[origen]) - 1])
+        return arista
+
+    # Flujo que pasa por una arista: la capacidad de su reversa
+    def flujo(self, arista):
+        return self.grafo[arista[0]][arista[3]][1]
+
+    def distancias(self, fuente, potencial):
+        distancia = [math.inf] * len(self.grafo)
+        distancia[fuente] = 0
+        pendientes = [(0, fuente)]
+        while pendientes:
+            d, u = heapq.heappop(pendientes)
+            if d > distancia[u]:
+                continue
+            base = d + potencial[u]
+            for v, capacidad, costo, _ in self.grafo[u]:
+                if capacidad > 0:
+                    nueva = base + costo - potencial[v]
+                    if nueva < distancia[v]:
+                        distancia[v] = nueva
+                        heapq.heappush(pendientes, (nueva, v))
+        return distancia
+
+    # Niveles BFS sobre las aristas admisibles (capacidad y costo reducido cero)
+    def niveles(self, fuente, destino, potencial):
+        nivel = [None] * len(self.grafo)
+        nivel[fuente] = 0
+        cola = deque([fuente])
+        while cola and nivel[destino] is None:
+            u = cola.popleft()
+            for v, capacidad, costo, _ in self.grafo[u]:
+                if capacidad > 0 and nivel[v] is None and costo + potencial[u] == potencial[v]:
+                    nivel[v] = nivel[u] + 1
+                    cola.append(v)
+        return nivel
+
+    def bloqueante(self, fuente, destino, potencial, nivel):
+        total = 0
+        siguiente = [0] * len(self.grafo)
+        camino = []
+        u = fuente
+        while True:
+            if u == destino:
+                cuello = min(self.grafo[w][i][1] for w, i in camino)
+                for w, i in camino:
+                    arista = self.grafo[w][i]
+                    arista[1] -= cuello
+                    self.grafo[arista[0]][arista[3]][1] += cuello
+                total += cuello
+                camino.clear()
+                u = fuente
+                continue
+            aristas = self.grafo[u]
+            while siguiente[u] < len(aristas):
+                v, capacidad, costo, _ = aristas[siguiente[u]]
+                if capacidad > 0 and nivel[v] == nivel[u] + 1 and costo + potencial[u] == potencial[v]:
+                    break
+                siguiente[u] += 1
+            if siguiente[u] < len(aristas):
+                camino.append((u, siguiente[u]))
+                u = aristas[siguiente[u]][0]
+            elif camino:
+                # Callejón sin salida: se descarta el nodo y se retrocede
+                nivel[u] = None
+                u, i = camino.pop()
+                siguiente[u] += 1
+            else:
+                return total
+
+    def resolver(self, fuente, destino):
+        potencial = [0] * len(self.grafo)
+        flujo = costo_total = 0
+        while True:
+            distancia = self.distancias(fuente, potencial)
+            if distancia[destino] == math.inf:
+                return flujo, costo_total
+            limite = distancia[destino]
+            for v, d in enumerate(distancia):
+                potencial[v] += min(d, limite)
+            while True:
+                nivel = self.niveles(fuente, destino, potencial)
+                if nivel[destino] is None:
+                    break
+                aumentado = self.bloqueante(fuente, destino, potencial, nivel)
+                flujo += aumentado
+                costo_total += aumentado * (potencial[destino] - potencial[fuente])
+
+# Reparte el flujo de una clase entre sus tesis: la lista de sinodales, cada
+# uno repetido tantas veces como su flujo, se recorre en ronda sobre las
+# primeras `ronda` tesis. Como ningún flujo pasa de `ronda`, las apariciones
+# de un sinodal caen en tesis distintas; con la ronda más corta posible se
+# completan tantas tesis como alcance el flujo en lugar de dejarlas todas a medias.
+def repartir_clase(tesis, necesidad, flujos):
+    total = sum(cantidad for _, cantidad in flujos)
+    ronda = min(len(tesis), max([-(-total // necesidad)] + [cantidad for _, cantidad in flujos]))
+    reparto = defaultdict(list)
+    posicion = 0
+    for sinodal_id, cantidad in flujos:
+        for _ in range(cantidad):
+            reparto[tesis[posicion % ronda]].append(sinodal_id)
+            posicion += 1
+    return reparto
+
+# Plan de asignación sin acceso a la base. pendientes: filas (id, keywords,
+# num_asignaciones) de las tesis incompletas; sinodales: filas (id,
+# specialization); carga: tesis activas por sinodal (se actualiza con el plan);
+# asignados: sinodales que ya tiene cada tesis pendiente.
+def planear(pendientes, sinodales, carga, asignados, carga_maxima, requeridos):
+    disponibles = [s.id for s in sinodales if carga[s.id] < carga_maxima]
+    grupos = defaultdict(list)
+    for sinodal in sinodales:
+        if carga[sinodal.id] < carga_maxima:
+            # Los sinodales con la misma especialización comparten costos de afinidad
+            grupos[tokens_afinidad(sinodal.specialization)].append(sinodal.id)
+    grupos = list(grupos.items())
+    grupo_de = {s: g for g, (_, miembros) in enumerate(grupos) for s in miembros}
+
+    # Clases de tesis equivalentes: (necesidad, costos por grupo, sinodales ya asignados)
+    clases = defaultdict(list)
+    for tesis in pendientes:
+        palabras = tokens_afinidad(tesis.keywords)
+        costos = tuple(costo_afinidad(palabras, especializacion) for especializacion, _ in grupos)
+        excluidos = frozenset(asignados[tesis.id] & grupo_de.keys())
+        clases[(requeridos - tesis.num_asignaciones, costos, excluidos)].append(tesis.id)
+    clases = list(clases.items())
+
+    fuente, destino = 0, 1
+    nodo_clase = 2
+    nodo_sinodal = {s: nodo_clase + len(clases) + i for i, s in enumerate(disponibles)}
+    flujo = FlujoCostoMinimo(nodo_clase + len(clases) + len(disponibles))
+    aristas = []
+    for c, ((necesidad, costos, excluidos), tesis) in enumerate(clases):
+        flujo.arista(fuente, nodo_clase + c, necesidad * len(tesis), 0)
+        aristas.append([
+            (s, flujo.arista(nodo_clase + c, nodo_sinodal[s], len(tesis), costos[grupo_de[s]]))
+            for s in disponibles if s not in excluidos
+        ])
+    for s in disponibles:
+        # Cada asignación extra cuesta más que la anterior (costo convexo)
+        for nivel in range(carga[s], carga_maxima):
+            flujo.arista(nodo_sinodal[s], destino, 1, PESO_CARGA * (nivel + 1))
+    flujo.resolver(fuente, destino)
+
+    asignaciones = []
+    incompletas = []
+    for c, ((necesidad, costos, _), tesis) in enumerate(clases):
+        reparto = repartir_clase(tesis, necesidad, [(s, flujo.flujo(arista)) for s, arista in aristas[c]])
+        for thesis_id in tesis:
+            for s in reparto[thesis_id]:
+                asignaciones.append((thesis_id, s, costos[grupo_de[s]]))
+                carga[s] += 1
+            if len(reparto[thesis_id]) < necesidad:
+                incompletas.append(thesis_id)
+    resumen = {
+        'tesis_pendientes': len(pendientes),
+        'sinodales_disponibles': len(disponibles),
+        'clases': len(clases),
+        'grupos': len(grupos),
+        'asignaciones': len(asignaciones),
+        'tesis_incompletas': len(incompletas),
+        'costo_afinidad': sum(costo for _, _, costo in asignaciones),
+        'carga_maxima': max((carga[s] for s in disponibles), default=0),
+    }
+    return PlanAsignacion(asignaciones, incompletas, resumen)
@@ -0,0 +1,3 @@
+# Generador de datos sintéticos y benchmarks. No forman parte de la aplicación
+# que atiende peticiones; se ejecutan con `python -m bench <comando>` y usan la
+# misma configuración que `flask` (AENETA_SETTINGS, AENETA_DATABASE_URI, ...).
@@ -0,0 +1,14 @@
+from flask.cli import FlaskGroup
+from app import create_app
+from bench.almacenamiento import bench_storage
+from bench.datos import generate_data
+from bench.inscripciones import bench_enrollment
+from bench.rutas import bench_routes
+
+# Como `flask`, pero sólo con los comandos de este paquete
+cli = FlaskGroup(create_app=create_app, add_default_commands=False)
+for comando in (generate_data, bench_storage, bench_enrollment, bench_routes):
+    cli.add_command(comando)
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,109 @@
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import create_engine, func, insert, select
+from app import db, configurar_sqlite, User, Sinodal, TrabajoTitulacion, Evaluacion
+import click
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+# Benchmark del almacenamiento: compara la configuración por omisión de SQLite
+# (sin PRAGMAs ni índices de llaves foráneas) contra la configuración actual.
+def preparar_bd_benchmark(ruta, optimizada, num_tesis, num_sinodales, num_evaluaciones):
+    engine = create_engine(f'sqlite:///{ruta}')
+    if optimizada:
+        configurar_sqlite(engine, current_app.config['SQLITE_PRAGMAS'])
+    db.metadata.create_all(engine)
+    with engine.begin() as conexion:
+        if not optimizada:
+            for tabla in db.metadata.sorted_tables:
+                for indice in tabla.indexes:
+                    conexion.exec_driver_sql(f'DROP INDEX IF EXISTS {indice.name}')
+        rng = random.Random(0)
+        conexion.execute(insert(User), [
+            {'username': f'bench{i}', 'password': 'x', 'role': 'sinodal'} for i in range(num_sinodales)
+        ])
+        conexion.execute(insert(Sinodal), [
+            {'name': f'Sinodal {i}', 'specialization': 'General', 'user_id': i + 1} for i in range(num_sinodales)
+        ])
+        conexion.execute(insert(TrabajoTitulacion), [
+            {'identifier': str(100000 + i), 'title': f'Tesis {i}', 'authors': 'Autor', 'summary': 'Resumen', 'keywords': 'clave'}
+            for i in range(num_tesis)
+        ])
+        conexion.execute(insert(Evaluacion), [
+            {'thesis_id': rng.randint(1, num_tesis), 'sinodal_id': rng.randint(1, num_sinodales), 'grade': rng.randint(5, 10)}
+            for _ in range(num_evaluaciones)
+        ])
+    return engine
+
+def medir_almacenamiento(engine, hilos, operaciones, num_tesis, num_sinodales):
+    resultados = []
+
+    def trabajador(semilla):
+        rng = random.Random(semilla)
+        latencias = {'lectura': [], 'escritura': []}
+        errores = 0
+        for i in range(operaciones):
+            thesis_id = rng.randint(1, num_tesis)
+            inicio = time.perf_counter()
+            try:
+                # Una de cada cuatro operaciones es una calificación nueva
+                if i % 4 == 0:
+                    tipo = 'escritura'
+                    with engine.begin() as conexion:
+                        conexion.execute(insert(Evaluacion), {
+                            'thesis_id': thesis_id, 'sinodal_id': rng.randint(1, num_sinodales), 'grade': rng.randint(5, 10)
+                        })
+                else:
+                    tipo = 'lectura'
+                    with engine.connect() as conexion:
+                        conexion.execute(
+                            select(func.count(Evaluacion.id), func.avg(Evaluacion.grade)).where(Evaluacion.thesis_id == thesis_id)
+                        ).one()
+            except Exception:
+                errores += 1
+                continue
+            latencias[tipo].append(time.perf_counter() - inicio)
+        resultados.append((latencias, errores))
+
+    inicio = time.perf_counter()
+    trabajadores = [threading.Thread(target=trabajador, args=(n,)) for n in range(hilos)]
+    for t in trabajadores:
+        t.start()
+    for t in trabajadores:
+        t.join()
+    duracion = time.perf_counter() - inicio
+    resumen = {'duracion_s': round(duracion, 3), 'errores': sum(e for _, e in resultados)}
+    for tipo in ('lectura', 'escritura'):
+        latencias = sorted(l for lat, _ in resultados for l in lat[tipo])
+        resumen[f'{tipo}s_por_segundo'] = round(len(latencias) / duracion, 1)
+        if len(latencias) > 1:
+            resumen[f'{tipo}_p50_ms'] = round(statistics.median(latencias) * 1000, 3)
+            resumen[f'{tipo}_p99_ms'] = round(statistics.quantiles(latencias, n=100)[98] * 1000, 3)
+    return resumen
+
+@click.command('bench-storage')
+@with_appcontext
+@click.option('--theses', default=5000, show_default=True)
+@click.option('--sinodales', default=200, show_default=True)
+@click.option('--evaluations', default=100000, show_default=True)
+@click.option('--threads', default=8, show_default=True)
+@click.option('--operations', default=500, show_default=True, help='Operaciones por hilo')
+@click.option('--output', type=click.Path(dir_okay=False), help='Guardar el resultado en JSON')
+def bench_storage(theses, sinodales, evaluations, threads, operations, output):
+    resultado = {}
+    with tempfile.TemporaryDirectory() as directorio:
+        for nombre, optimizada in (('antes', False), ('despues', True)):
+            engine = preparar_bd_benchmark(
+                os.path.join(directorio, f'{nombre}.db'), optimizada, theses, sinodales, evaluations
+            )
+            resultado[nombre] = medir_almacenamiento(engine, threads, operations, theses, sinodales)
+            engine.dispose()
+            print(nombre, json.dumps(resultado[nombre], sort_keys=True))
+    if output:
+        with open(output, 'w') as f:
+            json.dump(resultado, f, indent=2, sort_keys=True)
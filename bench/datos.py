@@ -0,0 +1,173 @@
+from datetime import date, timedelta
+from flask.cli import with_appcontext
+from sqlalchemy import insert
+from app import (
+    db, index, asignador_identificadores, indice_sugerencias, bloques, indexar_similitud, recalcular_estatus,
+    conciliar, reindexar_tesis, SINODALES_REQUERIDOS, User, Alumno, Egresado, Docente, Sinodal, TrabajoTitulacion,
+    AsignacionSinodal, Evaluacion, Convocatoria, CalendarioConvocatoria, Seminario, InscripcionConvocatoria,
+)
+import click
+import json
+import random
+import time
+
+# Generador de datos sintéticos de una institución, reproducible con una
+# semilla. La escala es el número de tesis; las demás tablas son proporcionales.
+ESCALAS_DATOS = {'1k': 1000, '100k': 100000, '1m': 1000000}
+PALABRAS_SINTETICAS = (
+    'redes neuronales aprendizaje profundo sistemas distribuidos bases datos seguridad informática '
+    'visión computadora robótica móvil análisis lenguaje natural algoritmos genéticos optimización '
+    'cómputo paralelo energía renovable control automático señales imágenes médicas blockchain '
+    'internet cosas nube microservicios compiladores criptografía educación virtual simulación'
+).split()
+ESPECIALIZACIONES_SINTETICAS = (
+    'Inteligencia artificial', 'Redes de computadoras', 'Bases de datos', 'Sistemas embebidos',
+    'Seguridad informática', 'Ingeniería de software', 'Cómputo gráfico', 'Robótica', 'Control automático',
+)
+NOMBRES_SINTETICOS = ('Ana', 'Luis', 'María', 'José', 'Sofía', 'Diego', 'Valeria', 'Jorge', 'Camila', 'Iván')
+APELLIDOS_SINTETICOS = ('García', 'Hernández', 'López', 'Martínez', 'Pérez', 'Sánchez', 'Ramírez', 'Torres', 'Flores', 'Díaz')
+
+def nombre_sintetico(rng):
+    return f'{rng.choice(NOMBRES_SINTETICOS)} {rng.choice(APELLIDOS_SINTETICOS)} {rng.choice(APELLIDOS_SINTETICOS)}'
+
+# Inserta usuarios con su perfil por bloques; regresa los ids de los perfiles
+def generar_usuarios(rol, modelo, total, campos, rng):
+    ids = []
+    for bloque in bloques(total):
+        user_ids = db.session.execute(
+            insert(User).returning(User.id, sort_by_parameter_order=True),
+            [{'username': f'gen-{rol}-{i}', 'password': 'x', 'role': rol} for i in bloque]
+        ).scalars().all()
+        ids += db.session.execute(
+            insert(modelo).returning(modelo.id, sort_by_parameter_order=True),
+            [dict(campos(i, rng), user_id=user_id) for i, user_id in zip(bloque, user_ids)]
+        ).scalars().all()
+        db.session.commit()
+    return ids
+
+def generar_datos(escala, semilla=0, indexar=True, progreso=None):
+    n = ESCALAS_DATOS[escala]
+    rng = random.Random(semilla)
+    hoy = date.today()
+    conteos = {}
+
+    def avisar(tabla, total):
+        conteos[tabla] = total
+        if progreso:
+            progreso(tabla, total)
+
+    alumnos = generar_usuarios('student', Alumno, n, lambda i, rng: {
+        'name': nombre_sintetico(rng), 'boleta': str(2020000000 + i),
+        'area': rng.choice(ESPECIALIZACIONES_SINTETICAS), 'semester': str(rng.randint(1, 10)),
+    }, rng)
+    avisar('alumno', len(alumnos))
+    egresados = generar_usuarios('egresado', Egresado, n // 4, lambda i, rng: {
+        'name': nombre_sintetico(rng), 'boleta': str(2010000000 + i),
+        'area': rng.choice(ESPECIALIZACIONES_SINTETICAS), 'generation': str(rng.randint(2000, hoy.year)),
+    }, rng)
+    avisar('egresado', len(egresados))
+    docentes = generar_usuarios('teacher', Docente, max(n // 50, 5), lambda i, rng: {
+        'name': nombre_sintetico(rng), 'specialization': rng.choice(ESPECIALIZACIONES_SINTETICAS),
+    }, rng)
+    avisar('docente', len(docentes))
+    sinodales = generar_usuarios('sinodal', Sinodal, max(n // 50, 10), lambda i, rng: {
+        'name': nombre_sintetico(rng), 'specialization': rng.choice(ESPECIALIZACIONES_SINTETICAS),
+    }, rng)
+    avisar('sinodal', len(sinodales))
+
+    asignaciones = evaluaciones = 0
+    for bloque in bloques(n):
+        # Los identificadores se reservan antes de abrir la transacción del bloque
+        identificadores = asignador_identificadores.tomar(len(bloque))
+        filas_tesis = [{
+                'identifier': identifier,
+                'title': ' '.join(rng.sample(PALABRAS_SINTETICAS, rng.randint(3, 7))).capitalize(),
+                'authors': ', '.join(nombre_sintetico(rng) for _ in range(rng.randint(1, 3))),
+                'summary': ' '.join(rng.choices(PALABRAS_SINTETICAS, k=rng.randint(20, 60))).capitalize() + '.',
+                'keywords': ', '.join(rng.sample(PALABRAS_SINTETICAS, 3)),
+            } for identifier in identificadores]
+        thesis_ids = db.session.execute(
+            insert(TrabajoTitulacion).returning(TrabajoTitulacion.id, sort_by_parameter_order=True), filas_tesis
+        ).scalars().all()
+        indexar_similitud([
+            (thesis_id, fila['title'], fila['summary'], fila['keywords']) for thesis_id, fila in zip(thesis_ids, filas_tesis)
+        ])
+        filas_asignacion, filas_evaluacion = [], []
+        for thesis_id in thesis_ids:
+            # 70% con sus tres sinodales; el resto a medio asignar
+            cuantos = SINODALES_REQUERIDOS if rng.random() < 0.7 else rng.randint(0, SINODALES_REQUERIDOS - 1)
+            for sinodal_id in rng.sample(sinodales, cuantos):
+                filas_asignacion.append({'thesis_id': thesis_id, 'sinodal_id': sinodal_id})
+                if cuantos == SINODALES_REQUERIDOS and rng.random() < 0.6:
+                    filas_evaluacion.append({
+                        'thesis_id': thesis_id, 'sinodal_id': sinodal_id,
+                        'grade': rng.randint(5, 10), 'comentario': 'Evaluación generada',
+                    })
+        if filas_asignacion:
+            db.session.execute(insert(AsignacionSinodal), filas_asignacion)
+        if filas_evaluacion:
+            db.session.execute(insert(Evaluacion), filas_evaluacion)
+        recalcular_estatus(thesis_ids)
+        db.session.commit()
+        asignaciones += len(filas_asignacion)
+        evaluaciones += len(filas_evaluacion)
+    avisar('trabajo_titulacion', n)
+    avisar('asignacion_sinodal', asignaciones)
+    avisar('evaluacion', evaluaciones)
+
+    # Periodos pasados, abiertos y futuros alrededor de hoy
+    periodos = max(n // 1000, 5)
+    # El primero siempre está abierto, para que haya a dónde inscribirse
+    fechas = [(hoy - timedelta(days=7), hoy + timedelta(days=30))]
+    for _ in range(periodos - 1):
+        inicio = hoy + timedelta(days=rng.randint(-720, 90))
+        fechas.append((inicio, inicio + timedelta(days=rng.randint(7, 60))))
+    convocatorias = db.session.execute(
+        insert(Convocatoria).returning(Convocatoria.id, sort_by_parameter_order=True),
+        [{'title': f'Convocatoria {i + 1}', 'description': 'Convocatoria generada', 'start_date': inicio, 'end_date': fin}
+         for i, (inicio, fin) in enumerate(fechas)]
+    ).scalars().all()
+    db.session.execute(insert(CalendarioConvocatoria), [
+        {'start_date': inicio, 'end_date': fin, 'requirements': 'Requisitos generados'} for inicio, fin in fechas
+    ])
+    db.session.execute(insert(Seminario), [
+        {'date': inicio, 'topic': ' '.join(rng.sample(PALABRAS_SINTETICAS, 3)).capitalize(), 'speaker': nombre_sintetico(rng)}
+        for inicio, _ in fechas
+    ])
+    db.session.commit()
+    avisar('convocatoria', len(convocatorias))
+    inscripciones = 0
+    for bloque in bloques(len(alumnos)):
+        filas = [
+            {'convocatoria_id': rng.choice(convocatorias), 'alumno_id': alumnos[i]}
+            for i in bloque if rng.random() < 0.5
+        ]
+        if filas:
+            db.session.execute(insert(InscripcionConvocatoria), filas)
+        db.session.commit()
+        inscripciones += len(filas)
+    avisar('inscripcion_convocatoria', inscripciones)
+
+    # Las inserciones masivas no pasan por los incrementos; se recalculan los resúmenes
+    conciliar()
+    db.session.commit()
+
+    if indexar:
+        writer = index.writer(limitmb=256)
+        avisar('indice', reindexar_tesis(writer))
+        writer.commit(optimize=True)
+    indice_sugerencias.invalidar()
+    return conteos
+
+@click.command('generate-data')
+@with_appcontext
+@click.option('--scale', type=click.Choice(list(ESCALAS_DATOS)), default='1k', show_default=True)
+@click.option('--seed', default=0, show_default=True)
+@click.option('--no-index', is_flag=True, help='No indexar las tesis en Whoosh')
+@click.option('--force', is_flag=True, help='Generar aunque la base ya tenga tesis')
+def generate_data(scale, seed, no_index, force):
+    if not force and db.session.query(TrabajoTitulacion.id).first():
+        raise click.ClickException('La base ya tiene tesis; use una base vacía (AENETA_DATABASE_URI) o --force.')
+    inicio = time.perf_counter()
+    conteos = generar_datos(scale, seed, not no_index, lambda tabla, total: print(f'{tabla}: {total}'))
+    print(f'Listo en {time.perf_counter() - inicio:.1f}s: {json.dumps(conteos, sort_keys=True)}')
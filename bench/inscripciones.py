@@ -0,0 +1,116 @@
+from collections import Counter
+from datetime import date
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import create_engine, func, insert, select
+from app import db, configurar_sqlite, User, Alumno, Convocatoria, InscripcionConvocatoria, EscritorInscripciones
+import click
+import json
+import os
+import queue
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+def preparar_bd_inscripciones(ruta, optimizada, num_alumnos):
+    engine = create_engine(f'sqlite:///{ruta}')
+    if optimizada:
+        configurar_sqlite(engine, current_app.config['SQLITE_PRAGMAS'])
+    db.metadata.create_all(engine)
+    with engine.begin() as conexion:
+        if not optimizada:
+            # Sin índice único, como estaba antes de esta ruta
+            conexion.exec_driver_sql('DROP INDEX IF EXISTS ux_inscripcion_convocatoria_alumno_convocatoria')
+        conexion.execute(insert(User), [
+            {'username': f'alumno{i}', 'password': 'x', 'role': 'student'} for i in range(num_alumnos)
+        ])
+        conexion.execute(insert(Alumno), [
+            {'name': f'Alumno {i}', 'boleta': str(i), 'area': 'General', 'semester': '8', 'user_id': i + 1}
+            for i in range(num_alumnos)
+        ])
+        conexion.execute(insert(Convocatoria), {
+            'title': 'Convocatoria', 'description': 'Prueba de carga',
+            'start_date': date.today(), 'end_date': date.today()
+        })
+    return engine
+
+# Simula una ráfaga de alumnos concurrentes que se inscriben a la misma
+# convocatoria; una fracción repite la petición como un doble clic
+def medir_inscripciones(engine, num_alumnos, hilos, repetidas, agrupada):
+    escritor = EscritorInscripciones(current_app._get_current_object(), engine) if agrupada else None
+    pendientes = queue.Queue()
+    rng = random.Random(0)
+    for alumno_id in range(1, num_alumnos + 1):
+        for _ in range(2 if rng.random() < repetidas else 1):
+            pendientes.put(alumno_id)
+    peticiones = pendientes.qsize()
+    latencias = []
+    errores = []
+    barrera = threading.Barrier(hilos)
+
+    def trabajador():
+        barrera.wait()
+        while True:
+            try:
+                alumno_id = pendientes.get_nowait()
+            except queue.Empty:
+                return
+            inicio = time.perf_counter()
+            try:
+                if agrupada:
+                    escritor.inscribir(1, alumno_id)
+                else:
+                    with engine.begin() as conexion:
+                        conexion.execute(insert(InscripcionConvocatoria), {'convocatoria_id': 1, 'alumno_id': alumno_id})
+            except Exception as e:
+                errores.append(type(e).__name__)
+                continue
+            latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    trabajadores = [threading.Thread(target=trabajador) for _ in range(hilos)]
+    for t in trabajadores:
+        t.start()
+    for t in trabajadores:
+        t.join()
+    duracion = time.perf_counter() - inicio
+    with engine.connect() as conexion:
+        filas, unicas = conexion.execute(select(
+            func.count(InscripcionConvocatoria.id), func.count(func.distinct(InscripcionConvocatoria.alumno_id))
+        )).one()
+    latencias.sort()
+    resumen = {
+        'peticiones': peticiones,
+        'duracion_s': round(duracion, 3),
+        'por_segundo': round(len(latencias) / duracion, 1),
+        'tasa_error': round(len(errores) / peticiones, 4),
+        'errores': dict(Counter(errores)),
+        'inscripciones': filas,
+        'duplicadas': filas - unicas,
+    }
+    if len(latencias) > 1:
+        resumen['p50_ms'] = round(statistics.median(latencias) * 1000, 3)
+        resumen['p99_ms'] = round(statistics.quantiles(latencias, n=100)[98] * 1000, 3)
+    if escritor:
+        resumen['grupos'] = escritor.grupos
+    return resumen
+
+@click.command('bench-enrollment')
+@with_appcontext
+@click.option('--students', default=1000, show_default=True)
+@click.option('--threads', default=64, show_default=True, help='Peticiones concurrentes')
+@click.option('--repeated', default=0.1, show_default=True, help='Fracción de alumnos que repiten la petición')
+@click.option('--output', type=click.Path(dir_okay=False), help='Guardar el resultado en JSON')
+def bench_enrollment(students, threads, repeated, output):
+    resultado = {}
+    with tempfile.TemporaryDirectory() as directorio:
+        for nombre, optimizada in (('antes', False), ('despues', True)):
+            engine = preparar_bd_inscripciones(os.path.join(directorio, f'{nombre}.db'), optimizada, students)
+            resultado[nombre] = medir_inscripciones(engine, students, threads, repeated, agrupada=optimizada)
+            engine.dispose()
+            print(nombre, json.dumps(resultado[nombre], sort_keys=True))
+    if output:
+        with open(output, 'w') as f:
+            json.dump(resultado, f, indent=2, sort_keys=True)
@@ -0,0 +1,199 @@
+from collections import defaultdict
+from datetime import datetime
+from flask import current_app, g, request_finished
+from flask.cli import with_appcontext
+from sqlalchemy import func, select
+from app import (
+    db, filtrar_vigentes, User, Sinodal, TrabajoTitulacion, AsignacionSinodal, Evaluacion, Convocatoria,
+    InscripcionConvocatoria,
+)
+from bench.datos import PALABRAS_SINTETICAS
+import click
+import json
+import random
+import statistics
+import threading
+import time
+
+# Benchmark de rutas: cada escenario corre en varios hilos, cada uno con su
+# propio cliente de prueba y sesión, y registra latencias, sentencias SQL y
+# errores. El resultado se guarda como línea base para comparar corridas.
+ESCENARIOS_BENCH = (
+    'search', 'search_thesis', 'list_theses_with_status', 'list_users', 'inscribir_convocatoria', 'calificar_tesis',
+)
+
+def contexto_bench(hilos):
+    contexto = {
+        'admin': ('atzin', 'atzin'),
+        'alumnos': db.session.execute(
+            select(User.username).where(User.role == 'student').order_by(User.id).limit(hilos)
+        ).scalars().all(),
+        'convocatorias': [c.id for c in filtrar_vigentes(Convocatoria.query, Convocatoria).limit(50)],
+        'sinodales': defaultdict(list),
+    }
+    for username, thesis_id in db.session.execute(
+        select(User.username, AsignacionSinodal.thesis_id)
+        .join(Sinodal, Sinodal.user_id == User.id)
+        .join(AsignacionSinodal, AsignacionSinodal.sinodal_id == Sinodal.id)
+        .order_by(AsignacionSinodal.id).limit(hilos * 50)
+    ):
+        if len(contexto['sinodales']) < hilos or username in contexto['sinodales']:
+            contexto['sinodales'][username].append(thesis_id)
+    contexto['sinodales'] = list(contexto['sinodales'].items())
+    return contexto
+
+# Regresa (usuario, contraseña, función que hace una petición) para el hilo
+def preparar_escenario(escenario, contexto, hilo, rng):
+    if escenario == 'search':
+        return contexto['admin'] + (lambda c: c.post('/search', data={'query': rng.choice(PALABRAS_SINTETICAS)}),)
+    if escenario == 'search_thesis':
+        return contexto['admin'] + (
+            lambda c: c.post('/search_thesis', data={'query': ' '.join(rng.sample(PALABRAS_SINTETICAS, 2))}),
+        )
+    if escenario == 'list_theses_with_status':
+        estatus = ['', 'Por asignar sinodales', 'Calificando', 'Aprobado', 'Reprobado']
+        return contexto['admin'] + (
+            lambda c: c.get('/list_theses_with_status', query_string={'status': rng.choice(estatus), 'sort': 'promedio'}),
+        )
+    if escenario == 'list_users':
+        return contexto['admin'] + (lambda c: c.get('/list_users', query_string={'role': rng.choice(['', 'student', 'sinodal'])}),)
+    if escenario == 'inscribir_convocatoria':
+        if not contexto['alumnos'] or not contexto['convocatorias']:
+            return None
+        usuario = contexto['alumnos'][hilo % len(contexto['alumnos'])]
+        return usuario, 'x', lambda c: c.post(f"/inscribir_convocatoria/{rng.choice(contexto['convocatorias'])}")
+    if escenario == 'calificar_tesis':
+        if not contexto['sinodales']:
+            return None
+        usuario, tesis = contexto['sinodales'][hilo % len(contexto['sinodales'])]
+        return usuario, 'x', lambda c: c.post(
+            f'/calificar_tesis/{rng.choice(tesis)}', data={'grade': rng.randint(5, 10), 'comentario': 'Benchmark'}
+        )
+
+def medir_escenario(escenario, contexto, hilos, peticiones, semilla, calentamiento=5):
+    # Los hilos de los clientes no tienen contexto de aplicación
+    app = current_app._get_current_object()
+    latencias, sentencias, errores = [], [], []
+    local = threading.local()
+
+    def capturar(sender, response, **extra):
+        local.sentencias = g.get('sentencias_sql', 0)
+
+    def trabajador(hilo):
+        rng = random.Random(semilla * 1000 + hilo)
+        preparado = preparar_escenario(escenario, contexto, hilo, rng)
+        if preparado is None:
+            return
+        usuario, password, peticion = preparado
+        cliente = app.test_client()
+        cliente.post('/login', data={'username': usuario, 'password': password})
+        for i in range(calentamiento + peticiones):
+            local.sentencias = 0
+            inicio = time.perf_counter()
+            try:
+                respuesta = peticion(cliente)
+            except Exception as e:
+                errores.append(type(e).__name__)
+                continue
+            duracion = time.perf_counter() - inicio
+            if i < calentamiento:
+                continue
+            # Las vistas de escritura redirigen al terminar
+            if respuesta.status_code >= 400:
+                errores.append(str(respuesta.status_code))
+            latencias.append(duracion)
+            sentencias.append(local.sentencias)
+
+    request_finished.connect(capturar, app)
+    try:
+        inicio = time.perf_counter()
+        trabajadores = [threading.Thread(target=trabajador, args=(h,)) for h in range(hilos)]
+        for t in trabajadores:
+            t.start()
+        for t in trabajadores:
+            t.join()
+        duracion = time.perf_counter() - inicio
+    finally:
+        request_finished.disconnect(capturar, app)
+    if not latencias:
+        return None
+    latencias.sort()
+    resumen = {
+        'peticiones': len(latencias),
+        'por_segundo': round(len(latencias) / duracion, 1),
+        'p50_ms': round(statistics.median(latencias) * 1000, 3),
+        'p99_ms': round(latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))] * 1000, 3),
+        'sql_promedio': round(statistics.fmean(sentencias), 2),
+        'sql_max': max(sentencias),
+        'tasa_error': round(len(errores) / (len(latencias) + len(errores)), 4),
+    }
+    return resumen
+
+def memoria_maxima_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def medir_rutas(escenarios, hilos, peticiones, semilla=0):
+    contexto = contexto_bench(hilos)
+    resultado = {
+        'fecha': datetime.utcnow().isoformat(timespec='seconds'),
+        'parametros': {'hilos': hilos, 'peticiones': peticiones, 'semilla': semilla},
+        'filas': {
+            modelo.__tablename__: db.session.query(func.count(modelo.id)).scalar()
+            for modelo in (User, TrabajoTitulacion, AsignacionSinodal, Evaluacion, InscripcionConvocatoria)
+        },
+        'escenarios': {},
+    }
+    db.session.remove()
+    for escenario in escenarios:
+        resumen = medir_escenario(escenario, contexto, hilos, peticiones, semilla)
+        if resumen is not None:
+            resultado['escenarios'][escenario] = resumen
+    resultado['rss_max_kb'] = memoria_maxima_kb()
+    return resultado
+
+# Diferencias contra una línea base que rebasan la tolerancia relativa
+def comparar_bench(base, actual, tolerancia):
+    regresiones = []
+    for escenario, medido in actual['escenarios'].items():
+        anterior = base.get('escenarios', {}).get(escenario)
+        if not anterior:
+            continue
+        if medido['por_segundo'] < anterior['por_segundo'] * (1 - tolerancia):
+            regresiones.append(f"{escenario}: por_segundo {anterior['por_segundo']} -> {medido['por_segundo']}")
+        if medido['p99_ms'] > anterior['p99_ms'] * (1 + tolerancia):
+            regresiones.append(f"{escenario}: p99_ms {anterior['p99_ms']} -> {medido['p99_ms']}")
+        if medido['sql_promedio'] > anterior['sql_promedio'] + 0.5:
+            regresiones.append(f"{escenario}: sql_promedio {anterior['sql_promedio']} -> {medido['sql_promedio']}")
+        if medido['tasa_error'] > anterior['tasa_error']:
+            regresiones.append(f"{escenario}: tasa_error {anterior['tasa_error']} -> {medido['tasa_error']}")
+    return regresiones
+
+@click.command('bench-routes')
+@with_appcontext
+@click.option('--scenario', 'escenarios', multiple=True, type=click.Choice(ESCENARIOS_BENCH), help='Por omisión, todos')
+@click.option('--threads', default=8, show_default=True)
+@click.option('--requests', 'peticiones', default=100, show_default=True, help='Peticiones por hilo')
+@click.option('--seed', default=0, show_default=True)
+@click.option('--output', type=click.Path(dir_okay=False), help='Guardar el resultado en JSON')
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False), help='Comparar contra una corrida anterior')
+@click.option('--tolerance', default=0.1, show_default=True, help='Cambio relativo permitido contra la línea base')
+def bench_routes(escenarios, threads, peticiones, seed, output, baseline, tolerance):
+    resultado = medir_rutas(escenarios or ESCENARIOS_BENCH, threads, peticiones, seed)
+    for escenario, resumen in resultado['escenarios'].items():
+        print(escenario, json.dumps(resumen, sort_keys=True))
+    print(f"rss_max_kb {resultado['rss_max_kb']}")
+    if output:
+        with open(output, 'w') as f:
+            json.dump(resultado, f, indent=2, sort_keys=True)
+    if baseline:
+        with open(baseline) as f:
+            regresiones = comparar_bench(json.load(f), resultado, tolerance)
+        for regresion in regresiones:
+            print(f'Regresión: {regresion}')
+        if regresiones:
+            raise SystemExit(1)
+        print('Sin regresiones contra la línea base.')
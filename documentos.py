@@ -0,0 +1,91 @@
+# Extracción del texto de los documentos completos de las tesis. Corre en los
+# procesos del pool de ExtractorDocumentos (con spawn), que sólo importan este
+# módulo y no la aplicación.
+try:
+    import pypdf
+except ImportError:
+    # Opcional: extracción de PDF cuando no está instalado pdftotext
+    pypdf = None
+import functools
+import json
+import re
+import shutil
+import subprocess
+import unicodedata
+
+# Los archivos de texto sin saltos de página se dividen cada tantos caracteres
+CARACTERES_POR_PAGINA = 3000
+LONGITUD_MAXIMA_LINEA = 8192
+
+# Regresa (número, líneas) por cada página de un flujo de texto. Una página
+# termina en un salto de página (como los que escribe pdftotext) o, si se
+# indica, al juntar caracteres_por_pagina sin uno.
+def paginas_flujo(flujo, caracteres_por_pagina=None):
+    numero, lineas, caracteres = 1, [], 0
+    while True:
+        linea = flujo.readline(LONGITUD_MAXIMA_LINEA)
+        if not linea:
+            break
+        for i, parte in enumerate(linea.split('\f')):
+            if i > 0:
+                yield numero, lineas
+                numero, lineas, caracteres = numero + 1, [], 0
+            lineas.append(parte)
+            caracteres += len(parte)
+        if caracteres_por_pagina and caracteres >= caracteres_por_pagina and linea.endswith('\n'):
+            yield numero, lineas
+            numero, lineas, caracteres = numero + 1, [], 0
+    if any(linea.strip() for linea in lineas):
+        yield numero, lineas
+
+# Si el archivo trae saltos de página se respetan; si no, se divide por caracteres
+def paginas_texto(ruta):
+    with open(ruta, 'rb') as flujo:
+        con_saltos = any(b'\f' in bloque for bloque in iter(functools.partial(flujo.read, 1 << 20), b''))
+    with open(ruta, encoding='utf-8', errors='replace') as flujo:
+        yield from paginas_flujo(flujo, None if con_saltos else CARACTERES_POR_PAGINA)
+
+# PDF con pdftotext (lee la salida conforme se genera) o, si no está, con pypdf
+def paginas_pdf(ruta):
+    if shutil.which('pdftotext'):
+        proceso = subprocess.Popen(['pdftotext', '-enc', 'UTF-8', ruta, '-'], stdout=subprocess.PIPE,
+                                   stderr=subprocess.DEVNULL, encoding='utf-8', errors='replace')
+        try:
+            yield from paginas_flujo(proceso.stdout)
+        finally:
+            proceso.stdout.close()
+            if proceso.poll() is None:
+                proceso.kill()
+        if proceso.wait() != 0:
+            raise RuntimeError(f'pdftotext no pudo leer {ruta}')
+    elif pypdf is not None:
+        for numero, pagina in enumerate(pypdf.PdfReader(ruta).pages, 1):
+            yield numero, (pagina.extract_text() or '').splitlines(keepends=True)
+    else:
+        raise RuntimeError('Para extraer PDF se necesita pdftotext (poppler-utils) o el paquete pypdf')
+
+def paginas_documento(ruta):
+    if ruta.lower().endswith('.pdf'):
+        return paginas_pdf(ruta)
+    return paginas_texto(ruta)
+
+# Palabras de una página: ligaduras y caracteres compatibles normalizados y
+# palabras cortadas con guion al final de la línea vueltas a unir
+def palabras_pagina(lineas):
+    texto = unicodedata.normalize('NFKC', ''.join(lineas))
+    texto = re.sub(r'(\w)-[ \t]*\n\s*(\w)', r'\1\2', texto)
+    return texto.split()
+
+# Se ejecuta en los procesos del pool: escribe en destino un pasaje JSONL por
+# cada palabras_por_pasaje palabras, sin cruzar páginas. Regresa páginas y pasajes.
+def extraer_documento(ruta, destino, palabras_por_pasaje):
+    paginas = pasajes = 0
+    with open(destino, 'w', encoding='utf-8') as salida:
+        for numero, lineas in paginas_documento(ruta):
+            palabras = palabras_pagina(lineas)
+            paginas = numero
+            for inicio in range(0, len(palabras), palabras_por_pasaje):
+                texto = ' '.join(palabras[inicio:inicio + palabras_por_pasaje])
+                salida.write(json.dumps({'pagina': numero, 'texto': texto}, ensure_ascii=False) + '\n')
+                pasajes += 1
+    return paginas, pasajes
@@ -0,0 +1,147 @@
+try:
+    import numpy
+except ImportError:
+    # Opcional: sólo acelera la comparación masiva de firmas MinHash
+    numpy = None
+from collections import defaultdict
+from texto import normalizar_texto
+import array
+import itertools
+import random
+import sys
+import zlib
+
+# Detección de casi duplicados con MinHash y LSH, sin acceso a la base (la
+# aplicación guarda firmas y bandas en SQLite). El texto se parte en
+# trigramas de palabras; cada una de las PERMUTACIONES_MINHASH funciones
+# (a * h + b) mod P se queda con el mínimo, y la fracción de mínimos iguales
+# entre dos firmas estima su similitud de Jaccard. Con BANDAS_LSH bandas de
+# FILAS_POR_BANDA filas, los pares con similitud alrededor de 0.42 o más
+# coinciden en alguna banda con probabilidad alta.
+PERMUTACIONES_MINHASH = 128
+BANDAS_LSH = 32
+FILAS_POR_BANDA = PERMUTACIONES_MINHASH // BANDAS_LSH
+PRIMO_MINHASH = (1 << 31) - 1
+TAMANO_SHINGLE = 3
+_rng_minhash = random.Random(20240601)
+COEFICIENTES_MINHASH = [
+    (_rng_minhash.randrange(1, PRIMO_MINHASH), _rng_minhash.randrange(PRIMO_MINHASH))
+    for _ in range(PERMUTACIONES_MINHASH)
+]
+
+def shingles_tesis(title, summary, keywords):
+    palabras = normalizar_texto(' '.join((title or '', summary or '', keywords or ''))).split()
+    if len(palabras) < TAMANO_SHINGLE:
+        return {' '.join(palabras)} if palabras else set()
+    return {' '.join(palabras[i:i + TAMANO_SHINGLE]) for i in range(len(palabras) - TAMANO_SHINGLE + 1)}
+
+# Firma como array('I'); None si el texto no tiene palabras
+def firma_minhash(title, summary, keywords):
+    hashes = [zlib.crc32(shingle.encode()) for shingle in shingles_tesis(title, summary, keywords)]
+    if not hashes:
+        return None
+    return array.array('I', (
+        min((a * h + b) % PRIMO_MINHASH for h in hashes) for a, b in COEFICIENTES_MINHASH
+    ))
+
+# Se guarda en little-endian para que la base sea portable
+def codificar_firma(firma):
+    firma = array.array('I', firma)
+    if sys.byteorder == 'big':
+        firma.byteswap()
+    return firma.tobytes()
+
+def decodificar_firma(datos):
+    firma = array.array('I')
+    firma.frombytes(datos)
+    if sys.byteorder == 'big':
+        firma.byteswap()
+    return firma
+
+def bandas_lsh(firma):
+    return [
+        (banda, zlib.crc32(codificar_firma(firma[banda * FILAS_POR_BANDA:(banda + 1) * FILAS_POR_BANDA])) - (1 << 31))
+        for banda in range(BANDAS_LSH)
+    ]
+
+def similitud_firmas(a, b):
+    return sum(x == y for x, y in zip(a, b)) / PERMUTACIONES_MINHASH
+
+# Búsqueda masiva de grupos de casi duplicados. Las firmas se cargan en una
+# matriz, los candidatos salen de cubetas por banda y los pares se verifican en
+# bloque (con numpy si está disponible). Los grupos son las componentes conexas
+# de los pares que superan el umbral.
+LIMITE_CUBETA_LSH = 1000
+
+def rango_banda(banda):
+    return banda * FILAS_POR_BANDA * 4, (banda + 1) * FILAS_POR_BANDA * 4
+
+# Pares candidatos de una cubeta. Una cubeta que pasa de LIMITE_CUBETA_LSH
+# (texto repetido) se parte agregando a la llave las bandas siguientes hasta
+# que cada parte quepa; si aun con la firma completa sigue siendo enorme, sus
+# miembros tienen firmas idénticas (similitud 1) y encadenarlos basta.
+def pares_cubeta(miembros, firmas, banda):
+    pares = set()
+    pendientes = [(miembros, 1)]
+    while pendientes:
+        miembros, bandas_usadas = pendientes.pop()
+        if len(miembros) <= LIMITE_CUBETA_LSH:
+            pares.update(itertools.combinations(miembros, 2))
+        elif bandas_usadas == BANDAS_LSH:
+            pares.update(zip(miembros, miembros[1:]))
+        else:
+            inicio, fin = rango_banda((banda + bandas_usadas) % BANDAS_LSH)
+            partes = defaultdict(list)
+            for i in miembros:
+                partes[firmas[i][inicio:fin]].append(i)
+            pendientes.extend((parte, bandas_usadas + 1) for parte in partes.values())
+    return pares
+
+# Grupos de casi duplicados entre firmas codificadas. Regresa listas de
+# (posición en firmas, similitud máxima), de la más grande a la más chica;
+# `avisar(tamano, banda)` se llama por cada cubeta que hay que partir.
+def grupos_similares(firmas, umbral, avisar=None):
+    pares = set()
+    for banda in range(BANDAS_LSH):
+        inicio, fin = rango_banda(banda)
+        cubetas = defaultdict(list)
+        for i, datos in enumerate(firmas):
+            cubetas[datos[inicio:fin]].append(i)
+        for miembros in cubetas.values():
+            if len(miembros) > LIMITE_CUBETA_LSH and avisar:
+                avisar(len(miembros), banda)
+            pares.update(pares_cubeta(miembros, firmas, banda))
+    pares = sorted(pares)
+    if not pares:
+        return []
+    if numpy is not None:
+        matriz = numpy.frombuffer(b''.join(firmas), dtype='<u4').reshape(len(firmas), PERMUTACIONES_MINHASH)
+        izquierda, derecha = numpy.array(pares).T
+        similitudes = (matriz[izquierda] == matriz[derecha]).mean(axis=1).tolist()
+    else:
+        decodificadas = {}
+        def firma(i):
+            if i not in decodificadas:
+                decodificadas[i] = decodificar_firma(firmas[i])
+            return decodificadas[i]
+        similitudes = [similitud_firmas(firma(i), firma(j)) for i, j in pares]
+
+    padre = list(range(len(firmas)))
+    def raiz(i):
+        while padre[i] != i:
+            padre[i] = padre[padre[i]]
+            i = padre[i]
+        return i
+    maxima = defaultdict(float)
+    for (i, j), similitud in zip(pares, similitudes):
+        if similitud >= umbral:
+            padre[raiz(i)] = raiz(j)
+            maxima[i] = max(maxima[i], similitud)
+            maxima[j] = max(maxima[j], similitud)
+    grupos = defaultdict(list)
+    for i in maxima:
+        grupos[raiz(i)].append(i)
+    return sorted(
+        ([(i, maxima[i]) for i in sorted(miembros)] for miembros in grupos.values()),
+        key=lambda grupo: -len(grupo)
+    )
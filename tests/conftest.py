@@ -0,0 +1,48 @@
+import pytest
+
+import app as aeneta
+from bench.datos import generar_datos
+
+
+# Aplicación con su propia base, índice y documentos en un directorio temporal;
+# TESTING activa la verificación de SQL_STATEMENT_LIMIT en cada petición
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    directorio = tmp_path_factory.mktemp('aeneta')
+    app = aeneta.create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{directorio / "aeneta.db"}',
+        'INDEX_DIR': str(directorio / 'indexdir'),
+        'DOCUMENTS_DIR': str(directorio / 'documentos'),
+        'INDEX_MAINTENANCE': False,
+        'ANALYTICS_RECONCILE': False,
+        'INGEST_WORKERS': 1,
+    })
+    with app.app_context():
+        aeneta.preparar_aplicacion()
+        generar_datos('1k')
+    yield app
+    with app.app_context():
+        aeneta.cola_indexacion.esperar(10)
+
+
+def iniciar_sesion(app, username, password):
+    cliente = app.test_client()
+    respuesta = cliente.post('/login', data={'username': username, 'password': password})
+    assert respuesta.status_code == 302
+    return cliente
+
+
+@pytest.fixture
+def admin(app):
+    return iniciar_sesion(app, 'atzin', 'atzin')
+
+
+@pytest.fixture
+def alumno(app):
+    return iniciar_sesion(app, 'gen-student-0', 'x')
+
+
+@pytest.fixture
+def sinodal(app):
+    return iniciar_sesion(app, 'gen-sinodal-0', 'x')
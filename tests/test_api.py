@@ -0,0 +1,36 @@
+import pytest
+
+import app as aeneta
+
+
+# /api/v1/theses?sort=promedio debe entregar todas las tesis, incluidas las
+# que no tienen calificaciones (promedio NULL), siguiendo el cursor "next"
+@pytest.mark.parametrize('order', ('asc', 'desc'))
+def test_api_recorre_todas_las_paginas_ordenadas_por_promedio(app, admin, order):
+    with app.app_context():
+        total = aeneta.db.session.query(aeneta.TrabajoTitulacion.id).count()
+    identificadores = []
+    args = {'sort': 'promedio', 'order': order, 'limit': 50, 'fields': 'identifier,promedio'}
+    while True:
+        cuerpo = admin.get('/api/v1/theses', query_string=args).get_json()
+        identificadores += [fila['identifier'] for fila in cuerpo['data']]
+        if cuerpo['next'] is None:
+            break
+        args['after'] = cuerpo['next']
+    assert len(identificadores) == total
+    assert len(set(identificadores)) == total
+
+
+def test_api_promedio_nulo_en_la_ultima_pagina(admin):
+    args = {'sort': 'promedio', 'limit': 200, 'fields': 'identifier,promedio'}
+    filas = []
+    while True:
+        cuerpo = admin.get('/api/v1/theses', query_string=args).get_json()
+        filas += cuerpo['data']
+        if cuerpo['next'] is None:
+            break
+        args['after'] = cuerpo['next']
+    promedios = [fila['promedio'] for fila in filas]
+    conocidos = [p for p in promedios if p is not None]
+    assert conocidos == sorted(conocidos)
+    assert promedios == conocidos + [None] * (len(promedios) - len(conocidos))
@@ -0,0 +1,23 @@
+import atexit
+import gc
+import weakref
+
+import app as aeneta
+
+
+# create_app no registra hooks nuevos por llamada; la aplicación sólo queda en
+# el registro débil y se libera cuando nadie más la usa
+def test_create_app_no_retiene_aplicaciones(tmp_path):
+    hooks = atexit._ncallbacks()
+    app = aeneta.create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "temporal.db"}',
+        'INDEX_DIR': str(tmp_path / 'indexdir'),
+    })
+    assert atexit._ncallbacks() == hooks
+    assert app in aeneta.APLICACIONES
+    aeneta.reiniciar_aplicaciones_despues_de_fork()
+    aeneta.esperar_colas_al_salir()
+    referencia = weakref.ref(app)
+    del app
+    gc.collect()
+    assert referencia() is None
@@ -0,0 +1,85 @@
+import random
+import time
+from collections import Counter
+
+import pytest
+from sqlalchemy import insert
+
+import app as aeneta
+from bench.datos import ESPECIALIZACIONES_SINTETICAS, PALABRAS_SINTETICAS
+
+
+@pytest.fixture
+def institucion(tmp_path):
+    def crear(tesis, sinodales, semilla=0, previas=0):
+        rng = random.Random(semilla)
+        app = aeneta.create_app({
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "asignacion.db"}',
+            'INDEX_DIR': str(tmp_path / 'indexdir'),
+        })
+        with app.app_context():
+            aeneta.migrar()
+            sesion = aeneta.db.session
+            user_ids = sesion.execute(insert(aeneta.User).returning(aeneta.User.id, sort_by_parameter_order=True), [
+                {'username': f'sinodal-{i}', 'password': 'x', 'role': 'sinodal'} for i in range(sinodales)
+            ]).scalars().all()
+            sinodal_ids = sesion.execute(insert(aeneta.Sinodal).returning(aeneta.Sinodal.id, sort_by_parameter_order=True), [
+                {'name': f'Sinodal {i}', 'specialization': rng.choice(ESPECIALIZACIONES_SINTETICAS), 'user_id': user_id}
+                for i, user_id in enumerate(user_ids)
+            ]).scalars().all()
+            thesis_ids = sesion.execute(insert(aeneta.TrabajoTitulacion).returning(aeneta.TrabajoTitulacion.id, sort_by_parameter_order=True), [
+                {'identifier': f'T{i:05d}', 'title': f'Tesis {i}', 'authors': 'Autor', 'summary': 'Resumen',
+                 'keywords': ', '.join(rng.sample(PALABRAS_SINTETICAS, 3))}
+                for i in range(tesis)
+            ]).scalars().all()
+            pares = {(rng.choice(thesis_ids), rng.choice(sinodal_ids)) for _ in range(previas)}
+            if pares:
+                sesion.execute(insert(aeneta.AsignacionSinodal), [{'thesis_id': t, 'sinodal_id': s} for t, s in pares])
+            aeneta.recalcular_estatus()
+            sesion.commit()
+        return app
+    return crear
+
+
+def verificar_plan(plan, carga_maxima):
+    pares = [(thesis_id, sinodal_id) for thesis_id, sinodal_id, _ in plan.asignaciones]
+    assert len(pares) == len(set(pares))
+    existentes = set(aeneta.db.session.execute(
+        aeneta.select(aeneta.AsignacionSinodal.thesis_id, aeneta.AsignacionSinodal.sinodal_id)
+    ).all())
+    assert not set(pares) & existentes
+    por_tesis = Counter(thesis_id for thesis_id, _ in pares + list(existentes))
+    assert max(por_tesis.values()) <= aeneta.SINODALES_REQUERIDOS
+    assert plan.resumen['carga_maxima'] <= carga_maxima
+
+
+# Con capacidad suficiente todas las tesis quedan completas, en segundos
+def test_miles_de_tesis_en_segundos(institucion):
+    app = institucion(2000, 100)
+    with app.app_context():
+        inicio = time.perf_counter()
+        plan = aeneta.planear_asignaciones(60)
+        duracion = time.perf_counter() - inicio
+        assert plan.incompletas == []
+        assert len(plan.asignaciones) == 2000 * aeneta.SINODALES_REQUERIDOS
+        verificar_plan(plan, 60)
+    assert duracion < 10
+
+
+def test_respeta_asignaciones_previas(institucion):
+    app = institucion(300, 30, semilla=3, previas=200)
+    with app.app_context():
+        plan = aeneta.planear_asignaciones(30)
+        assert plan.incompletas == []
+        verificar_plan(plan, 30)
+
+
+# Sin capacidad suficiente se completan tantas tesis como alcance y el resto
+# se reporta como incompleto
+def test_capacidad_insuficiente(institucion):
+    app = institucion(100, 5, semilla=7)
+    with app.app_context():
+        plan = aeneta.planear_asignaciones(12)
+        assert len(plan.asignaciones) == 5 * 12
+        assert len(plan.incompletas) >= 100 - 5 * 12 // aeneta.SINODALES_REQUERIDOS
+        verificar_plan(plan, 12)
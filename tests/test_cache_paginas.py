@@ -0,0 +1,38 @@
+import app as aeneta
+
+
+RUTA = '/list_calls?sort=start_date&order=desc'
+
+
+def version_convocatoria(app):
+    with app.app_context():
+        return aeneta.db.session.get(aeneta.VersionTabla, 'convocatoria').version
+
+
+def test_etag_repetido_responde_304(admin):
+    primera = admin.get(RUTA)
+    assert primera.status_code == 200
+    assert primera.headers['ETag']
+    assert primera.cache_control.private and primera.cache_control.no_cache
+    segunda = admin.get(RUTA, headers={'If-None-Match': primera.headers['ETag']})
+    assert segunda.status_code == 304
+    assert segunda.get_data() == b''
+    assert segunda.headers['ETag'] == primera.headers['ETag']
+
+
+# Registrar una convocatoria incrementa la versión de la tabla en el mismo
+# commit; el ETag anterior ya no coincide y la página cacheada no se reutiliza
+def test_escritura_invalida_la_pagina_cacheada(app, admin):
+    anterior = admin.get(RUTA)
+    assert 'Convocatoria del año 2099' not in anterior.get_data(as_text=True)
+    version = version_convocatoria(app)
+    respuesta = admin.post('/register_call', data={
+        'title': 'Convocatoria del año 2099', 'description': 'Invalida la caché',
+        'start_date': '2099-01-01', 'end_date': '2099-02-01',
+    })
+    assert respuesta.status_code == 302
+    assert version_convocatoria(app) == version + 1
+    nueva = admin.get(RUTA, headers={'If-None-Match': anterior.headers['ETag']})
+    assert nueva.status_code == 200
+    assert nueva.headers['ETag'] != anterior.headers['ETag']
+    assert 'Convocatoria del año 2099' in nueva.get_data(as_text=True)
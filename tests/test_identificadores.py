@@ -0,0 +1,44 @@
+import threading
+
+import app as aeneta
+
+
+# La permutación no repite valores ni sale del espacio de seis dígitos
+def test_permutacion_sin_colisiones(app):
+    with app.app_context():
+        entradas = list(range(60000)) + list(range(aeneta.ESPACIO_IDENTIFICADORES - 20000, aeneta.ESPACIO_IDENTIFICADORES))
+        salidas = [aeneta.permutar_identificador(n) for n in entradas]
+    assert len(set(salidas)) == len(entradas)
+    assert all(0 <= n < aeneta.ESPACIO_IDENTIFICADORES for n in salidas)
+    identificadores = [str(aeneta.BASE_IDENTIFICADORES + n) for n in salidas]
+    assert all(len(i) == 6 for i in identificadores)
+
+
+# Dos asignadores, como los de dos procesos, reservan bloques de la misma
+# secuencia a la vez y nunca entregan el mismo identificador
+def test_asignadores_sin_bloques_traslapados(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'IDENTIFIER_BLOCK_SIZE', 7)
+    asignadores = [aeneta.AsignadorIdentificadores(), aeneta.AsignadorIdentificadores()]
+    entregados = [[], []]
+    barrera = threading.Barrier(2)
+
+    def tomar(i):
+        with app.app_context():
+            barrera.wait()
+            for _ in range(40):
+                entregados[i] += asignadores[i].tomar(3)
+
+    hilos = [threading.Thread(target=tomar, args=(i,)) for i in range(2)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert [len(e) for e in entregados] == [120, 120]
+    assert not set(entregados[0]) & set(entregados[1])
+    assert len(set(entregados[0] + entregados[1])) == 240
+    with app.app_context():
+        existentes = aeneta.db.session.execute(
+            aeneta.select(aeneta.TrabajoTitulacion.identifier)
+            .where(aeneta.TrabajoTitulacion.identifier.in_(entregados[0] + entregados[1]))
+        ).scalars().all()
+    assert existentes == []
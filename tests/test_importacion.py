@@ -0,0 +1,107 @@
+import io
+import json
+
+import app as aeneta
+
+
+ALUMNOS_CSV = (
+    'username,password,name,boleta,area,semester\n'
+    'imp-alumno-1,x,Ana Torres,2021000001,Sistemas,8\n'
+    'atzin,x,Ya existe,2021000002,Sistemas,8\n'
+    'imp-alumno-2,x,Luis Pérez,2021000003,Robótica,\n'
+    'imp-alumno-3,x,María Díaz,2021000004,Robótica,7\n'
+    'imp-alumno-1,x,Repetido en el archivo,2021000005,Sistemas,8\n'
+)
+
+
+def usuarios(app, prefijo):
+    with app.app_context():
+        return dict(aeneta.db.session.execute(
+            aeneta.select(aeneta.User.username, aeneta.User.role).where(aeneta.User.username.startswith(prefijo))
+        ).all())
+
+
+def test_importa_csv_y_reporta_errores_por_linea(app, admin):
+    respuesta = admin.post('/import', data={
+        'tipo': 'alumno', 'archivo': (io.BytesIO(ALUMNOS_CSV.encode()), 'alumnos.csv'),
+    })
+    assert respuesta.status_code == 200
+    assert respuesta.get_json() == {
+        'procesados': 5,
+        'insertados': 2,
+        'errores': [
+            {'linea': 3, 'error': 'El nombre de usuario ya existe: atzin'},
+            {'linea': 4, 'error': 'Faltan campos: semester'},
+            {'linea': 6, 'error': 'El nombre de usuario ya existe: imp-alumno-1'},
+        ],
+    }
+    assert usuarios(app, 'imp-alumno-') == {'imp-alumno-1': 'student', 'imp-alumno-3': 'student'}
+
+
+def test_importa_jsonl_con_lineas_invalidas(app, admin):
+    lineas = [
+        json.dumps({'username': 'imp-sinodal-1', 'password': 'x', 'name': 'Dra. Ruiz', 'specialization': 'Redes'}),
+        '{"username": "imp-sinodal-2", ',
+        '',
+        json.dumps(['no', 'es', 'un', 'objeto']),
+        json.dumps({'username': 'imp-sinodal-3', 'password': 'x', 'name': 'Dr. Flores'}),
+        json.dumps({'username': 'imp-sinodal-4', 'password': 'x', 'name': 'Dr. Vega', 'specialization': 'Bases de datos'}),
+    ]
+    respuesta = admin.post('/import', data={
+        'tipo': 'sinodal', 'archivo': (io.BytesIO('\n'.join(lineas).encode()), 'sinodales.jsonl'),
+    })
+    resumen = respuesta.get_json()
+    assert (resumen['procesados'], resumen['insertados']) == (5, 2)
+    errores = {error['linea']: error['error'] for error in resumen['errores']}
+    assert sorted(errores) == [2, 4, 5]
+    assert errores[2].startswith('Registro inválido: ')
+    assert errores[4] == 'Registro inválido'
+    assert errores[5] == 'Faltan campos: specialization'
+    assert usuarios(app, 'imp-sinodal-') == {'imp-sinodal-1': 'sinodal', 'imp-sinodal-4': 'sinodal'}
+
+
+# Un usuario que aparece en la base después de leer los nombres existentes hace
+# fallar el bloque completo; se repite registro por registro y sólo esa fila se pierde
+def test_bloque_fallido_se_repite_registro_por_registro(app):
+    def registros():
+        yield 2, {'username': 'imp-docente-1', 'password': 'x', 'name': 'Docente 1', 'specialization': 'Redes'}
+        yield 3, {'username': 'imp-docente-2', 'password': 'x', 'name': 'Docente 2', 'specialization': 'Redes'}
+        # Otro proceso registra imp-docente-4 entre un bloque y el siguiente
+        aeneta.db.session.execute(aeneta.insert(aeneta.User), {'username': 'imp-docente-4', 'password': 'x', 'role': 'teacher'})
+        aeneta.db.session.commit()
+        yield 4, {'username': 'imp-docente-3', 'password': 'x', 'name': 'Docente 3', 'specialization': 'Redes'}
+        yield 5, {'username': 'imp-docente-4', 'password': 'x', 'name': 'Docente 4', 'specialization': 'Redes'}
+
+    with app.app_context():
+        resumen = aeneta.importar_registros('docente', registros(), tamano_bloque=2)
+        assert (resumen['procesados'], resumen['insertados']) == (4, 3)
+        assert [linea for linea, _ in resumen['errores']] == [5]
+        assert 'UNIQUE' in resumen['errores'][0][1]
+        docentes = aeneta.db.session.execute(
+            aeneta.select(aeneta.User.username).join(aeneta.Docente).where(aeneta.User.username.startswith('imp-docente-'))
+        ).scalars().all()
+        assert sorted(docentes) == ['imp-docente-1', 'imp-docente-2', 'imp-docente-3']
+
+
+# El comando indexa todas las tesis importadas en un solo lote y vacía el outbox
+def test_comando_importa_e_indexa_tesis(app, tmp_path):
+    ruta = tmp_path / 'tesis.csv'
+    ruta.write_text(
+        'title,authors,summary,keywords\n'
+        'Criptografía postcuántica importada,Ana Torres,Esquemas basados en retículas,criptografía\n'
+        'Sin resumen,Luis Pérez,,redes\n'
+        'Compiladores incrementales importados,María Díaz,Análisis por partes,compiladores\n',
+        encoding='utf-8'
+    )
+    resultado = app.test_cli_runner().invoke(args=['import-data', 'tesis', str(ruta), '--chunk-size', '2'])
+    assert resultado.exit_code == 0, resultado.output
+    assert 'Línea 3: Faltan campos: summary' in resultado.output
+    assert '2 tesis indexadas.' in resultado.output
+    with app.app_context():
+        tesis = aeneta.TrabajoTitulacion.query.filter(aeneta.TrabajoTitulacion.title.endswith('importada')).all()
+        tesis += aeneta.TrabajoTitulacion.query.filter(aeneta.TrabajoTitulacion.title.endswith('importados')).all()
+        assert len(tesis) == 2
+        assert aeneta.OperacionIndice.query.filter(aeneta.OperacionIndice.thesis_id.in_([t.id for t in tesis])).count() == 0
+        with aeneta.index.searcher() as searcher:
+            for trabajo in tesis:
+                assert len(searcher.search(aeneta.Term('clave', f'tesis:{trabajo.id}'))) == 1
@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+import app as aeneta
+
+
+def documentos_de_prueba(tmp_path, thesis_id, identifier):
+    ruta = tmp_path / f'{thesis_id}.jsonl'
+    ruta.write_text(json.dumps({'pagina': 1, 'texto': 'pasaje de prueba sobre criptografía'}) + '\n', encoding='utf-8')
+    return [
+        ('update', dict(clave='titulacion:prueba', tipo='titulacion', title='Tesis colectiva', content='Requisitos')),
+        ('pasajes', dict(thesis_id=thesis_id, identifier=identifier, ruta=str(ruta))),
+    ], ruta
+
+
+# Si el lote no llega al índice, los documentos que sólo viven en la cola
+# vuelven a ella y el archivo de pasajes se conserva para el reintento
+def test_lote_fallido_regresa_a_la_cola(app, tmp_path, monkeypatch):
+    cola = aeneta.ColaIndexacion(app)
+    with app.app_context():
+        thesis = aeneta.TrabajoTitulacion.query.first()
+        documentos, ruta = documentos_de_prueba(tmp_path, thesis.id, thesis.identifier)
+        monkeypatch.setattr(cola, 'escribir', lambda lote: False)
+        cola.procesar(documentos)
+        assert ruta.exists()
+        assert [cola.cola.get_nowait() for _ in range(cola.cola.qsize())] == documentos
+        monkeypatch.undo()
+        cola.procesar(documentos)
+        assert not ruta.exists()
+        assert cola.intentos == {}
+        resultados = aeneta.index.searcher().search(aeneta.Term('clave', 'titulacion:prueba'))
+        assert len(resultados) == 1
+
+
+def test_error_al_escribir_no_pierde_documentos(app, tmp_path, monkeypatch):
+    cola = aeneta.ColaIndexacion(app)
+    with app.app_context():
+        thesis = aeneta.TrabajoTitulacion.query.first()
+        documentos, ruta = documentos_de_prueba(tmp_path, thesis.id, thesis.identifier)
+
+        def fallar(lote):
+            raise RuntimeError('índice no disponible')
+        monkeypatch.setattr(cola, 'escribir', fallar)
+        with pytest.raises(RuntimeError):
+            cola.procesar(documentos)
+        assert ruta.exists()
+        assert cola.cola.qsize() == len(documentos)
+
+
+def test_descarta_despues_del_limite_de_reintentos(app, tmp_path, monkeypatch):
+    cola = aeneta.ColaIndexacion(app)
+    monkeypatch.setitem(app.config, 'INDEX_REQUEUE_LIMIT', 2)
+    monkeypatch.setattr(cola, 'escribir', lambda lote: False)
+    with app.app_context():
+        thesis = aeneta.TrabajoTitulacion.query.first()
+        documentos, ruta = documentos_de_prueba(tmp_path, thesis.id, thesis.identifier)
+        cola.procesar(documentos)
+        cola.procesar([cola.cola.get_nowait() for _ in range(cola.cola.qsize())])
+        assert cola.cola.qsize() == 0
+        assert not ruta.exists()
+
+
+# Mientras se construye el índice lateral el índice activo sigue respondiendo,
+# y lo que llega a él en ese momento sobrevive al cambio
+def test_reconstruccion_conserva_documentos(app, monkeypatch):
+    reindexar = aeneta.reindexar_tesis
+    durante = {}
+
+    def reindexar_y_escribir(writer):
+        with aeneta.index.searcher() as searcher:
+            durante['tesis'] = searcher.doc_count()
+            durante['encontrada'] = len(searcher.search(aeneta.Term('clave', f'tesis:{thesis.id}')))
+        activo = aeneta.index.writer()
+        activo.add_document(clave='tesis:durante-reconstruccion', tipo='tesis', title='Llegó durante la reconstrucción')
+        activo.commit()
+        return reindexar(writer)
+
+    with app.app_context():
+        thesis = aeneta.TrabajoTitulacion.query.first()
+        aeneta.cola_indexacion.esperar(10)
+        with aeneta.index.searcher() as searcher:
+            antes = searcher.doc_count()
+        monkeypatch.setattr(aeneta, 'reindexar_tesis', reindexar_y_escribir)
+        aeneta.reconstruir_indice()
+        assert durante == {'tesis': antes, 'encontrada': 1}
+        try:
+            with aeneta.index.searcher() as searcher:
+                assert searcher.doc_count() == antes + 1
+                for clave in (f'tesis:{thesis.id}', 'tesis:durante-reconstruccion'):
+                    assert len(searcher.search(aeneta.Term('clave', clave))) == 1
+        finally:
+            writer = aeneta.index.writer()
+            writer.delete_by_term('clave', 'tesis:durante-reconstruccion')
+            writer.commit()
@@ -0,0 +1,124 @@
+import threading
+from concurrent.futures import TimeoutError
+from datetime import date, timedelta
+
+import pytest
+
+import app as aeneta
+from conftest import iniciar_sesion
+
+
+@pytest.fixture
+def escritor(app):
+    return app.extensions['aeneta']['escritor_inscripciones']
+
+
+# Convocatoria abierta nueva para cada prueba, así ninguna ve inscripciones de otra
+@pytest.fixture
+def convocatoria(app):
+    with app.app_context():
+        convocatoria = aeneta.Convocatoria(
+            title='Convocatoria de prueba', description='Inscripciones concurrentes',
+            start_date=date.today() - timedelta(days=1), end_date=date.today() + timedelta(days=1)
+        )
+        aeneta.db.session.add(convocatoria)
+        aeneta.db.session.commit()
+        return convocatoria.id
+
+
+def perfil_alumno(app, username):
+    with app.app_context():
+        return aeneta.db.session.execute(
+            aeneta.select(aeneta.Alumno.id).join(aeneta.User).where(aeneta.User.username == username)
+        ).scalar_one()
+
+
+def inscripciones(app, convocatoria_id):
+    with app.app_context():
+        return aeneta.db.session.execute(
+            aeneta.select(aeneta.InscripcionConvocatoria.alumno_id).where(
+                aeneta.InscripcionConvocatoria.convocatoria_id == convocatoria_id
+            )
+        ).scalars().all()
+
+
+def mensajes(cliente):
+    with cliente.session_transaction() as sesion:
+        return [mensaje for _, mensaje in sesion.pop('_flashes', [])]
+
+
+def test_inscripcion_repetida_se_guarda_una_vez(app, alumno, convocatoria):
+    mensajes(alumno)
+    assert alumno.post(f'/inscribir_convocatoria/{convocatoria}').status_code == 302
+    assert mensajes(alumno) == ['Inscripción realizada con éxito.']
+    assert alumno.post(f'/inscribir_convocatoria/{convocatoria}').status_code == 302
+    assert mensajes(alumno) == ['Ya estabas inscrito en esta convocatoria.']
+    assert inscripciones(app, convocatoria) == [perfil_alumno(app, 'gen-student-0')]
+
+
+# Varios clientes del mismo alumno y de otros alumnos envían la inscripción a
+# la vez; cada alumno queda inscrito exactamente una vez
+def test_inscripciones_concurrentes_sin_duplicados(app, convocatoria):
+    usuarios = ['gen-student-1'] * 6 + [f'gen-student-{i}' for i in range(2, 8)]
+    clientes = [iniciar_sesion(app, usuario, 'x') for usuario in usuarios]
+    barrera = threading.Barrier(len(clientes))
+    codigos = []
+
+    def enviar(cliente):
+        barrera.wait()
+        codigos.append(cliente.post(f'/inscribir_convocatoria/{convocatoria}').status_code)
+
+    hilos = [threading.Thread(target=enviar, args=(cliente,)) for cliente in clientes]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert codigos == [302] * len(clientes)
+    guardadas = inscripciones(app, convocatoria)
+    assert sorted(guardadas) == sorted(perfil_alumno(app, usuario) for usuario in set(usuarios))
+
+
+# Dentro de un mismo grupo sólo la primera petición de un par recibe True
+def test_escritor_responde_true_una_sola_vez(app, escritor, convocatoria):
+    alumno_id = perfil_alumno(app, 'gen-student-8')
+    barrera = threading.Barrier(8)
+    resultados = []
+
+    def inscribir():
+        barrera.wait()
+        resultados.append(escritor.inscribir(convocatoria, alumno_id))
+
+    hilos = [threading.Thread(target=inscribir) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert sorted(resultados) == [False] * 7 + [True]
+    assert inscripciones(app, convocatoria) == [alumno_id]
+
+
+def test_error_del_escritor_llega_a_la_peticion(app, alumno, escritor, convocatoria, monkeypatch):
+    def fallar(pares):
+        raise RuntimeError('disco lleno')
+
+    monkeypatch.setattr(escritor, 'escribir', fallar)
+    with pytest.raises(RuntimeError, match='disco lleno'):
+        alumno.post(f'/inscribir_convocatoria/{convocatoria}')
+    assert inscripciones(app, convocatoria) == []
+
+
+def test_espera_maxima_del_escritor_llega_a_la_peticion(app, alumno, escritor, convocatoria, monkeypatch):
+    liberar = threading.Event()
+    escribir = escritor.escribir
+
+    def lento(pares):
+        liberar.wait(5)
+        return escribir(pares)
+
+    monkeypatch.setattr(escritor, 'escribir', lento)
+    monkeypatch.setitem(app.config, 'ENROLLMENT_TIMEOUT', 0.1)
+    try:
+        with pytest.raises(TimeoutError):
+            alumno.post(f'/inscribir_convocatoria/{convocatoria}')
+    finally:
+        liberar.set()
@@ -0,0 +1,14 @@
+def test_metricas_desactivadas_sin_token(app):
+    assert app.test_client().get('/metrics').status_code == 404
+
+
+def test_metricas_requieren_token(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'METRICS_TOKEN', 'secreto')
+    cliente = app.test_client()
+    assert cliente.get('/metrics').status_code == 401
+    assert cliente.get('/metrics', headers={'Authorization': 'Bearer otro'}).status_code == 401
+    respuesta = cliente.get('/metrics', headers={'Authorization': 'Bearer secreto'})
+    assert respuesta.status_code == 200
+    cuerpo = respuesta.get_data(as_text=True)
+    assert '# TYPE aeneta_trace_dropped_total counter' in cuerpo
+    assert '# TYPE aeneta_index_queue_depth gauge' in cuerpo
@@ -0,0 +1,78 @@
+import sqlite3
+
+import pytest
+
+import app as aeneta
+import similitud
+
+
+# Base de datos con la forma que tenía antes de las migraciones versionadas,
+# incluida una inscripción duplicada que la migración 7 debe limpiar
+@pytest.fixture
+def base_anterior(tmp_path):
+    ruta = tmp_path / 'anterior.db'
+    conexion = sqlite3.connect(ruta)
+    for sentencia in aeneta.ESQUEMA_BASE:
+        conexion.execute(sentencia)
+    conexion.executescript("""
+        INSERT INTO user (id, username, password, role) VALUES (1, 'alumno1', 'x', 'alumno');
+        INSERT INTO alumno (id, name, boleta, area, semester, user_id) VALUES (1, 'Ana', '2020000001', 'Sistemas', '8', 1);
+        INSERT INTO convocatoria (id, title, description, start_date, end_date)
+            VALUES (1, 'Convocatoria', 'Descripción', '01/02/2024', '2024-06-30');
+        INSERT INTO inscripcion_convocatoria (id, convocatoria_id, alumno_id) VALUES (1, 1, 1);
+        INSERT INTO inscripcion_convocatoria (id, convocatoria_id, alumno_id) VALUES (2, 1, 1);
+        INSERT INTO trabajo_titulacion (id, identifier, title, authors, summary, keywords, status)
+            VALUES (1, 'T0001', 'Redes neuronales', 'Ana', 'Resumen', 'redes', 'Pendiente');
+        INSERT INTO trabajo_titulacion (id, identifier, title, authors, summary, keywords, status)
+            VALUES (2, 'T0002', 'Visión por computadora en robótica móvil', 'Luis', 'Análisis de imágenes', 'visión, robótica', NULL);
+        INSERT INTO user (id, username, password, role) VALUES (2, 'sinodal1', 'x', 'sinodal');
+        INSERT INTO user (id, username, password, role) VALUES (3, 'egresado1', 'x', 'egresado');
+        INSERT INTO sinodal (id, name, specialization, user_id) VALUES (1, 'Dra. López', 'Robótica', 2);
+        INSERT INTO egresado (id, name, boleta, area, generation, user_id) VALUES (1, 'Iván', '2010000001', 'Sistemas', '2015', 3);
+        INSERT INTO asignacion_sinodal (id, thesis_id, sinodal_id) VALUES (1, 1, 1);
+        INSERT INTO asignacion_sinodal (id, thesis_id, sinodal_id) VALUES (2, 2, 1);
+        INSERT INTO evaluacion (id, thesis_id, sinodal_id, grade, comentario) VALUES (1, 1, 1, 9, NULL);
+    """)
+    conexion.commit()
+    conexion.close()
+    return ruta
+
+
+def test_migra_base_anterior_con_inscripcion_duplicada(base_anterior, tmp_path):
+    app = aeneta.create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{base_anterior}',
+        'INDEX_DIR': str(tmp_path / 'indexdir'),
+    })
+    with app.app_context():
+        aplicadas = aeneta.migrar()
+        assert [version for version, _ in aplicadas] == sorted(v for v, _, _ in aeneta.MIGRACIONES)
+        with aeneta.db.engine.connect() as conexion:
+            assert aeneta.version_esquema(conexion) == max(v for v, _, _ in aeneta.MIGRACIONES)
+            assert conexion.exec_driver_sql('SELECT id FROM inscripcion_convocatoria').scalars().all() == [1]
+            indice = conexion.exec_driver_sql(
+                "SELECT sql FROM sqlite_master WHERE name = 'ux_inscripcion_convocatoria_alumno_convocatoria'"
+            ).scalar()
+            assert indice.startswith('CREATE UNIQUE INDEX')
+            assert conexion.exec_driver_sql('SELECT start_date FROM convocatoria').scalar() == '2024-02-01'
+        # Los rellenos con SQL fijo dan lo mismo que el código actual
+        assert aeneta.verificar_estatus() == []
+        assert aeneta.conciliar() == []
+        for tesis in aeneta.TrabajoTitulacion.query:
+            firma = similitud.firma_minhash(tesis.title, tesis.summary, tesis.keywords)
+            assert tesis.firma_minhash == similitud.codificar_firma(firma)
+            assert sorted((b.banda, b.hash) for b in aeneta.BandaSimilitud.query.filter_by(thesis_id=tesis.id)) == \
+                similitud.bandas_lsh(firma)
+        assert aeneta.migrar() == []
+
+
+def test_migra_base_nueva(tmp_path):
+    app = aeneta.create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "nueva.db"}',
+        'INDEX_DIR': str(tmp_path / 'indexdir'),
+    })
+    with app.app_context():
+        aeneta.migrar()
+        inspector = aeneta.inspect(aeneta.db.engine)
+        for tabla in aeneta.db.metadata.sorted_tables:
+            assert set(tabla.c.keys()) <= {c['name'] for c in inspector.get_columns(tabla.name)}
+            assert {i.name for i in tabla.indexes} <= {i['name'] for i in inspector.get_indexes(tabla.name)}
@@ -0,0 +1,34 @@
+import pytest
+
+import app as aeneta
+
+
+def recorrer_paginas(app, modelo, orden, argumentos):
+    vistos = []
+    cursor = None
+    while True:
+        args = dict(argumentos, **({'after': cursor} if cursor else {}))
+        with app.test_request_context('/', query_string=args):
+            pagina = aeneta.paginar(modelo.query, modelo, orden)
+            vistos += [item.id for item in pagina.items]
+        if pagina.siguiente is None:
+            return vistos
+        cursor = pagina.siguiente
+
+
+# promedio es NULL en las tesis sin calificaciones; el recorrido debe
+# devolver cada tesis exactamente una vez en ambos sentidos
+@pytest.mark.parametrize('order', ('asc', 'desc'))
+def test_recorre_todas_las_paginas_con_nulos(app, order):
+    modelo = aeneta.TrabajoTitulacion
+    with app.app_context():
+        todos = {id for id, in aeneta.db.session.query(modelo.id)}
+        nulos = aeneta.db.session.query(modelo.id).filter(modelo.promedio.is_(None)).count()
+    assert 0 < nulos < len(todos)
+    vistos = recorrer_paginas(app, modelo, ('promedio',), {'sort': 'promedio', 'order': order, 'limit': 37})
+    assert len(vistos) == len(todos)
+    assert set(vistos) == todos
+    with app.app_context():
+        promedios = dict(aeneta.db.session.query(modelo.id, modelo.promedio))
+    clave = [(promedios[id] is None, promedios[id] or 0, id) for id in vistos]
+    assert clave == sorted(clave, reverse=order == 'desc')
@@ -0,0 +1,66 @@
+import html
+import re
+
+import pytest
+
+import app as aeneta
+
+
+RUTAS_LISTADO = (
+    '/', '/index_status', '/list_titulaciones', '/list_egresados', '/list_calendars', '/list_calls',
+    '/list_seminars', '/list_theses', '/list_students', '/list_teachers', '/list_admins', '/list_sinodales',
+    '/list_available_calls', '/list_users', '/list_asignaciones', '/list_theses_with_status',
+    '/dashboard', '/dashboard/data', '/assign_sinodal', '/search_thesis',
+    '/list_theses?sort=promedio&order=desc', '/list_users?format=csv',
+    '/api/v1/theses', '/api/v1/calls', '/api/v1/enrollments', '/api/v1/evaluations',
+)
+
+
+@pytest.fixture(scope='module')
+def registros(app):
+    with app.app_context():
+        return {
+            'identifier': aeneta.db.session.query(aeneta.TrabajoTitulacion.identifier).first()[0],
+            'thesis_id': aeneta.db.session.query(aeneta.Evaluacion.thesis_id).first()[0],
+            'convocatoria_id': aeneta.db.session.query(aeneta.Convocatoria.id).first()[0],
+        }
+
+
+@pytest.mark.parametrize('ruta', RUTAS_LISTADO)
+def test_listados_dentro_del_limite_de_consultas(admin, ruta):
+    respuesta = admin.get(ruta)
+    assert respuesta.status_code == 200, ruta
+
+
+# Cada listado se recorre hasta la segunda página para cubrir el cursor
+@pytest.mark.parametrize('ruta', ('/list_theses', '/list_students', '/list_users', '/list_theses_with_status'))
+def test_segunda_pagina_dentro_del_limite_de_consultas(admin, ruta):
+    siguiente = re.search(r'href="([^"]*after=[^"]*)"', admin.get(ruta).get_data(as_text=True))
+    assert siguiente, ruta
+    assert admin.get(html.unescape(siguiente.group(1))).status_code == 200
+
+
+def test_detalles_dentro_del_limite_de_consultas(admin, registros):
+    for ruta in (
+        f'/thesis/{registros["identifier"]}',
+        f'/ver_calificaciones/{registros["thesis_id"]}',
+        f'/consultar_convocatoria/{registros["convocatoria_id"]}',
+        f'/inscribir_convocatoria/{registros["convocatoria_id"]}',
+        f'/api/v1/theses/{registros["identifier"]}',
+    ):
+        assert admin.get(ruta).status_code == 200, ruta
+
+
+def test_rutas_de_alumno_y_sinodal(alumno, sinodal, registros):
+    assert alumno.get('/consultar_estatus').status_code == 200
+    assert alumno.get('/list_available_calls?sort=end_date').status_code == 200
+    assert sinodal.get(f'/calificar_tesis/{registros["thesis_id"]}').status_code == 200
+
+
+def test_limite_de_consultas_detecta_exceso(app, admin):
+    app.config['SQL_STATEMENT_LIMIT'] = 0
+    try:
+        with pytest.raises(aeneta.LimiteConsultasExcedido):
+            admin.get('/list_theses')
+    finally:
+        app.config['SQL_STATEMENT_LIMIT'] = aeneta.Configuracion.SQL_STATEMENT_LIMIT
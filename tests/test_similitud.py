@@ -0,0 +1,35 @@
+import array
+
+import similitud
+
+
+def firma(*bandas):
+    valores = []
+    for banda in range(similitud.BANDAS_LSH):
+        valores += [bandas[banda] if banda < len(bandas) else 0] * similitud.FILAS_POR_BANDA
+    return similitud.codificar_firma(array.array('I', valores))
+
+
+# Una cubeta que excede el límite se parte con las bandas siguientes: los
+# miembros que difieren en ellas ya no se encadenan como si fueran similares
+def test_cubeta_grande_se_parte_con_mas_bandas(monkeypatch):
+    monkeypatch.setattr(similitud, 'LIMITE_CUBETA_LSH', 2)
+    firmas = [
+        firma(1, 1), firma(1, 1), firma(1, 1),
+        firma(1, 2, 7), firma(1, 2, 8),
+        firma(1, 3),
+    ]
+    pares = similitud.pares_cubeta(list(range(len(firmas))), firmas, 0)
+    assert pares == {(0, 1), (1, 2), (3, 4)}
+
+
+def test_cubeta_pequena_compara_todos_los_pares():
+    firmas = [firma(1, i) for i in range(5)]
+    pares = similitud.pares_cubeta(list(range(5)), firmas, 0)
+    assert len(pares) == 10
+
+
+def test_grupos_similares_une_los_pares_sobre_el_umbral():
+    firmas = [firma(1, 1), firma(1, 1), firma(2, 2), firma(3, 3), firma(3, 3), firma(3, 3)]
+    grupos = similitud.grupos_similares(firmas, 0.95)
+    assert grupos == [[(3, 1.0), (4, 1.0), (5, 1.0)], [(0, 1.0), (1, 1.0)]]
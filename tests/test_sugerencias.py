@@ -0,0 +1,24 @@
+import app as aeneta
+
+
+# Lo agregado queda en el búfer (sin copiar el arreglo principal) y se
+# funde con él al llenarse; en ambos casos la consulta lo encuentra
+def test_agregar_usa_bufer_y_funde_por_lotes(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'SUGGEST_BUFFER_SIZE', 20)
+    indice = aeneta.IndiceSugerencias(app)
+    with app.app_context():
+        indice.construir()
+        claves = indice.datos[0]
+        total = len(claves)
+        indice.agregar(100001, 'ZZ0001', 'Xilófonos cuánticos', 'Úrsula Quiroga', 'xilófono, cuántica')
+        assert indice.datos[0] is claves
+        assert 0 < len(indice.datos[2]) < 20
+        assert {s['texto'] for s in indice.sugerir('xilof')} >= {'Xilófonos cuánticos'}
+        for i in range(10):
+            indice.agregar(100002 + i, f'ZZ{i:04d}', f'Xenón líquido {i}', 'Úrsula Quiroga', 'xenón')
+        claves, _, claves_buffer, _ = indice.datos
+        assert len(claves) > total
+        assert len(claves_buffer) < 20
+        assert claves == sorted(claves)
+        assert 'Xilófonos cuánticos' in {s['texto'] for s in indice.sugerir('xilof')}
+        assert len([s for s in indice.sugerir('xenon', limite=50) if s['tipo'] == 'title']) == 10
@@ -0,0 +1,64 @@
+import app as aeneta
+
+
+def registrar_sinodal(admin, username):
+    respuesta = admin.post('/register_sinodal', data={
+        'name': 'Sinodal temporal', 'specialization': 'Redes', 'username': username, 'password': 'x',
+    })
+    assert respuesta.status_code == 302
+
+
+def id_usuario(app, username):
+    with app.app_context():
+        return aeneta.db.session.execute(
+            aeneta.select(aeneta.User.id).where(aeneta.User.username == username)
+        ).scalar_one()
+
+
+def cargar(app, user_id):
+    with app.app_context():
+        return aeneta.load_user(str(user_id))
+
+
+# SQLite reutiliza el id del último usuario cuando se borra; sin invalidar la
+# caché, el usuario nuevo heredaría el rol y el perfil del anterior
+def test_borrar_y_registrar_con_el_mismo_id(app, admin):
+    registrar_sinodal(admin, 'cache-sinodal-1')
+    user_id = id_usuario(app, 'cache-sinodal-1')
+    anterior = cargar(app, user_id)
+    assert (anterior.username, anterior.role) == ('cache-sinodal-1', 'sinodal')
+
+    assert admin.post(f'/delete_user/{user_id}').status_code == 302
+    assert cargar(app, user_id) is None
+
+    # Copia vieja en la caché, como si el borrado no hubiera pasado por esta ruta
+    app.extensions['aeneta']['cache_usuarios'].guardar(user_id, anterior)
+    respuesta = admin.post('/register_student', data={
+        'name': 'Alumna nueva', 'boleta': '2024000001', 'area': 'Sistemas', 'semester': '1',
+        'username': 'cache-alumno-1', 'password': 'x',
+    })
+    assert respuesta.status_code == 302
+    assert id_usuario(app, 'cache-alumno-1') == user_id
+    nuevo = cargar(app, user_id)
+    assert (nuevo.username, nuevo.role) == ('cache-alumno-1', 'student')
+    with app.app_context():
+        assert nuevo.perfil_id == aeneta.Alumno.query.filter_by(user_id=user_id).one().id
+
+
+def test_importacion_invalida_ids_reutilizados(app, admin):
+    registrar_sinodal(admin, 'cache-sinodal-2')
+    user_id = id_usuario(app, 'cache-sinodal-2')
+    anterior = cargar(app, user_id)
+    assert admin.post(f'/delete_user/{user_id}').status_code == 302
+    app.extensions['aeneta']['cache_usuarios'].guardar(user_id, anterior)
+
+    with app.app_context():
+        resumen = aeneta.importar_registros('docente', [
+            (2, {'username': 'cache-docente-1', 'password': 'x', 'name': 'Docente nuevo', 'specialization': 'Redes'}),
+        ])
+        assert resumen['insertados'] == 1
+    assert id_usuario(app, 'cache-docente-1') == user_id
+    nuevo = cargar(app, user_id)
+    assert (nuevo.username, nuevo.role) == ('cache-docente-1', 'teacher')
+    with app.app_context():
+        assert nuevo.perfil_id == aeneta.Docente.query.filter_by(user_id=user_id).one().id
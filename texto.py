@@ -0,0 +1,7 @@
+import unicodedata
+
+# Minúsculas, sin acentos ni puntuación y con espacios normalizados
+def normalizar_texto(texto):
+    texto = unicodedata.normalize('NFKD', (texto or '').lower())
+    texto = ''.join(c if c.isalnum() else ' ' for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.split())